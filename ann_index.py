@@ -0,0 +1,153 @@
+"""
+Approximate Nearest Neighbour Module
+Inverted-file (IVF) index used by the local vector store for large corpora
+"""
+import os
+from typing import Optional
+import numpy as np
+
+
+class IVFIndex:
+    """Inverted-file index over the rows of a normalised vector matrix.
+
+    Vectors are clustered with spherical k-means; each cluster keeps the set of
+    matrix rows assigned to it. A search scores only the rows in the `nprobe`
+    clusters whose centroids are closest to the query, so raising `nprobe`
+    trades latency for recall. The index stores row numbers, not vectors, so
+    it stays small and the owning store remains the single copy of the data.
+    """
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nlist = self.centroids.shape[0]
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.lists = [set() for _ in range(self.nlist)]
+        self.trained_count = 0
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        """Cluster a (sample of the) matrix into `nlist` centroids"""
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(nlist, len(vectors)))
+
+        # k-means converges well on a few hundred points per centroid
+        sample_size = min(len(vectors), nlist * 256)
+        sample_rows = rng.choice(len(vectors), size=sample_size, replace=False)
+        sample = np.asarray(vectors[np.sort(sample_rows)], dtype=np.float32)
+
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = cls._nearest(centroids, sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+
+            # Re-seed empty clusters from random sample points
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                sums[empty] = sample[rng.choice(sample_size, size=len(empty))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        index = cls(centroids)
+        index.trained_count = len(vectors)
+        return index
+
+    @staticmethod
+    def _nearest(centroids: np.ndarray, vectors: np.ndarray, block: int = 65536) -> np.ndarray:
+        """Return the closest centroid for each vector, in blocks to bound memory"""
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block):
+            scores = vectors[start:start + block] @ centroids.T
+            labels[start:start + block] = np.argmax(scores, axis=1)
+        return labels
+
+    def _grow(self, size: int):
+        if size > len(self.assignments):
+            grown = np.full(max(size, 2 * len(self.assignments)), -1, dtype=np.int32)
+            grown[:len(self.assignments)] = self.assignments
+            self.assignments = grown
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Assign (or re-assign) matrix rows to their nearest clusters"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return
+
+        self._grow(int(rows.max()) + 1)
+        labels = self._nearest(self.centroids, np.asarray(vectors, dtype=np.float32))
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            previous = self.assignments[row]
+            if previous >= 0:
+                self.lists[previous].discard(row)
+            self.assignments[row] = label
+            self.lists[label].add(row)
+
+    def remove(self, row: int):
+        """Drop a row from the index"""
+        if row < len(self.assignments) and self.assignments[row] >= 0:
+            self.lists[self.assignments[row]].discard(row)
+            self.assignments[row] = -1
+
+    def move(self, source: int, target: int):
+        """Record that the vector at row `source` now lives at row `target`"""
+        label = self.assignments[source]
+        self.remove(source)
+        if label >= 0:
+            self._grow(target + 1)
+            self.assignments[target] = label
+            self.lists[label].add(target)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Return the rows stored in the `nprobe` clusters closest to the query"""
+        nprobe = max(1, min(nprobe, self.nlist))
+        scores = self.centroids @ query
+        probes = np.argpartition(-scores, nprobe - 1)[:nprobe]
+
+        rows = []
+        for probe in probes:
+            rows.extend(self.lists[probe])
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def save(self, path: str, count: int):
+        """Persist centroids and the row -> cluster assignments"""
+        np.save(os.path.join(path, "ivf_centroids.npy"), self.centroids)
+        assignments = np.full(count, -1, dtype=np.int32)
+        size = min(count, len(self.assignments))
+        assignments[:size] = self.assignments[:size]
+        np.save(os.path.join(path, "ivf_assignments.npy"), assignments)
+        np.save(os.path.join(path, "ivf_meta.npy"), np.array([self.trained_count], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IVFIndex"]:
+        """Load a persisted index, or return None if there is none"""
+        centroids_file = os.path.join(path, "ivf_centroids.npy")
+        assignments_file = os.path.join(path, "ivf_assignments.npy")
+        if not (os.path.exists(centroids_file) and os.path.exists(assignments_file)):
+            return None
+
+        index = cls(np.load(centroids_file))
+        index.assignments = np.load(assignments_file).astype(np.int32)
+        for row, label in enumerate(index.assignments.tolist()):
+            if label >= 0:
+                index.lists[label].add(row)
+
+        meta_file = os.path.join(path, "ivf_meta.npy")
+        if os.path.exists(meta_file):
+            index.trained_count = int(np.load(meta_file)[0])
+        return index
+
+    @staticmethod
+    def delete_files(path: str):
+        """Remove persisted index files (used when the index is dropped)"""
+        for name in ("ivf_centroids.npy", "ivf_assignments.npy", "ivf_meta.npy"):
+            file_path = os.path.join(path, name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+def default_nlist(count: int) -> int:
+    """Rule-of-thumb cluster count: about 4 * sqrt(n)"""
+    return max(1, int(4 * np.sqrt(count)))
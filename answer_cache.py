@@ -0,0 +1,168 @@
+"""
+Answer Cache Module
+Semantic cache of generated answers for repeated and near-duplicate questions
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+import numpy as np
+import config
+
+
+def answer_scope(namespace: str = "", filters: dict = None, model: str = None) -> str:
+    """Cache scope of an answer: the namespace and filters searched and the model that answered"""
+    return json.dumps({'namespace': namespace, 'filters': filters or None, 'model': model}, sort_keys=True)
+
+
+class AnswerCache:
+    """Answers keyed by query embedding, search scope and the chunks they were built from.
+
+    A lookup hits when a cached query is at least `threshold` cosine-similar
+    to the new one, was answered in the same `scope` (see answer_scope) *and*
+    retrieval returned the same chunk ids, so an entry stops matching as soon
+    as the underlying notes, the searched collection or the model change.
+    Entries expire after `ttl_seconds` and the least recently used are
+    evicted beyond `max_entries`. Everything is persisted in SQLite; the
+    embeddings are also held in memory in a matrix that grows geometrically,
+    so a lookup is a single matmul and storing an answer is amortised O(1).
+    """
+
+    def __init__(self, path: str = None, threshold: float = None,
+                 ttl_seconds: float = None, max_entries: int = None):
+        self.path = path or os.path.join(config.DATA_DIR, config.ANSWER_CACHE_FILE)
+        self.threshold = threshold or config.ANSWER_CACHE_SIMILARITY
+        self.ttl_seconds = ttl_seconds or config.ANSWER_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or config.ANSWER_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT NOT NULL, embedding BLOB NOT NULL, "
+            "chunk_ids TEXT NOT NULL, answer TEXT NOT NULL, sources TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL, scope TEXT NOT NULL DEFAULT '')"
+        )
+        # Entries cached before answers were scoped never match a scoped lookup
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(answers)")}
+        if "scope" not in existing:
+            self._conn.execute("ALTER TABLE answers ADD COLUMN scope TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        """Drop expired entries and rebuild the in-memory embedding matrix"""
+        self._conn.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.commit()
+
+        rows = self._conn.execute("SELECT id, embedding, chunk_ids, created_at, scope FROM answers").fetchall()
+        self._row_ids = [row[0] for row in rows]
+        self._chunk_ids = [json.loads(row[2]) for row in rows]
+        self._created = [row[3] for row in rows]
+        self._scopes = [row[4] for row in rows]
+        self._count = len(rows)
+        if rows:
+            self._matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        else:
+            self._matrix = None
+
+    def _ensure_capacity(self, dimension: int):
+        """Room for one more row, growing the matrix geometrically"""
+        if self._matrix is None:
+            self._matrix = np.zeros((64, dimension), dtype=np.float32)
+        elif self._count == self._matrix.shape[0]:
+            grown = np.zeros((2 * self._matrix.shape[0], dimension), dtype=np.float32)
+            grown[:self._count] = self._matrix[:self._count]
+            self._matrix = grown
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: List[float], chunk_ids: List[str], scope: str = "") -> Optional[dict]:
+        """Return {'answer', 'sources', 'query'} for a matching entry, or None"""
+        with self._lock:
+            entry = self._find(self._normalize(embedding), sorted(chunk_ids), scope)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), entry))
+            self._conn.commit()
+            query, answer, sources = self._conn.execute(
+                "SELECT query, answer, sources FROM answers WHERE id = ?", (entry,)
+            ).fetchone()
+            return {'query': query, 'answer': answer, 'sources': json.loads(sources)}
+
+    def _find(self, vector: np.ndarray, chunk_ids: List[str], scope: str) -> Optional[int]:
+        if self._count == 0:
+            return None
+
+        scores = self._matrix[:self._count] @ vector
+        now = time.time()
+        for position in np.argsort(-scores):
+            if scores[position] < self.threshold:
+                break
+            if now - self._created[position] > self.ttl_seconds:
+                continue
+            if self._scopes[position] == scope and self._chunk_ids[position] == chunk_ids:
+                return self._row_ids[position]
+        return None
+
+    def store(self, query: str, embedding: List[float], chunk_ids: List[str], answer: str, sources: List[str],
+              scope: str = ""):
+        """Cache an answer, evicting expired and least recently used entries"""
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (query, embedding, chunk_ids, answer, sources, created_at, last_used, scope) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (query, vector.tobytes(), json.dumps(sorted(chunk_ids)), answer, json.dumps(sources), now, now,
+                 scope)
+            )
+            self._row_ids.append(cursor.lastrowid)
+            self._chunk_ids.append(sorted(chunk_ids))
+            self._created.append(now)
+            self._scopes.append(scope)
+            self._ensure_capacity(len(vector))
+            self._matrix[self._count] = vector
+            self._count += 1
+
+            size = len(self._row_ids)
+            if size > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM answers WHERE id IN "
+                    "(SELECT id FROM answers ORDER BY last_used ASC LIMIT ?)", (size - self.max_entries,)
+                )
+                self._conn.commit()
+                self._load()
+            else:
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._load()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._row_ids),
+        }
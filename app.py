@@ -6,8 +6,10 @@ import streamlit as st
 import os
 from pathlib import Path
 import config
-from ingestion import DocumentIngestion
-from rag_assistant import RAGAssistant
+from llm_scheduler import get_llm_scheduler
+from metadata_filter import build_filter, validate_namespace
+from metrics import get_metrics, start_metrics_server
+from model_registry import get_ingestion_embeddings, get_query_embeddings
 
 
 # Page configuration
@@ -28,12 +30,37 @@ if 'ingestion' not in st.session_state:
     st.session_state.ingestion = None
 
 
+@st.cache_resource
+def get_shared_embeddings():
+    """Embedding model (and batching scheduler) shared by every session in this process"""
+    return get_query_embeddings(), get_ingestion_embeddings()
+
+
+@st.cache_resource
+def get_shared_job_runner():
+    """The process-wide ingestion job runner, built on the shared embedding model"""
+    from ingestion import DocumentIngestion
+    from ingestion_jobs import get_job_runner
+    _, ingestion_embeddings = get_shared_embeddings()
+    return get_job_runner(DocumentIngestion(embeddings=ingestion_embeddings))
+
+
+@st.cache_resource
+def get_metrics_server():
+    """Prometheus /metrics endpoint, started once per process when METRICS_PORT is set"""
+    return start_metrics_server()
+
+
 def initialize_components():
     """Initialize RAG assistant and ingestion"""
     if st.session_state.assistant is None:
+        # Imported here so the page renders before the ingestion and retrieval stack loads
+        from ingestion import DocumentIngestion
+        from rag_assistant import RAGAssistant
         with st.spinner("Initializing JARVIS..."):
-            st.session_state.assistant = RAGAssistant()
-            st.session_state.ingestion = DocumentIngestion()
+            query_embeddings, ingestion_embeddings = get_shared_embeddings()
+            st.session_state.assistant = RAGAssistant(embeddings=query_embeddings)
+            st.session_state.ingestion = DocumentIngestion(embeddings=ingestion_embeddings)
     return st.session_state.assistant, st.session_state.ingestion
 
 
@@ -49,6 +76,45 @@ def save_uploaded_file(uploaded_file):
     return str(file_path)
 
 
+def show_jobs(runner):
+    """Progress of queued and recent ingestion jobs, with cancel and retry"""
+    jobs = runner.queue.list(limit=10)
+    if not jobs:
+        return
+    
+    st.subheader("⏳ Ingestion Jobs")
+    for job in jobs:
+        label = f"**{job['file_name']}** · {job['status']}"
+        if job['namespace']:
+            label += f" · {job['namespace']}"
+        if job['status'] == 'running':
+            label += f" · {job['chunks_done']} chunks"
+            if job['cancel_requested']:
+                label += " · cancelling"
+        elif job['chunks_total']:
+            label += f" · {job['chunks_total']} chunks"
+        st.markdown(label)
+        if job['error']:
+            st.caption(f"❌ {job['error']}")
+        
+        if job['status'] in ('queued', 'running') and not job['cancel_requested']:
+            if st.button("Cancel", key=f"cancel_job_{job['id']}"):
+                runner.cancel(job['id'])
+                st.rerun()
+        elif job['status'] == 'failed':
+            if st.button("Retry", key=f"retry_job_{job['id']}"):
+                runner.retry(job['id'])
+                st.rerun()
+    
+    if st.button("Clear finished jobs"):
+        runner.queue.clear_finished()
+        st.rerun()
+
+
+# Poll job progress without rerunning the whole page
+show_jobs = st.fragment(run_every=config.JOBS_UI_REFRESH_SECONDS)(show_jobs)
+
+
 def main():
     # Header
     st.title("🤖 JARVIS - Personal AI Assistant")
@@ -56,11 +122,25 @@ def main():
     
     # Initialize components
     assistant, ingestion = initialize_components()
+    get_metrics_server()
     
     # Sidebar for file upload and settings
     with st.sidebar:
         st.header("📁 Knowledge Base")
         
+        # Uploads go to, and chat searches, one collection (vector store namespace)
+        namespace = st.text_input(
+            "Collection",
+            value=config.DEFAULT_NAMESPACE,
+            help="Keep separate knowledge bases apart (e.g. per person or project). Leave empty for the default one."
+        ).strip()
+        try:
+            validate_namespace(namespace)
+            namespace_error = None
+        except ValueError as e:
+            namespace_error = str(e)
+            st.error(f"❌ Invalid collection name: {namespace_error}")
+        
         # File upload
         st.subheader("Upload Documents")
         uploaded_files = st.file_uploader(
@@ -70,36 +150,42 @@ def main():
             help="Upload documents to add to JARVIS's knowledge base"
         )
         
+        upload_tags = st.text_input("Tags for these files", help="Comma-separated, e.g. work, runbooks")
+        
         if uploaded_files:
-            if st.button("Process Files", type="primary"):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                for idx, uploaded_file in enumerate(uploaded_files):
-                    status_text.text(f"Processing {uploaded_file.name}...")
-                    
-                    # Save file
-                    file_path = save_uploaded_file(uploaded_file)
-                    
-                    # Ingest file
-                    ingestion.ingest_file(file_path, uploaded_file.name)
-                    
-                    # Update progress
-                    progress_bar.progress((idx + 1) / len(uploaded_files))
-                
-                status_text.text("✅ All files processed!")
-                st.success(f"Successfully processed {len(uploaded_files)} file(s)")
+            if st.button("Process Files", type="primary", disabled=namespace_error is not None):
+                # Queue the files; a background worker ingests them so chat stays usable
+                runner = get_shared_job_runner()
+                tags = [tag.strip() for tag in upload_tags.split(",") if tag.strip()]
+                for uploaded_file in uploaded_files:
+                    runner.submit(save_uploaded_file(uploaded_file), uploaded_file.name,
+                                  namespace=namespace, tags=tags)
+                st.success(f"Queued {len(uploaded_files)} file(s) for processing")
+        
+        show_jobs(get_shared_job_runner())
+        
+        # Narrow what chat searches; the filters are applied before scoring
+        with st.expander("🔎 Search scope"):
+            file_types = st.multiselect("File types", ['pdf', 'docx', 'txt'])
+            search_tags = st.text_input("Tags", help="Comma-separated; chunks with any of them match")
+            since_days = st.number_input("Added in the last N days (0 = any time)", min_value=0, value=0)
+        if assistant and namespace_error is None:
+            assistant.set_scope(namespace, build_filter(
+                file_types=file_types,
+                tags=[tag.strip() for tag in search_tags.split(",") if tag.strip()],
+                since_days=since_days,
+            ))
         
         st.divider()
         
         # Settings
         st.subheader("⚙️ Settings")
         
-        # Check Pinecone connection
+        # Check vector store connection
         if ingestion and ingestion.index:
-            st.success("✅ Pinecone Connected")
+            st.success(f"✅ Vector Store Connected ({ingestion.index.name})")
         else:
-            st.warning("⚠️ Pinecone Not Connected")
+            st.warning("⚠️ Vector Store Not Connected")
         
         # Check LLM availability
         if assistant and assistant.llm_handler.is_available():
@@ -117,6 +203,36 @@ def main():
         
         st.divider()
         
+        # Latency metrics
+        with st.expander("📊 Metrics"):
+            rows = get_metrics().summary() if config.METRICS_ENABLED else []
+            if rows:
+                st.dataframe([
+                    {
+                        'metric': row['metric'].replace('jarvis_', ''),
+                        'stage': row['stage'] or '',
+                        'count': row['count'],
+                        # Stage timings are in seconds; show them in ms
+                        **{
+                            key: round(row[key] * 1000, 1) if row['stage'] else round(row[key], 1)
+                            for key in ('mean', 'p50', 'p95', 'p99')
+                        }
+                    }
+                    for row in rows
+                ], hide_index=True)
+                st.caption("Stage timings in ms over the last "
+                           f"{config.METRICS_WINDOW} observations")
+                st.download_button("Download Prometheus metrics", get_metrics().to_prometheus(),
+                                   file_name="jarvis_metrics.prom", mime="text/plain")
+            else:
+                st.caption("No requests measured yet")
+            llm = get_llm_scheduler().stats()
+            st.caption(f"LLM slots: {llm['busy']}/{llm['slots']} busy · queued "
+                       f"{llm['queued']['interactive']} interactive, {llm['queued']['batch']} batch · "
+                       f"{llm['shed']} shed")
+        
+        st.divider()
+        
         # Information
         with st.expander("ℹ️ About JARVIS"):
             st.markdown("""
@@ -155,16 +271,29 @@ def main():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Generate response
+        # Generate response, rendering tokens as they arrive
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = assistant.chat(prompt)
-                st.markdown(response['answer'])
-                
-                if response['sources']:
-                    with st.expander("📚 Sources"):
-                        for source in set(response['sources']):
-                            st.markdown(f"- {source}")
+            answer_placeholder = st.empty()
+            answer_placeholder.markdown("Thinking...")
+            answer = ""
+            
+            for event in assistant.chat_stream(prompt):
+                if event['type'] == 'sources':
+                    if event['sources']:
+                        with st.expander("📚 Sources"):
+                            for source in set(event['sources']):
+                                st.markdown(f"- {source}")
+                elif event['type'] == 'token':
+                    answer += event['text']
+                    answer_placeholder.markdown(answer + "▌")
+                else:
+                    response = event
+            
+            answer_placeholder.markdown(response['answer'])
+            timings = response.get('timings', {})
+            if 'total_ms' in timings:
+                first_token = timings.get('first_token_ms', timings['total_ms'])
+                st.caption(f"⏱️ First token {first_token:.0f} ms · total {timings['total_ms']:.0f} ms")
         
         # Add assistant response to chat history
         st.session_state.messages.append({
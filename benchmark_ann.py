@@ -0,0 +1,127 @@
+"""
+ANN Recall vs Latency Report
+Compares IVF search against exact search on the local vector store so
+ANN_NLIST / ANN_NPROBE can be chosen with evidence.
+
+Usage:
+    python benchmark_ann.py                      # synthetic clustered corpus
+    python benchmark_ann.py --store data/vector_store --queries 200
+    python benchmark_ann.py --store data/vector_store --namespace work
+"""
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+import config
+from ann_index import IVFIndex, default_nlist
+from vector_store import LocalVectorStore
+
+
+def synthetic_vectors(count: int, dimension: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Generate clustered unit vectors that roughly mimic sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(count, dimension))
+    return vectors.astype(np.float32)
+
+
+def build_store(args) -> LocalVectorStore:
+    """Open an existing store or fill a temporary one with synthetic vectors"""
+    if args.store:
+        return LocalVectorStore(args.store)
+
+    store = LocalVectorStore(tempfile.mkdtemp(prefix="jarvis_ann_"), args.dimension)
+    vectors = synthetic_vectors(args.vectors, args.dimension)
+    batch_size = 10000
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        store.upsert([
+            {'id': f"v{start + i}", 'values': values, 'metadata': {}}
+            for i, values in enumerate(batch)
+        ])
+    return store
+
+
+def measure(store: LocalVectorStore, queries: np.ndarray, top_k: int, nprobe: int):
+    """Return (ids per query, latencies in ms) for one nprobe setting"""
+    store.nprobe = nprobe
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = store.query(query, top_k, include_metadata=False)['matches']
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({match['id'] for match in matches})
+    return results, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="Path of an existing local vector store")
+    parser.add_argument("--namespace", default="", help="Namespace of the store to benchmark (default: the unnamed one)")
+    parser.add_argument("--vectors", type=int, default=200000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=config.EMBEDDING_DIMENSION)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=config.TOP_K_RESULTS)
+    parser.add_argument("--nlist", type=int, default=config.ANN_NLIST)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    store = build_store(args)
+    if args.namespace:
+        store = store._partition(args.namespace)
+        if store is None:
+            print(f"❌ Namespace {args.namespace} does not exist")
+            return
+
+    # Each namespace is a store of its own, so count only this partition's rows
+    count = store._count
+    if count == 0:
+        print("❌ Vector store is empty")
+        return
+
+    vectors = store._matrix[:count]
+    nlist = args.nlist or default_nlist(count)
+    print(f"📊 {count} vectors, dimension {store.dimension}, training IVF with {nlist} clusters...")
+    start = time.perf_counter()
+    store._ann = IVFIndex.train(vectors, nlist)
+    store._ann.add(np.arange(count), vectors)
+    print(f"  Trained in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(count, size=min(args.queries, count), replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    exact, exact_latency = measure(store, queries, args.top_k, nprobe=0)
+    report = [{
+        'nprobe': 0,
+        'recall': 1.0,
+        'p50_ms': float(np.percentile(exact_latency, 50)),
+        'p95_ms': float(np.percentile(exact_latency, 95)),
+    }]
+
+    for nprobe in args.nprobe:
+        approx, latency = measure(store, queries, args.top_k, nprobe)
+        recall = np.mean([len(a & e) / max(len(e), 1) for a, e in zip(approx, exact)])
+        report.append({
+            'nprobe': nprobe,
+            'recall': float(recall),
+            'p50_ms': float(np.percentile(latency, 50)),
+            'p95_ms': float(np.percentile(latency, 95)),
+        })
+
+    print(f"\nRecall@{args.top_k} vs latency (nprobe 0 = exact search)")
+    print(f"{'nprobe':>8} {'recall':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in report:
+        print(f"{row['nprobe']:>8} {row['recall']:>8.3f} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'vectors': count, 'nlist': nlist, 'top_k': args.top_k, 'results': report}, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Embedding Backend Parity and Throughput Report
+Compares the ONNX Runtime backend (fp32 and/or int8) against the PyTorch
+sentence-transformers model so EMBEDDING_BACKEND=onnx can be turned on
+with evidence.
+
+Usage:
+    python benchmark_embeddings.py                        # built-in sample sentences
+    python benchmark_embeddings.py --files notes.md a.pdf --variants int8
+"""
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import config
+
+
+SAMPLE_SENTENCES = [
+    "Meeting notes: the quarterly roadmap review moved to Thursday afternoon.",
+    "Remember to renew the passport before the trip to Lisbon in March.",
+    "The vector store keeps normalized embeddings so cosine similarity is a dot product.",
+    "Grocery list: oat milk, spinach, lentils, coffee beans and dark chocolate.",
+    "Reading summary: the book argues that small habits compound over years.",
+    "TODO: migrate the backup script from cron to a systemd timer.",
+    "Dr. Patel recommended stretching twice a day and a follow-up in six weeks.",
+    "Ideas for the blog: local-first software, retrieval augmented generation, note taking.",
+    "The invoice from the contractor is due on the 15th; ask about the warranty terms.",
+    "Recipe: roast the vegetables at 220 degrees for 25 minutes, then add feta.",
+]
+
+
+def load_corpus(args) -> list:
+    """Chunk the given files, or repeat the sample sentences up to --sentences"""
+    if args.files:
+        from ingestion import DocumentIngestion, create_text_splitter
+        splitter = create_text_splitter()
+        texts = []
+        for path in args.files:
+            texts.extend(splitter.split_text(DocumentIngestion.read_file(path)))
+        return texts[:args.sentences] if args.sentences else texts
+
+    count = args.sentences or 512
+    return [f"{SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]} ({i})" for i in range(count)]
+
+
+def throughput(model, texts: list, batch_size: int, repeats: int):
+    """Return (vectors, sentences per second) for the best of `repeats` runs"""
+    model.embed_documents(texts[:batch_size])  # warm-up
+    best, vectors = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            vectors.extend(model.embed_documents(texts[i:i + batch_size]))
+        best = min(best, time.perf_counter() - start)
+    return np.asarray(vectors, dtype=np.float32), len(texts) / best
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="+", help="Documents to chunk and embed instead of sample sentences")
+    parser.add_argument("--sentences", type=int, default=0, help="Number of texts to embed")
+    parser.add_argument("--variants", nargs="+", choices=["fp32", "int8"], default=["fp32", "int8"])
+    parser.add_argument("--threads", type=int, default=config.ONNX_INTRA_OP_THREADS)
+    parser.add_argument("--batch-size", type=int, default=config.EMBEDDING_BATCH_MAX_SIZE)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-cosine", type=float, default=0.99,
+                        help="Fail if any text's cosine similarity to PyTorch falls below this")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from onnx_embeddings import OnnxEmbeddings
+
+    texts = load_corpus(args)
+    if not texts:
+        print("❌ No texts to embed")
+        return 1
+    print(f"📊 {len(texts)} texts, model {config.EMBEDDING_MODEL}, batch size {args.batch_size}")
+
+    torch_model = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL, model_kwargs={'device': 'cpu'})
+    reference, torch_rate = throughput(torch_model, texts, args.batch_size, args.repeats)
+    report = [{'backend': 'torch', 'sentences_per_sec': torch_rate, 'speedup': 1.0,
+               'min_cosine': 1.0, 'mean_cosine': 1.0}]
+
+    for variant in args.variants:
+        model = OnnxEmbeddings(quantize=(variant == "int8"), threads=args.threads or None)
+        vectors, rate = throughput(model, texts, args.batch_size, args.repeats)
+        similarity = cosine_rows(reference, vectors)
+        report.append({
+            'backend': f"onnx-{variant}",
+            'sentences_per_sec': rate,
+            'speedup': rate / torch_rate,
+            'min_cosine': float(similarity.min()),
+            'mean_cosine': float(similarity.mean()),
+        })
+
+    print(f"\n{'backend':>10} {'sent/s':>9} {'speedup':>8} {'min cos':>8} {'mean cos':>9}")
+    for row in report:
+        print(f"{row['backend']:>10} {row['sentences_per_sec']:>9.1f} {row['speedup']:>7.2f}x "
+              f"{row['min_cosine']:>8.4f} {row['mean_cosine']:>9.4f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'texts': len(texts), 'model': config.EMBEDDING_MODEL, 'results': report}, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+
+    failed = [row['backend'] for row in report if row['min_cosine'] < args.min_cosine]
+    if failed:
+        print(f"\n❌ Parity below {args.min_cosine} for: {', '.join(failed)}")
+        return 1
+    print(f"\n✅ All backends within cosine {args.min_cosine} of PyTorch")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
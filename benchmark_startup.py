@@ -0,0 +1,145 @@
+"""
+Startup Time Report
+Breaks cold-start time down by imported package (from `python -X importtime`)
+and times constructing the components, each run in a fresh interpreter.
+
+Usage:
+    python benchmark_startup.py
+    python benchmark_startup.py --modules streamlit ingestion rag_assistant --top 25
+    python benchmark_startup.py --json startup.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import List
+import numpy as np
+
+
+DEFAULT_MODULES = ["config", "metrics", "model_registry", "ingestion", "rag_assistant"]
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+CONSTRUCT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from ingestion import DocumentIngestion
+from rag_assistant import RAGAssistant
+imported = time.perf_counter()
+ingestion = DocumentIngestion()
+constructed_ingestion = time.perf_counter()
+assistant = RAGAssistant()
+constructed_assistant = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'ingestion_init_ms': (constructed_ingestion - imported) * 1000,
+    'assistant_init_ms': (constructed_assistant - constructed_ingestion) * 1000,
+}))
+"""
+
+
+def run_python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+
+def parse_importtime(stderr: str) -> List[tuple]:
+    """Return (module, self_us, cumulative_us, depth) for every imported module"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def import_profile(modules: List[str]) -> dict:
+    """One cold import of `modules`: total, time per requested module and per package"""
+    result = run_python(["-X", "importtime", "-c", f"import {', '.join(modules)}"])
+    rows = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    packages = defaultdict(int)
+    for module, self_us, _, _ in rows:
+        packages[module.split(".")[0]] += self_us
+    requested = {module: cumulative_us for module, _, cumulative_us, depth in rows
+                 if depth == 0 and module in modules}
+    return {
+        'total_ms': sum(row[1] for row in rows) / 1000,
+        'modules': {module: us / 1000 for module, us in requested.items()},
+        'packages': {package: us / 1000 for package, us in packages.items()},
+    }
+
+
+def construct_profile() -> dict:
+    """Time to import the components and build DocumentIngestion and RAGAssistant"""
+    result = run_python(["-c", CONSTRUCT_SCRIPT])
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_of(runs: List[dict]) -> dict:
+    """Median per key across runs (keys missing from a run count as 0)"""
+    keys = {key for run in runs for key in run}
+    return {key: float(np.median([run.get(key, 0.0) for run in runs])) for key in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to take the median of")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--no-construct", action="store_true", help="Skip timing component construction")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    print(f"⏱️ Importing {', '.join(args.modules)} in {args.runs} fresh interpreters...")
+    try:
+        profiles = [import_profile(args.modules) for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+
+    report = {
+        'modules_requested': args.modules,
+        'total_ms': float(np.median([profile['total_ms'] for profile in profiles])),
+        'modules': median_of([profile['modules'] for profile in profiles]),
+        'packages': median_of([profile['packages'] for profile in profiles]),
+    }
+
+    print(f"\nImport time (median of {args.runs}): {report['total_ms']:.0f} ms")
+    print(f"\n{'module':<24} {'cumulative ms':>14}")
+    for module in args.modules:
+        print(f"{module:<24} {report['modules'].get(module, 0.0):>14.1f}")
+
+    print(f"\n{'package':<24} {'self ms':>14}")
+    heaviest = sorted(report['packages'].items(), key=lambda item: item[1], reverse=True)[:args.top]
+    for package, ms in heaviest:
+        print(f"{package:<24} {ms:>14.1f}")
+
+    if not args.no_construct:
+        try:
+            report['construct'] = median_of([construct_profile() for _ in range(args.runs)])
+        except RuntimeError as e:
+            print(f"\n⚠️ Could not construct components: {e}")
+        else:
+            construct = report['construct']
+            print(f"\nImport + construct: import {construct['import_ms']:.0f} ms, "
+                  f"DocumentIngestion() {construct['ingestion_init_ms']:.0f} ms, "
+                  f"RAGAssistant() {construct['assistant_init_ms']:.0f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
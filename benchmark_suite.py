@@ -0,0 +1,756 @@
+"""
+Offline Benchmark Suite
+Measures ingestion throughput, retrieval and chat latency, peak memory and
+startup time without Pinecone or Ollama: the vector index and the LLM are
+replaced by deterministic in-memory stand-ins, and the corpus is generated.
+Results are written as JSON so two commits can be compared.
+
+Usage:
+    python benchmark_suite.py --output before.json
+    python benchmark_suite.py --output after.json --compare before.json
+    python benchmark_suite.py --embeddings hash --formats txt   # skip the model, measure the plumbing
+    python benchmark_suite.py --index http --index-latency-ms 40 --fault-rate 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import http.server
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import AsyncIterator, Iterator, List
+import numpy as np
+import config
+from metadata_filter import matches_filter
+from vector_store import PineconeVectorStore, VectorStore
+
+
+WORDS = (
+    "backup server deploy cluster invoice meeting roadmap notes passport renew budget review "
+    "quarterly migrate script timer contractor warranty recipe vegetables reading summary habits "
+    "network firewall certificate rotation database replica latency dashboard alert oncall "
+    "runbook incident postmortem release staging production rollback migration schema index"
+).split()
+FORMATS = ('txt', 'pdf', 'docx')
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+class FakePineconeIndex(VectorStore):
+    """In-memory index with the Pinecone call shapes and an optional per-call delay.
+
+    Scores are exact cosine similarities and ties are broken by insertion
+    order, so the same corpus always gives the same matches. Each namespace
+    is a separate in-memory index; metadata filters are applied before scoring.
+    """
+    name = "fake-pinecone"
+
+    def __init__(self, dimension: int = None, latency_ms: float = 0.0):
+        self.dimension = dimension or config.EMBEDDING_DIMENSION
+        self.latency = latency_ms / 1000
+        self._ids: List[str] = []
+        self._rows = {}
+        self._metadata: List[dict] = []
+        self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+        self.calls = {'upsert': 0, 'query': 0, 'delete': 0}
+        self._namespaces = {}
+
+    def _wait(self, call: str):
+        self.calls[call] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _space(self, namespace: str, create: bool = False):
+        if not namespace:
+            return self
+        if create and namespace not in self._namespaces:
+            self._namespaces[namespace] = FakePineconeIndex(self.dimension)
+        return self._namespaces.get(namespace)
+
+    def upsert(self, vectors: List[dict], namespace: str = ""):
+        self._wait('upsert')
+        self._space(namespace, create=True)._write(vectors)
+
+    def _write(self, vectors: List[dict]):
+        rows = []
+        for vector in vectors:
+            values = np.asarray(vector['values'], dtype=np.float32)
+            norm = np.linalg.norm(values)
+            values = values / norm if norm else values
+            if vector['id'] in self._rows:
+                row = self._rows[vector['id']]
+                self._matrix[row] = values
+                self._metadata[row] = vector.get('metadata', {})
+            else:
+                self._rows[vector['id']] = len(self._ids)
+                self._ids.append(vector['id'])
+                self._metadata.append(vector.get('metadata', {}))
+                rows.append(values)
+        if rows:
+            self._matrix = np.vstack([self._matrix, np.stack(rows)])
+
+    def query(self, vector: List[float], top_k: int, include_metadata: bool = True,
+              namespace: str = "", filter: dict = None) -> dict:
+        self._wait('query')
+        space = self._space(namespace)
+        if space is None or not space._ids:
+            return {'matches': []}
+        rows = np.array([row for row, metadata in enumerate(space._metadata) if matches_filter(metadata, filter)],
+                        dtype=np.int64)
+        query = np.asarray(vector, dtype=np.float32)
+        scores = space._matrix[rows] @ (query / (np.linalg.norm(query) or 1.0))
+        order = np.argsort(-scores, kind='stable')[:top_k]
+        return {'matches': [
+            {
+                'id': space._ids[rows[position]],
+                'score': float(scores[position]),
+                'metadata': space._metadata[rows[position]] if include_metadata else {},
+            }
+            for position in order
+        ]}
+
+    def delete(self, ids: List[str], namespace: str = ""):
+        self._wait('delete')
+        space = self._space(namespace)
+        if space is not None:
+            space._remove(ids)
+
+    def _remove(self, ids: List[str]):
+        drop = {self._rows[vector_id] for vector_id in ids if vector_id in self._rows}
+        if not drop:
+            return
+        keep = [row for row in range(len(self._ids)) if row not in drop]
+        self._ids = [self._ids[row] for row in keep]
+        self._metadata = [self._metadata[row] for row in keep]
+        self._matrix = self._matrix[keep]
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+
+    def describe_index_stats(self) -> dict:
+        namespaces = {name: {'vector_count': len(space._ids)}
+                      for name, space in [("", self), *self._namespaces.items()] if space._ids}
+        return {
+            'total_vector_count': sum(stats['vector_count'] for stats in namespaces.values()),
+            'dimension': self.dimension,
+            'namespaces': namespaces,
+        }
+
+
+class FakePineconeServer:
+    """Local HTTP stand-in for a Pinecone index host, with injected latency and faults.
+
+    Serves the data-plane endpoints PineconeVectorStore calls, backed by a
+    FakePineconeIndex. Every request waits `latency_ms`, and a `fault_rate`
+    share of requests fail, in turn with a 503, a 429 carrying Retry-After,
+    or a dropped connection. Bodies over `max_body_bytes` get a 413, as
+    Pinecone rejects requests over 2 MB.
+    """
+
+    FAULTS = ('unavailable', 'throttled', 'dropped')
+
+    def __init__(self, latency_ms: float = 0.0, fault_rate: float = 0.0, seed: int = 0,
+                 max_body_bytes: int = 2 * 1024 * 1024):
+        self.index = FakePineconeIndex()
+        self.latency = latency_ms / 1000
+        self.fault_rate = fault_rate
+        self.max_body_bytes = max_body_bytes
+        self.requests = 0
+        self.faults = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.url = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    def _admit(self) -> str:
+        """Count a request and decide which fault, if any, it gets"""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self._rng.random() >= self.fault_rate:
+                return None
+            fault = self.FAULTS[sum(self.faults.values()) % len(self.FAULTS)]
+            self.faults[fault] += 1
+            return fault
+
+    def _handle(self, path: str, payload: dict) -> tuple:
+        """(status, reply) for one data-plane call"""
+        with self._lock:
+            namespace = payload.get('namespace', "")
+            if path == "/vectors/upsert":
+                self.index.upsert(payload['vectors'], namespace)
+                return 200, {'upsertedCount': len(payload['vectors'])}
+            if path == "/query":
+                return 200, self.index.query(payload['vector'], payload['topK'], payload.get('includeMetadata', True),
+                                             namespace, payload.get('filter'))
+            if path == "/vectors/delete":
+                self.index.delete(payload.get('ids', []), namespace)
+                return 200, {}
+            if path == "/describe_index_stats":
+                stats = self.index.describe_index_stats()
+                return 200, {'totalVectorCount': stats['total_vector_count'], 'dimension': stats['dimension'],
+                             'indexFullness': 0.0,
+                             'namespaces': {name: {'vectorCount': space['vector_count']}
+                                            for name, space in stats['namespaces'].items()}}
+        return 404, {'message': f"Unknown path {path}"}
+
+    def start(self) -> str:
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True   # Headers and body are separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status: int, body: dict, headers: dict = None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                fault = server._admit()
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    if fault == 'dropped':
+                        self.close_connection = True
+                    elif fault == 'unavailable':
+                        self.reply(503, {'message': "injected fault"})
+                    elif fault == 'throttled':
+                        self.reply(429, {'message': "injected fault"}, {'Retry-After': "0.05"})
+                    elif len(body) > server.max_body_bytes:
+                        self.reply(413, {'message': f"Request size {len(body)} exceeds the limit"})
+                    else:
+                        self.reply(*server._handle(self.path, json.loads(body or b"{}")))
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        return self.url
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'faults': dict(self.faults),
+            'peak_in_flight': self.peak_in_flight,
+        }
+
+
+class FakeLLM:
+    """Stands in for LLMHandler with a fixed time to first token and token rate"""
+
+    def __init__(self, first_token_ms: float = 50.0, tokens_per_sec: float = 200.0, answer_tokens: int = 32):
+        self.llm_type = "fake"
+        self.first_token = first_token_ms / 1000
+        self.token_interval = 1 / tokens_per_sec if tokens_per_sec else 0.0
+        self.answer_tokens = answer_tokens
+
+    def is_available(self) -> bool:
+        return True
+
+    def _tokens(self, prompt: str) -> List[str]:
+        # Deterministic answer derived from the prompt
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode('utf-8'), digest_size=4).digest(), 'little')
+        rng = random.Random(seed)
+        return [rng.choice(WORDS) + " " for _ in range(self.answer_tokens)]
+
+    def generate_response(self, prompt: str, priority: int = 0) -> str:
+        tokens = self._tokens(prompt)
+        time.sleep(self.first_token + self.token_interval * (len(tokens) - 1))
+        return "".join(tokens)
+
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        time.sleep(self.first_token)
+        for i, token in enumerate(self._tokens(prompt)):
+            if i:
+                time.sleep(self.token_interval)
+            yield token
+
+    async def agenerate_response(self, prompt: str, priority: int = 0) -> str:
+        tokens = self._tokens(prompt)
+        await asyncio.sleep(self.first_token + self.token_interval * (len(tokens) - 1))
+        return "".join(tokens)
+
+    async def astream_response(self, prompt: str) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token)
+        for i, token in enumerate(self._tokens(prompt)):
+            if i:
+                await asyncio.sleep(self.token_interval)
+            yield token
+
+
+class HashEmbeddings:
+    """Deterministic pseudo-embeddings for measuring everything except the model"""
+
+    def __init__(self, dimension: int = None):
+        self.dimension = dimension or config.EMBEDDING_DIMENSION
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+        values = np.random.default_rng(seed).normal(size=self.dimension)
+        return (values / np.linalg.norm(values)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def synthetic_paragraphs(count: int, rng: random.Random) -> List[str]:
+    """Paragraphs of vocabulary words with the odd ticket number or hostname"""
+    paragraphs = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+            if rng.random() < 0.2:
+                words.insert(rng.randrange(len(words)), f"INC-{rng.randint(1000, 9999)}")
+            if rng.random() < 0.1:
+                words.insert(rng.randrange(len(words)), f"web-{rng.randint(1, 64):02d}.prod")
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+    return paragraphs
+
+
+def write_txt(path: str, paragraphs: List[str]):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n\n".join(paragraphs))
+
+
+def write_docx(path: str, paragraphs: List[str]):
+    from docx import Document as DocxDocument
+    document = DocxDocument()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def write_pdf(path: str, paragraphs: List[str], line_chars: int = 90, lines_per_page: int = 60):
+    """Write a plain text PDF by hand so no PDF writing library is needed"""
+    lines = []
+    for paragraph in paragraphs:
+        words, line = paragraph.split(), ""
+        for word in words:
+            if len(line) + len(word) + 1 > line_chars:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.extend([line, ""])
+
+    def escape(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(pages)} >>")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for page_id, page in zip(page_ids, pages):
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({escape(line)}) Tj T*" for line in page) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+
+    body = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode('latin-1')
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(body)
+
+
+WRITERS = {'txt': write_txt, 'pdf': write_pdf, 'docx': write_docx}
+
+
+def generate_corpus(directory: str, formats, files: int, paragraphs: int, seed: int = 0) -> dict:
+    """Write `files` documents per format; returns {format: [(path, name), ...]}"""
+    rng = random.Random(seed)
+    corpus = {}
+    for fmt in formats:
+        corpus[fmt] = []
+        for i in range(files):
+            path = os.path.join(directory, f"doc{i:03d}.{fmt}")
+            try:
+                WRITERS[fmt](path, synthetic_paragraphs(paragraphs, rng))
+            except ImportError as e:
+                print(f"⚠️ Skipping {fmt} documents: {e}")
+                corpus.pop(fmt)
+                break
+            corpus[fmt].append((path, os.path.basename(path)))
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------------------------
+
+def distribution(samples_ms: List[float]) -> dict:
+    values = np.asarray(samples_ms, dtype=np.float64)
+    if not len(values):
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': int(len(values)),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(values.max()),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_components(args, index: VectorStore):
+    """DocumentIngestion and RAGAssistant wired to the stand-ins"""
+    # No backend is reachable: Pinecone without a key yields no index, which
+    # is then replaced by the fake
+    config.VECTOR_STORE_BACKEND = "pinecone"
+    config.PINECONE_API_KEY = ""
+    config.PINECONE_HOST = None
+    config.ANSWER_CACHE_ENABLED = False
+
+    from ingestion import DocumentIngestion
+    from rag_assistant import RAGAssistant
+
+    if args.embeddings == "hash":
+        ingestion_embeddings = query_embeddings = HashEmbeddings()
+    else:
+        from model_registry import get_ingestion_embeddings, get_query_embeddings
+        ingestion_embeddings, query_embeddings = get_ingestion_embeddings(), get_query_embeddings()
+
+    ingestion = DocumentIngestion(embeddings=ingestion_embeddings)
+    ingestion.index = index
+    assistant = RAGAssistant(embeddings=query_embeddings)
+    assistant.index = index
+    assistant.llm_handler = FakeLLM(args.llm_first_token_ms, args.llm_tokens_per_sec, args.llm_answer_tokens)
+    return ingestion, assistant
+
+
+def bench_ingest(ingestion, corpus: dict) -> dict:
+    """Ingest each format's files one by one with ingest_file"""
+    results = {}
+    for fmt, files in corpus.items():
+        size = sum(os.path.getsize(path) for path, _ in files)
+        chunks, per_file = 0, []
+        start = time.perf_counter()
+        for path, name in files:
+            file_start = time.perf_counter()
+            timings = ingestion.ingest_file(path, f"{fmt}/{name}", force=True)
+            per_file.append((time.perf_counter() - file_start) * 1000)
+            chunks += (timings or {}).get('chunks', 0)
+        seconds = time.perf_counter() - start
+        results[fmt] = {
+            'files': len(files),
+            'chunks': chunks,
+            'megabytes': size / (1024 * 1024),
+            'seconds': seconds,
+            'files_per_sec': len(files) / seconds if seconds else 0.0,
+            'chunks_per_sec': chunks / seconds if seconds else 0.0,
+            'mb_per_sec': size / (1024 * 1024) / seconds if seconds else 0.0,
+            'per_file': distribution(per_file),
+        }
+    return results
+
+
+def sample_queries(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 8))]
+        if rng.random() < 0.2:
+            words.append(f"INC-{rng.randint(1000, 9999)}")
+        queries.append(" ".join(words))
+    return queries
+
+
+def bench_retrieval(assistant, queries: List[str], warmup: int = 5) -> dict:
+    for query in queries[:warmup]:
+        assistant.retrieve_context(query)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        assistant.retrieve_context(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return distribution(latencies)
+
+
+def bench_chat(assistant, queries: List[str]) -> dict:
+    latencies, stages = [], {}
+    for query in queries:
+        start = time.perf_counter()
+        result = assistant.chat(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        for name, value in result.get('timings', {}).items():
+            if name.endswith('_ms'):
+                stages.setdefault(name[:-3], []).append(value)
+    return {
+        **distribution(latencies),
+        'stages_p50': {f"{name}_ms": float(np.percentile(values, 50)) for name, values in stages.items()},
+    }
+
+
+def startup_probe(embeddings: str) -> dict:
+    """Runs in a fresh interpreter: time to import and construct the components"""
+    start = time.perf_counter()
+    import ingestion  # noqa: F401
+    import rag_assistant  # noqa: F401
+    imported = time.perf_counter()
+    args = argparse.Namespace(embeddings=embeddings, llm_first_token_ms=0, llm_tokens_per_sec=0, llm_answer_tokens=1)
+    with tempfile.TemporaryDirectory(prefix="jarvis_startup_") as data_dir:
+        config.DATA_DIR = data_dir
+        build_components(args, FakePineconeIndex())
+        constructed = time.perf_counter()
+    return {'import_ms': (imported - start) * 1000, 'init_ms': (constructed - imported) * 1000}
+
+
+def bench_startup(embeddings: str, repeats: int) -> dict:
+    """Median of `repeats` cold starts, each in its own interpreter"""
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--startup-probe", "--embeddings", embeddings],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if output.returncode != 0:
+            print(f"⚠️ Startup probe failed: {output.stderr.strip().splitlines()[-1:]}")
+            return {}
+        probe = json.loads(output.stdout.strip().splitlines()[-1])
+        runs.append({**probe, 'process_ms': elapsed})
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+
+# ---------------------------------------------------------------------------
+# Reports
+# ---------------------------------------------------------------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """{'a': {'b': 1}} -> {'a.b': 1}, numbers only"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec")
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float = 1.0) -> List[str]:
+    """Print relative changes and return the metrics that regressed beyond `threshold`.
+
+    Timings that moved by less than `min_delta_ms` are never flagged, since
+    sub-millisecond stages swing by large fractions from run to run.
+    """
+    now, before = flatten(current['results']), flatten(baseline['results'])
+    keys = [key for key in now if key in before and (key.endswith("_ms") or key.endswith("_per_sec")
+                                                     or key.endswith("_mb"))]
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}")
+    print(f"{'metric':<44} {'before':>11} {'after':>11} {'change':>8}")
+    for key in sorted(keys):
+        if not before[key]:
+            continue
+        change = (now[key] - before[key]) / before[key]
+        worse = -change if higher_is_better(key) else change
+        noise = key.endswith("_ms") and abs(now[key] - before[key]) < min_delta_ms
+        flag = " ❌" if worse > threshold and not noise else ""
+        if flag:
+            regressions.append(key)
+        print(f"{key:<44} {before[key]:>11.2f} {now[key]:>11.2f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def print_report(report: dict):
+    results = report['results']
+    print(f"\n📊 Benchmark results ({report['commit'] or 'uncommitted'}, embeddings: {report['settings']['embeddings']})")
+    for fmt, row in results.get('ingest', {}).items():
+        print(f"  ingest {fmt:<5} {row['files']:>4} files {row['chunks']:>6} chunks  "
+              f"{row['chunks_per_sec']:>8.1f} chunks/sec {row['mb_per_sec']:>7.2f} MB/s")
+    for name in ('retrieve', 'chat'):
+        row = results.get(name)
+        if row and row.get('count'):
+            print(f"  {name:<12} p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms")
+    if results.get('startup'):
+        startup = results['startup']
+        print(f"  startup      import {startup['import_ms']:.0f} ms, init {startup['init_ms']:.0f} ms, "
+              f"process {startup['process_ms']:.0f} ms")
+    if results.get('peak_rss_mb') is not None:
+        print(f"  peak RSS     {results['peak_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--files", type=int, default=20, help="Documents per format")
+    parser.add_argument("--paragraphs", type=int, default=40, help="Paragraphs per document")
+    parser.add_argument("--queries", type=int, default=200, help="retrieve_context calls")
+    parser.add_argument("--chat-queries", type=int, default=20, help="chat calls")
+    parser.add_argument("--embeddings", choices=("model", "hash"), default="model",
+                        help="The configured embedding model, or hash pseudo-embeddings")
+    parser.add_argument("--index", choices=("memory", "http"), default="memory",
+                        help="In-process fake index, or the real Pinecone client against a local HTTP stand-in")
+    parser.add_argument("--index-latency-ms", type=float, default=0.0, help="Simulated vector index round trip")
+    parser.add_argument("--fault-rate", type=float, default=0.0,
+                        help="Share of HTTP stand-in requests that fail (503, 429 or dropped connection)")
+    parser.add_argument("--llm-first-token-ms", type=float, default=50.0)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--llm-answer-tokens", type=int, default=32)
+    parser.add_argument("--startup-runs", type=int, default=3, help="Cold starts to time (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Exit with status 1 if a metric is this much worse than the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore timing changes smaller than this when looking for regressions")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_probe:
+        print(json.dumps(startup_probe(args.embeddings)))
+        return
+
+    results = {}
+    if args.startup_runs:
+        print("⏱️ Timing cold starts...")
+        results['startup'] = bench_startup(args.embeddings, args.startup_runs)
+
+    with tempfile.TemporaryDirectory(prefix="jarvis_bench_") as workdir:
+        # Manifest, caches, docstore and lexical index all live under DATA_DIR
+        config.DATA_DIR = os.path.join(workdir, "data")
+        corpus_dir = os.path.join(workdir, "corpus")
+        os.makedirs(corpus_dir)
+
+        print(f"📝 Generating {args.files} documents per format ({', '.join(args.formats)})...")
+        corpus = generate_corpus(corpus_dir, args.formats, args.files, args.paragraphs, args.seed)
+
+        server = None
+        if args.index == "http":
+            server = FakePineconeServer(args.index_latency_ms, args.fault_rate, args.seed)
+            index = PineconeVectorStore(host=server.start())
+            backing = server.index
+        else:
+            index = backing = FakePineconeIndex(latency_ms=args.index_latency_ms)
+        ingestion, assistant = build_components(args, index)
+
+        print("📥 Measuring ingestion...")
+        results['ingest'] = bench_ingest(ingestion, corpus)
+
+        print("🔍 Measuring retrieval...")
+        results['retrieve'] = bench_retrieval(assistant, sample_queries(args.queries, args.seed + 1))
+
+        print("💬 Measuring chat...")
+        results['chat'] = bench_chat(assistant, sample_queries(args.chat_queries, args.seed + 2))
+        results['index'] = {'vectors': index.describe_index_stats()['total_vector_count'], 'calls': dict(backing.calls)}
+        if server:
+            results['index']['server'] = server.stats()
+            server.stop()
+
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            **{key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'startup_probe')},
+            'chunk_size': config.CHUNK_SIZE,
+            'chunk_overlap': config.CHUNK_OVERLAP,
+            'embedding_model': config.EMBEDDING_MODEL,
+            'embedding_backend': config.EMBEDDING_BACKEND,
+            'top_k': config.TOP_K_RESULTS,
+            'hybrid_search': config.HYBRID_SEARCH_ENABLED,
+            'docstore': config.DOCSTORE_ENABLED,
+            'dedup': config.DEDUP_ENABLED,
+        },
+        'results': results,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.max_regression:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,22 +11,176 @@ load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "jarvis-assistant")
+PINECONE_HOST = os.getenv("PINECONE_HOST")  # Index host; skips the lookup (also points tests at a stand-in)
+
+# Vector Store Configuration
+# "pinecone" uses the remote Pinecone index, "local" keeps vectors on disk under DATA_DIR
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_VECTOR_STORE_DIR = "vector_store"
+
+# Partitioning
+# Vectors are written to a namespace (per user or collection); searches stay inside one namespace
+# and can be narrowed further with metadata filters (source, file_type, tags, ingested_at).
+# The local store keeps a separate sub-index per namespace under LOCAL_VECTOR_STORE_DIR/namespaces
+DEFAULT_NAMESPACE = os.getenv("JARVIS_NAMESPACE", "")   # "" is the default (unnamed) namespace
+LOCAL_NAMESPACES_DIR = "namespaces"
+FILTERED_LEXICAL_CANDIDATES = 100    # BM25 hits checked against the search scope to keep HYBRID_CANDIDATES
+
+# Remote Vector Store Client
+# One pooled client per process; upserts are split by payload size and sent concurrently,
+# and transient failures (timeouts, 429, 5xx) are retried with jittered exponential backoff
+# Data-plane calls use Pinecone's REST API directly; the pinecone-client SDK only looks up or creates the index
+PINECONE_API_VERSION = os.getenv("PINECONE_API_VERSION", "2024-07")  # Sent as X-Pinecone-API-Version
+PINECONE_POOL_SIZE = 16              # Keep-alive connections to the index host
+PINECONE_TIMEOUT_SECONDS = 30
+UPSERT_BATCH_SIZE = 1000             # Most vectors per upsert request (Pinecone's limit)
+UPSERT_MAX_BATCH_BYTES = 1_900_000   # Request body budget; Pinecone rejects requests over 2 MB
+UPSERT_CONCURRENCY = 8               # Upsert requests in flight at once
+VECTOR_STORE_MAX_ATTEMPTS = 5        # Tries per request, including the first
+VECTOR_STORE_RETRY_BASE_SECONDS = 0.5
+VECTOR_STORE_RETRY_MAX_SECONDS = 10
+
+# Approximate nearest neighbour search for the local store
+# "ivf" trains an inverted-file index once the store is large, "none" always scans exactly
+ANN_INDEX = os.getenv("ANN_INDEX", "ivf")
+ANN_MIN_VECTORS = 50000      # Below this size exact search is fast enough
+ANN_NLIST = 0                # Number of IVF clusters (0 = about 4 * sqrt(n))
+ANN_NPROBE = 16              # Clusters scanned per query; higher = better recall, slower
+ANN_RETRAIN_FACTOR = 4       # Retrain clusters when the store grows this many times
 
 # LLM Configuration
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+LLM_WARMUP = True                  # Load the Ollama model in the background at startup
+LLM_WARMUP_TIMEOUT_SECONDS = 300
+LLM_HEALTH_TTL_SECONDS = 30        # How long an Ollama health probe result is reused
+LLM_HEALTH_TIMEOUT_SECONDS = 1.0
+
+# LLM Scheduling
+# Calls to Ollama wait for one of LLM_MAX_CONCURRENCY slots; interactive chat is served
+# before batch work (chat_many), and requests still queued at their deadline are shed
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))  # Match Ollama's OLLAMA_NUM_PARALLEL
+LLM_INTERACTIVE_QUEUE_SECONDS = 60
+LLM_BATCH_QUEUE_SECONDS = 600
+LLM_BATCH_PROMOTE_SECONDS = 30     # Batch requests waiting this long are served in arrival order
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # How long Ollama keeps the model loaded
+OLLAMA_POOL_SIZE = 8               # Idle keep-alive connections kept to Ollama
+OLLAMA_REQUEST_TIMEOUT_SECONDS = 300
 
 # Embedding Configuration
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIMENSION = 384
 
+# Embedding Backend Configuration
+# "torch" runs the model with sentence-transformers; "onnx" exports it once and runs it with
+# ONNX Runtime (requires onnxruntime + onnx). Check parity first with `python benchmark_embeddings.py`.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = "onnx_models"      # Exported models, under DATA_DIR
+ONNX_QUANTIZE = True                # Dynamic int8 quantization of the exported model
+ONNX_INTRA_OP_THREADS = 0           # 0 = one thread per CPU
+ONNX_MAX_SEQ_LENGTH = 256           # Matches the sentence-transformers max_seq_length for MiniLM
+
+# Embedding Batching Configuration
+# Concurrent embedding calls are merged into one forward pass by a shared scheduler
+EMBEDDING_BATCHING_ENABLED = True
+EMBEDDING_BATCH_MAX_SIZE = 64       # Texts per forward pass
+EMBEDDING_BATCH_MAX_WAIT_MS = 5     # How long to wait for more requests before running a batch
+# Bulk callers (the ingestion pipeline and jobs) already send PIPELINE_EMBED_BATCH_SIZE chunks per
+# call; keep this at least that large, or each call is split into several passes that each queue
+# behind pending queries. A query waits for at most one bulk pass in progress.
+EMBEDDING_BULK_BATCH_MAX_SIZE = 256  # Texts per forward pass for one bulk request
+
+# Embedding Cache Configuration
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_FILE = "embedding_cache.sqlite3"
+EMBEDDING_CACHE_MAX_ENTRIES = 500000
+
 # Text Chunking Configuration
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Bulk Ingestion Pipeline Configuration
+PIPELINE_PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)   # Processes parsing and chunking files
+PIPELINE_UPSERT_WORKERS = 4          # Concurrent vector store upserts
+PIPELINE_EMBED_BATCH_SIZE = 256      # Chunks per embedding model call, across files (see EMBEDDING_BULK_BATCH_MAX_SIZE)
+PIPELINE_EMBED_WAIT_SECONDS = 0.05   # How long the embedder waits to fill a batch
+PIPELINE_QUEUE_SIZE = 2048           # Chunks buffered between parsing and embedding
+PIPELINE_CHECKPOINT_FILES = 50       # Persist the store and manifest every N completed files
+
+# Streaming Extraction Configuration
+STREAM_WINDOW_CHARS = 20 * CHUNK_SIZE  # Text buffered before chunks are emitted
+PDF_PARALLEL_MIN_PAGES = 200         # PDFs with more pages are split across parse workers
+PDF_PAGES_PER_TASK = 100             # Pages per parse task for large PDFs
+
 # Retrieval Configuration
 TOP_K_RESULTS = 3
 
+# Hybrid Search Configuration
+# A BM25 index built at ingest time is searched alongside the vectors and fused with
+# reciprocal rank fusion, so exact identifiers (ticket numbers, hostnames, error codes) are found
+HYBRID_SEARCH_ENABLED = True
+LEXICAL_INDEX_DIR = "lexical_index"
+BM25_K1 = 1.2
+BM25_B = 0.75
+HYBRID_CANDIDATES = 20               # Results taken from each retriever before fusion
+HYBRID_RRF_K = 60
+
+# Context Packing Configuration
+# Retrieved chunks are packed into a fixed token budget so prompt size (and LLM latency) stays bounded
+CONTEXT_TOKEN_BUDGET = 1500          # Tokens of retrieved context per prompt
+CONTEXT_TOKEN_ENCODING = "cl100k_base"
+CONTEXT_MERGE_MIN_OVERLAP = 30       # Characters two chunks must share to be merged
+CONTEXT_TOKEN_CACHE_SIZE = 10000     # Cached token counts
+
+# Batch Query Configuration
+QUERY_MANY_CONCURRENCY = 8       # Concurrent vector searches against a remote store
+CHAT_MANY_LLM_CONCURRENCY = 4    # Concurrent LLM calls in chat_many
+
+# Async Pipeline (achat / aretrieve_context / agenerate_answer)
+# Per-stage timeouts; remote searches and LLM calls use asyncio connections, local-store searches a thread pool
+ASYNC_EMBED_TIMEOUT_SECONDS = 10
+ASYNC_SEARCH_TIMEOUT_SECONDS = 10
+ASYNC_LLM_TIMEOUT_SECONDS = 120
+ASYNC_QUERY_WORKERS = max(2, os.cpu_count() or 2)   # Threads running async searches on the local store
+
+# Docstore Configuration
+# Chunk text lives in a local SQLite docstore; vectors only carry ids and small filterable fields
+DOCSTORE_ENABLED = True
+DOCSTORE_FILE = "docstore.sqlite3"
+
+# Deduplication Configuration
+# Identical chunks (signatures, pasted runbooks) are stored and embedded once and shared
+# between the files that contain them (requires the docstore)
+DEDUP_ENABLED = True
+# Also share the vector of a near-identical chunk. The variant's own text is then not stored
+# or indexed, so words only it contains (a ticket number, a hostname) cannot be found
+DEDUP_NEAR_DUPLICATES = False
+DEDUP_MAX_HAMMING = 3                # SimHash bits near-duplicates may differ by (at most 3 with 4 bands)
+DEDUP_MIN_CHARS = 200                # Shorter chunks are only treated as near-duplicates when identical
+
+# Answer Cache Configuration
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_FILE = "answer_cache.sqlite3"
+ANSWER_CACHE_SIMILARITY = 0.95          # Minimum cosine similarity between queries for a hit
+ANSWER_CACHE_TTL_SECONDS = 7 * 24 * 3600
+ANSWER_CACHE_MAX_ENTRIES = 5000
+
+# Background Ingestion Jobs
+# Uploads are queued in SQLite and ingested by a background worker that checkpoints
+# its position in the file, so a restart resumes where it stopped
+JOBS_FILE = "ingestion_jobs.sqlite3"
+JOBS_CHECKPOINT_CHUNKS = 256         # Persist the stores and the resume point every N stored chunks
+JOBS_POLL_SECONDS = 1.0              # How often an idle worker looks for queued jobs
+JOBS_UI_REFRESH_SECONDS = 2          # How often the sidebar refreshes job progress
+
+# Metrics Configuration
+# Per-stage timings of chats and ingested files, kept as in-memory histograms
+METRICS_ENABLED = True
+METRICS_WINDOW = 1000                # Recent observations used for p50/p95/p99
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Serve /metrics for Prometheus when set
+
 # Paths
 UPLOAD_DIR = "uploaded_files"
 DATA_DIR = "data"
+MANIFEST_FILE = "ingestion_manifest.json"
@@ -0,0 +1,113 @@
+"""
+Context Packer Module
+Fits retrieved chunks into a token budget before they are put in the prompt
+"""
+from functools import lru_cache
+from typing import List, Optional
+import config
+
+
+def merge_overlap(first: str, second: str, min_overlap: int) -> Optional[str]:
+    """Join two chunks if the end of `first` is the start of `second`.
+
+    The splitter repeats up to CHUNK_OVERLAP characters between neighbouring
+    chunks, so adjacent chunks share an exact suffix/prefix. Returns the
+    merged text, or None when they do not overlap by at least `min_overlap`.
+    """
+    if len(second) < min_overlap:
+        return None
+    head = second[:min_overlap]
+    position = first.find(head, max(0, len(first) - len(second)))
+    while position != -1:
+        if second.startswith(first[position:]):
+            return first[:position] + second
+        position = first.find(head, position + 1)
+    return None
+
+
+class ContextPacker:
+    """Packs the highest-scoring contexts into a fixed token budget.
+
+    Contexts are taken in score order. A context that overlaps one already
+    taken from the same source is merged into it, and only the extra tokens
+    count against the budget. Token counts are cached per text, and if
+    tiktoken or its encoding is unavailable, counts fall back to an estimate
+    of four characters per token.
+    """
+
+    def __init__(self, budget: int = None, encoding: str = None, min_overlap: int = None,
+                 cache_size: int = None):
+        self.budget = budget or config.CONTEXT_TOKEN_BUDGET
+        self.encoding_name = encoding or config.CONTEXT_TOKEN_ENCODING
+        self.min_overlap = min_overlap or config.CONTEXT_MERGE_MIN_OVERLAP
+        self._encoding = None
+        self._encoding_loaded = False
+        self.count_tokens = lru_cache(maxsize=cache_size or config.CONTEXT_TOKEN_CACHE_SIZE)(self._count)
+
+    @property
+    def encoding(self):
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                print(f"⚠️ tiktoken unavailable ({e}), estimating token counts")
+        return self._encoding
+
+    def measure(self, text: str) -> int:
+        """Token count of a one-off text (e.g. a whole prompt), bypassing the cache"""
+        return self._count(text)
+
+    def _count(self, text: str) -> int:
+        if self.encoding is None:
+            return (len(text) + 3) // 4
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut a text down to at most `max_tokens` tokens"""
+        if self.encoding is None:
+            return text[:max_tokens * 4]
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return self.encoding.decode(tokens[:max_tokens])
+
+    def pack(self, contexts: List[dict], budget: int = None) -> List[dict]:
+        """Return the contexts that fit the budget, merged where they overlap"""
+        budget = budget or self.budget
+        packed = []
+        used = 0
+
+        for ctx in sorted(contexts, key=lambda c: c.get('score', 0), reverse=True):
+            text = ctx.get('text', '')
+            if not text:
+                continue
+
+            merged = False
+            for entry in packed:
+                if entry['source'] != ctx.get('source'):
+                    continue
+                combined = (merge_overlap(entry['text'], text, self.min_overlap)
+                            or merge_overlap(text, entry['text'], self.min_overlap))
+                if combined is None:
+                    continue
+                merged = True
+                extra = self.count_tokens(combined) - self.count_tokens(entry['text'])
+                if used + extra <= budget:
+                    entry['text'] = combined
+                    entry['ids'].append(ctx.get('id'))
+                    used += extra
+                break
+            if merged:
+                continue
+
+            tokens = self.count_tokens(text)
+            if used + tokens > budget:
+                if not packed:
+                    # Always keep the best chunk, cut to fit
+                    packed.append({**ctx, 'text': self.truncate(text, budget), 'ids': [ctx.get('id')]})
+                    used = budget
+                continue
+            packed.append({**ctx, 'ids': [ctx.get('id')]})
+            used += tokens
+
+        return packed
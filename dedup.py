@@ -0,0 +1,106 @@
+"""
+Dedup Module
+SimHash fingerprints for spotting exact and near-duplicate chunks
+"""
+import hashlib
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, List, Optional
+import numpy as np
+import config
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+BANDS = 4
+BAND_BITS = 64 // BANDS
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles; similar texts differ in few bits"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    hashes = np.frombuffer(
+        b"".join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles),
+        dtype=np.uint8
+    ).reshape(-1, 8)
+    bits = np.unpackbits(hashes, axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int.from_bytes(np.packbits(votes > 0, bitorder='little').tobytes(), 'little')
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def bands(fingerprint: int) -> List[int]:
+    """Split a fingerprint into bands; fingerprints within BANDS - 1 bits share one"""
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (BAND_BITS * i)) & mask for i in range(BANDS)]
+
+
+def to_signed(fingerprint: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def from_signed(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def is_near_duplicate_candidate(text: str) -> bool:
+    """Short chunks are only deduplicated when identical"""
+    return len(text) >= config.DEDUP_MIN_CHARS
+
+
+class NearDuplicateIndex:
+    """In-memory SimHash index of chunks planned but not yet stored.
+
+    Lets files ingested in the same run share boilerplate before any of it
+    has reached the docstore. Like DocStore.find_duplicate, only exact
+    copies match unless `near` (default config.DEDUP_NEAR_DUPLICATES) is set.
+    """
+
+    def __init__(self, max_distance: int = None, near: bool = None):
+        self.max_distance = config.DEDUP_MAX_HAMMING if max_distance is None else max_distance
+        self.near = near
+        self._exact = defaultdict(list)
+        self._bands = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, vector_id: str, text_hash: str, text: str):
+        with self._lock:
+            self._exact[text_hash].append(vector_id)
+            if is_near_duplicate_candidate(text):
+                fingerprint = simhash(text)
+                for band, value in enumerate(bands(fingerprint)):
+                    self._bands[(band, value)].append((fingerprint, vector_id))
+
+    def find(self, text_hash: str, text: str, accept: Callable[[str], bool] = None) -> Optional[str]:
+        """Id of a planned chunk this text duplicates; only ids passing `accept` are considered"""
+        near = config.DEDUP_NEAR_DUPLICATES if self.near is None else self.near
+        accept = accept or (lambda vector_id: True)
+        with self._lock:
+            for vector_id in self._exact.get(text_hash, ()):
+                if accept(vector_id):
+                    return vector_id
+            if not near or not is_near_duplicate_candidate(text):
+                return None
+
+            fingerprint = simhash(text)
+            best, best_distance = None, self.max_distance + 1
+            for band, value in enumerate(bands(fingerprint)):
+                for other, vector_id in self._bands.get((band, value), ()):
+                    distance = hamming(fingerprint, other)
+                    if distance < best_distance and accept(vector_id):
+                        best, best_distance = vector_id, distance
+            return best
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            self._bands.clear()
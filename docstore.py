@@ -0,0 +1,224 @@
+"""
+Docstore Module
+Local SQLite store of chunk text and metadata, keyed by vector id
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import config
+from dedup import BANDS, bands, from_signed, hamming, is_near_duplicate_candidate, simhash, to_signed
+
+
+class DocStore:
+    """Chunk text and metadata kept next to the app instead of in the vector index.
+
+    Vectors then only carry their id and small filterable fields, so queries
+    return a few bytes per match and the top-k texts are bulk-fetched here.
+    Texts are zlib-compressed and stored once per distinct content, so the
+    same paragraph in several files (or re-ingested under a new id) takes
+    space only once; a text is dropped when its last chunk is deleted.
+
+    Each chunk also gets a SimHash fingerprint, banded so near-duplicates can
+    be found with an index lookup (when DEDUP_NEAR_DUPLICATES is set), and a
+    list of the source files that refer to it when ingestion shares one chunk
+    between several files.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(config.DATA_DIR, config.DOCSTORE_FILE)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, text_hash TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_text_hash ON chunks(text_hash)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS texts (hash TEXT PRIMARY KEY, body BLOB NOT NULL)")
+        band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(BANDS))
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS fingerprints (id TEXT PRIMARY KEY, simhash INTEGER NOT NULL, {band_columns})"
+        )
+        for i in range(BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_band{i} ON fingerprints(band{i})")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs (id TEXT NOT NULL, source TEXT NOT NULL, PRIMARY KEY (id, source))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def put_many(self, records: List[Tuple[str, str, dict]]):
+        """Store (vector id, text, metadata) records, replacing existing ids"""
+        if not records:
+            return
+
+        chunk_rows, text_rows, fingerprint_rows, ref_rows = [], {}, [], []
+        for vector_id, text, metadata in records:
+            text_hash = self._text_hash(text)
+            chunk_rows.append((vector_id, text_hash, json.dumps(metadata)))
+            if text_hash not in text_rows:
+                text_rows[text_hash] = zlib.compress(text.encode('utf-8'))
+            if is_near_duplicate_candidate(text):
+                fingerprint = simhash(text)
+                fingerprint_rows.append((vector_id, to_signed(fingerprint), *bands(fingerprint)))
+            if metadata.get('source'):
+                ref_rows.append((vector_id, metadata['source']))
+
+        placeholders = ", ".join("?" * (BANDS + 2))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO texts (hash, body) VALUES (?, ?)", list(text_rows.items())
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, text_hash, metadata) VALUES (?, ?, ?)", chunk_rows
+            )
+            self._conn.executemany(f"INSERT OR REPLACE INTO fingerprints VALUES ({placeholders})", fingerprint_rows)
+            self._conn.executemany("INSERT OR IGNORE INTO refs (id, source) VALUES (?, ?)", ref_rows)
+            self._conn.commit()
+
+    def find_duplicate(self, text: str, max_distance: int = None, near: bool = None,
+                       accept: Callable[[str], bool] = None) -> Optional[str]:
+        """Id of a stored chunk with the same text, or with `near`, a near-identical one.
+
+        Only chunks whose id passes `accept` are considered, so a caller can
+        keep to its own namespace. Near-duplicate matching is off unless
+        config.DEDUP_NEAR_DUPLICATES is set.
+        """
+        max_distance = config.DEDUP_MAX_HAMMING if max_distance is None else max_distance
+        near = config.DEDUP_NEAR_DUPLICATES if near is None else near
+        accept = accept or (lambda vector_id: True)
+        with self._lock:
+            for (vector_id,) in self._conn.execute(
+                "SELECT id FROM chunks WHERE text_hash = ?", (self._text_hash(text),)
+            ):
+                if accept(vector_id):
+                    return vector_id
+            if not near or not is_near_duplicate_candidate(text):
+                return None
+
+            fingerprint = simhash(text)
+            where = " OR ".join(f"band{i} = ?" for i in range(BANDS))
+            rows = self._conn.execute(
+                f"SELECT id, simhash FROM fingerprints WHERE {where}", bands(fingerprint)
+            ).fetchall()
+
+        best, best_distance = None, max_distance + 1
+        for vector_id, other in rows:
+            distance = hamming(fingerprint, from_signed(other))
+            if distance < best_distance and accept(vector_id):
+                best, best_distance = vector_id, distance
+        return best
+
+    def existing(self, ids: Iterable[str]) -> Set[str]:
+        """The subset of ids that are stored"""
+        ids = list(dict.fromkeys(ids))
+        found = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT id FROM chunks WHERE id IN ({placeholders})", batch
+                ))
+        return found
+
+    def add_refs(self, ids: Iterable[str], source: str):
+        """Record that a source file also refers to these chunks"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO refs (id, source) VALUES (?, ?)", [(vector_id, source) for vector_id in ids]
+            )
+            self._conn.commit()
+
+    def remove_refs(self, ids: Iterable[str], source: str):
+        """Forget a source file's reference to chunks that other files still use"""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM refs WHERE id = ? AND source = ?", [(vector_id, source) for vector_id in ids]
+            )
+            self._conn.commit()
+
+    def get_many(self, ids: List[str]) -> Dict[str, dict]:
+        """Return {id: {'text', 'metadata', 'sources'}} for the ids found in the store"""
+        found = {}
+        unique_ids = list(dict.fromkeys(ids))
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(unique_ids), 500):
+                batch = unique_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunks.id, texts.body, chunks.metadata FROM chunks "
+                    f"JOIN texts ON texts.hash = chunks.text_hash WHERE chunks.id IN ({placeholders})", batch
+                ).fetchall()
+                for vector_id, body, metadata in rows:
+                    found[vector_id] = {
+                        'text': zlib.decompress(body).decode('utf-8'),
+                        'metadata': json.loads(metadata),
+                        'sources': [],
+                    }
+                for vector_id, source in self._conn.execute(
+                    f"SELECT id, source FROM refs WHERE id IN ({placeholders}) ORDER BY rowid", batch
+                ):
+                    if vector_id in found:
+                        found[vector_id]['sources'].append(source)
+        return found
+
+    def delete(self, ids: List[str]):
+        """Remove chunks and any texts no other chunk refers to"""
+        if not ids:
+            return
+
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                hashes = [row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT text_hash FROM chunks WHERE id IN ({placeholders})", batch
+                )]
+                self._conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM fingerprints WHERE id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM refs WHERE id IN ({placeholders})", batch)
+                self._conn.executemany(
+                    "DELETE FROM texts WHERE hash = ? AND NOT EXISTS "
+                    "(SELECT 1 FROM chunks WHERE text_hash = ?)",
+                    [(text_hash, text_hash) for text_hash in hashes]
+                )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Number of chunks, distinct texts and compressed text bytes"""
+        with self._lock:
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            texts, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM texts").fetchone()
+        return {'chunks': chunks, 'texts': texts, 'compressed_bytes': size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_docstore = None
+_docstore_lock = threading.Lock()
+
+
+def get_docstore() -> DocStore:
+    """Process-wide docstore shared by ingestion and retrieval"""
+    global _docstore
+    with _docstore_lock:
+        if _docstore is None:
+            _docstore = DocStore()
+        return _docstore
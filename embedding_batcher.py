@@ -0,0 +1,165 @@
+"""
+Embedding Batcher Module
+Micro-batching scheduler that merges concurrent embedding requests into one forward pass
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+import config
+
+
+QUERY_PRIORITY = 0
+BULK_PRIORITY = 1
+
+
+class _Request:
+    __slots__ = ('texts', 'future', 'submitted_at')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """Collects embedding requests for a short window and runs them together.
+
+    A single worker thread owns the model. It waits for the first request,
+    then keeps gathering requests for up to `max_wait_ms` or until
+    `max_batch_size` texts are queued, runs one `embed_documents` call and
+    resolves every caller's future. Query requests are always taken before
+    bulk (ingestion) requests. Bulk work is split into pieces of at most
+    `bulk_batch_size` texts; a piece larger than one batch runs on its own,
+    so callers that already send full batches keep them in one pass and a
+    query waits for at most one bulk piece in progress.
+    """
+
+    def __init__(self, model, max_batch_size: int = None, max_wait_ms: float = None,
+                 bulk_batch_size: int = None):
+        self.model = model
+        self.max_batch_size = max_batch_size or config.EMBEDDING_BATCH_MAX_SIZE
+        self.bulk_batch_size = max(bulk_batch_size or config.EMBEDDING_BULK_BATCH_MAX_SIZE, self.max_batch_size)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else config.EMBEDDING_BATCH_MAX_WAIT_MS) / 1000
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+        self.batches = 0
+        self.texts = 0
+
+    def submit(self, texts: List[str], priority: int = QUERY_PRIORITY) -> Future:
+        """Queue texts for embedding; the future resolves to their vectors"""
+        size = self.bulk_batch_size if priority == BULK_PRIORITY else self.max_batch_size
+        pieces = [texts[i:i + size] for i in range(0, len(texts), size)]
+        requests = [_Request(piece) for piece in pieces]
+
+        with self._condition:
+            for request in requests:
+                heapq.heappush(self._queue, (priority, next(self._sequence), request))
+            self._condition.notify()
+
+        if len(requests) == 1:
+            return requests[0].future
+        return _gather([request.future for request in requests])
+
+    def _take_batch(self) -> List[_Request]:
+        """Pop requests until the batch is full or the wait window closes"""
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+
+            deadline = time.perf_counter() + self.max_wait
+            batch, size = [], 0
+            while True:
+                while self._queue and size + len(self._queue[0][2].texts) <= self.max_batch_size:
+                    request = heapq.heappop(self._queue)[2]
+                    batch.append(request)
+                    size += len(request.texts)
+                if not batch and self._queue:
+                    # A single oversized request (such as a full bulk piece) runs on its own
+                    batch.append(heapq.heappop(self._queue)[2])
+                    break
+
+                remaining = deadline - time.perf_counter()
+                if size >= self.max_batch_size or self._queue or remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = self.model.embed_documents(texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'texts': self.texts,
+            'mean_batch_size': self.texts / self.batches if self.batches else 0.0,
+            'queued': len(self._queue),
+        }
+
+
+def _gather(futures: List[Future]) -> Future:
+    """Combine futures of vector lists into one future of the concatenation"""
+    combined = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] or combined.done():
+                return
+        try:
+            combined.set_result([vector for future in futures for vector in future.result()])
+        except Exception as e:
+            combined.set_exception(e)
+
+    for future in futures:
+        future.add_done_callback(_done)
+    return combined
+
+
+class BatchedEmbeddings:
+    """Embeddings interface that routes every call through an EmbeddingBatcher"""
+
+    def __init__(self, batcher: EmbeddingBatcher, priority: int = QUERY_PRIORITY):
+        self.batcher = batcher
+        self.priority = priority
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.batcher.submit(list(texts), self.priority).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit([text], self.priority).result()[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return await asyncio.wrap_future(self.batcher.submit(list(texts), self.priority))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vectors = await asyncio.wrap_future(self.batcher.submit([text], self.priority))
+        return vectors[0]
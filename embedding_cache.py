@@ -0,0 +1,137 @@
+"""
+Embedding Cache Module
+Persistent, content-addressed cache of chunk embeddings backed by SQLite
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+import config
+from model_registry import embedding_model_id
+
+
+class EmbeddingCache:
+    """Disk-backed embedding cache keyed by hash(model name + text).
+
+    Entries are evicted least-recently-used first once the cache holds more
+    than `max_entries` embeddings. Hit and miss counters are kept for the
+    lifetime of the object.
+    """
+
+    def __init__(self, path: str = None, model_name: str = None, max_entries: int = None):
+        self.path = path or os.path.join(config.DATA_DIR, config.EMBEDDING_CACHE_FILE)
+        self.model_name = model_name or embedding_model_id()
+        self.max_entries = max_entries or config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def key(self, text: str) -> str:
+        """Content address of a text for the configured model"""
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, List[float]]:
+        """Return {position: embedding} for the texts found in the cache"""
+        keys = [self.key(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            unique_keys = list(set(keys))
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            results = {i: found[key] for i, key in enumerate(keys) if key in found}
+            self.hits += len(results)
+            self.misses += len(texts) - len(results)
+        return results
+
+    def put_many(self, texts: List[str], embeddings: List[List[float]]):
+        """Store embeddings and evict the least recently used overflow"""
+        now = time.time()
+        rows = [
+            (self.key(text), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            overflow = self._size() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (overflow,)
+                )
+            self._conn.commit()
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            size = self._size()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': size,
+            'max_entries': self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def embed_with_cache(embeddings, texts: List[str], cache: Optional[EmbeddingCache]) -> List[List[float]]:
+    """Embed texts, computing only cache misses in a single model batch"""
+    if cache is None:
+        return embeddings.embed_documents(texts)
+
+    cached = cache.get_many(texts)
+    missing = [i for i in range(len(texts)) if i not in cached]
+
+    if missing:
+        # Identical texts within one call are embedded once
+        unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+        computed = dict(zip(unique_texts, embeddings.embed_documents(unique_texts)))
+        cache.put_many(unique_texts, [computed[text] for text in unique_texts])
+        for i in missing:
+            cached[i] = computed[texts[i]]
+
+    return [cached[i] for i in range(len(texts))]
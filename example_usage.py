@@ -22,10 +22,14 @@ def example_ingestion():
     folder_path = "data"  # Change this to your folder path
     
     if os.path.exists(folder_path):
+        files = []
         for filename in os.listdir(folder_path):
             file_path = os.path.join(folder_path, filename)
             if os.path.isfile(file_path):
-                ingestion.ingest_file(file_path, filename)
+                files.append((file_path, filename))
+        
+        # Parse, embed and upsert files in parallel
+        ingestion.ingest_files(files)
     else:
         print(f"Folder {folder_path} does not exist. Create it and add files.")
 
@@ -45,9 +49,9 @@ def example_chat():
         "What did I write about AI?"
     ]
     
-    for query in queries:
-        print(f"\n📝 Query: {query}")
-        response = assistant.chat(query)
+    # Embed all queries in one batch and answer them concurrently
+    for response in assistant.chat_many(queries):
+        print(f"\n📝 Query: {response['query']}")
         print(f"🤖 Answer: {response['answer']}")
         if response['sources']:
             print(f"📚 Sources: {', '.join(set(response['sources']))}")
@@ -0,0 +1,379 @@
+"""
+HTTP Pool Module
+Keep-alive connection pools (blocking and asyncio) and retry helpers shared by the HTTP clients
+"""
+import asyncio
+import http.client
+import json
+import queue
+import random
+from typing import AsyncIterator, Optional
+from urllib.parse import urlparse
+
+
+# Statuses worth retrying: rate limiting and server-side hiccups
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# What a dropped, reset or timed-out connection raises, from http.client or asyncio streams
+_CONNECTION_ERRORS = (http.client.HTTPException, OSError, EOFError, asyncio.TimeoutError)
+
+
+class HTTPStatusError(Exception):
+    """Non-2xx response; `retry_after` is the server's hint in seconds, if any"""
+
+    def __init__(self, status: int, detail: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {detail[:200]}")
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed request may succeed if sent again"""
+    if isinstance(error, HTTPStatusError):
+        return error.status in TRANSIENT_STATUSES
+    # Dropped connections, resets and timeouts
+    return isinstance(error, _CONNECTION_ERRORS)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, error: Exception = None) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based).
+
+    A Retry-After hint from the server is honoured, up to `cap`.
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_base_url(base_url: str) -> tuple:
+    """(https, host, port, path prefix) of a base URL; the scheme defaults to https"""
+    url = urlparse(base_url if "://" in base_url else f"https://{base_url}")
+    https = url.scheme == "https"
+    return https, url.hostname or "localhost", url.port or (443 if https else 80), url.path.rstrip("/")
+
+
+class HTTPPool:
+    """A small pool of persistent connections to one host.
+
+    Connections are checked out per request and returned afterwards, so
+    concurrent callers each get their own and sequential callers reuse one
+    instead of paying a TCP (and TLS) handshake per request. A pooled
+    connection the server has since closed is replaced transparently.
+    """
+
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 30.0, headers: dict = None):
+        self.base_url = base_url
+        self._https, self._host, self._port, self._prefix = _parse_base_url(base_url)
+        self.timeout = timeout
+        self.headers = {"Connection": "keep-alive", **(headers or {})}
+        self._pool = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return connection_class(self._host, self._port, timeout=self.timeout)
+
+    def _checkout(self):
+        """Return (connection, reused)"""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool = True):
+        """Return a connection whose response was fully read, or close it"""
+        if not reusable:
+            connection.close()
+            return
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None) -> tuple:
+        """Send a request and return (connection, response) with the body unread.
+
+        The caller reads the response and hands the connection back with
+        release().
+        """
+        headers = {**self.headers, **(headers or {})}
+        connection, reused = self._checkout()
+        try:
+            connection.request(method, self._prefix + path, body=body, headers=headers)
+            return connection, connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            if not reused:
+                raise
+        # The server closed an idle pooled connection; retry once on a fresh one
+        connection = self._connect()
+        try:
+            connection.request(method, self._prefix + path, body=body, headers=headers)
+            return connection, connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            raise
+
+    def request_json(self, method: str, path: str, payload=None) -> dict:
+        """Send a JSON request (or pre-encoded bytes) and decode the JSON reply.
+
+        Raises HTTPStatusError on a non-2xx status.
+        """
+        body = payload if isinstance(payload, bytes) or payload is None else json.dumps(payload).encode('utf-8')
+        connection, response = self.request(method, path, body, {"Content-Type": "application/json"})
+        try:
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self.release(connection, reusable=False)
+            raise
+        self.release(connection, reusable=not response.will_close)
+
+        if not 200 <= response.status < 300:
+            raise HTTPStatusError(response.status, data.decode('utf-8', 'replace'),
+                                  _retry_after(response.getheader('Retry-After')))
+        return json.loads(data) if data.strip() else {}
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class AsyncResponse:
+    """Status, headers and body of an HTTP/1.1 response read from an asyncio stream.
+
+    The body is read incrementally, de-chunked when the server streams it,
+    and every read is bounded by `timeout`.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, status: int, headers: dict, timeout: float):
+        self.status = status
+        self.headers = headers
+        self._reader = reader
+        self._timeout = timeout
+        self._chunked = headers.get('transfer-encoding', '').lower() == 'chunked'
+        length = headers.get('content-length')
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        self._chunk_left = 0
+        self._eof = status in (204, 304) or self._remaining == 0
+        self.will_close = headers.get('connection', '').lower() == 'close' or (
+            not self._chunked and self._remaining is None)
+
+    @property
+    def reusable(self) -> bool:
+        """Whether the body was read to the end and the server keeps the connection open"""
+        return self._eof and not self.will_close
+
+    async def _read(self, size: int) -> bytes:
+        data = await asyncio.wait_for(self._reader.read(size), self._timeout)
+        if not data:
+            raise asyncio.IncompleteReadError(b"", size)
+        return data
+
+    async def _readline(self) -> bytes:
+        return await asyncio.wait_for(self._reader.readline(), self._timeout)
+
+    async def read_some(self) -> bytes:
+        """The next piece of the body, or b"" once it has been read completely"""
+        if self._eof:
+            return b""
+        if self._chunked:
+            if self._chunk_left == 0:
+                size = int((await self._readline()).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # Skip trailers up to the blank line that ends the message
+                    while (await self._readline()).strip():
+                        pass
+                    self._eof = True
+                    return b""
+                self._chunk_left = size
+            data = await self._read(min(self._chunk_left, 65536))
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                await asyncio.wait_for(self._reader.readexactly(2), self._timeout)
+            return data
+        if self._remaining is None:
+            # No length: the body runs until the server closes the connection
+            data = await asyncio.wait_for(self._reader.read(65536), self._timeout)
+            self._eof = not data
+            return data
+        data = await self._read(min(self._remaining, 65536))
+        self._remaining -= len(data)
+        self._eof = self._remaining == 0
+        return data
+
+    async def read(self) -> bytes:
+        parts = []
+        while True:
+            data = await self.read_some()
+            if not data:
+                return b"".join(parts)
+            parts.append(data)
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        """Yield the body line by line as it arrives (for NDJSON streams)"""
+        buffer = b""
+        while True:
+            data = await self.read_some()
+            if not data:
+                break
+            buffer += data
+            *complete, buffer = buffer.split(b"\n")
+            for line in complete:
+                yield line
+        if buffer:
+            yield buffer
+
+
+class AsyncHTTPPool:
+    """asyncio counterpart of HTTPPool, built on asyncio streams.
+
+    Requests hold no thread while they wait on the network, so concurrency is
+    not bounded by an executor. Connections belong to the event loop that
+    opened them, so they are pooled per loop: at most `size` are open at once
+    (further requests wait for one without blocking) and they are dropped
+    with the loop.
+    """
+
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 30.0, headers: dict = None):
+        self.base_url = base_url
+        self._https, self._host, self._port, self._prefix = _parse_base_url(base_url)
+        self._host_header = self._host if self._port in (80, 443) else f"{self._host}:{self._port}"
+        self.size = size
+        self.timeout = timeout
+        self.headers = {"Connection": "keep-alive", **(headers or {})}
+        self._loops = {}   # event loop -> (idle [(reader, writer)], semaphore of `size` connections)
+
+    async def _connect(self) -> tuple:
+        ssl_context = None
+        if self._https:
+            import ssl
+            ssl_context = ssl.create_default_context()
+        return await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port, ssl=ssl_context), self.timeout
+        )
+
+    def _loop_state(self) -> tuple:
+        """(idle connections, connection semaphore) of the running loop, forgetting closed loops"""
+        for loop in [loop for loop in self._loops if loop.is_closed()]:
+            del self._loops[loop]
+        loop = asyncio.get_running_loop()
+        if loop not in self._loops:
+            self._loops[loop] = ([], asyncio.Semaphore(self.size))
+        return self._loops[loop]
+
+    def _checkout(self) -> Optional[tuple]:
+        idle, _ = self._loop_state()
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def release(self, connection: tuple, reusable: bool = True):
+        """Return a connection to the pool, or close it.
+
+        Only pass reusable=True once the response was read to the end
+        (AsyncResponse.reusable); unread bytes would corrupt the next response.
+        """
+        reader, writer = connection
+        idle, slots = self._loop_state()
+        if reusable and not writer.is_closing() and len(idle) < self.size:
+            idle.append(connection)
+        else:
+            writer.close()
+        slots.release()
+
+    async def _send(self, connection: tuple, method: str, path: str, body: bytes, headers: dict) -> AsyncResponse:
+        reader, writer = connection
+        headers = {"Host": self._host_header, **self.headers, **(headers or {}),
+                   "Content-Length": str(len(body or b""))}
+        head = f"{method} {self._prefix + path} HTTP/1.1\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        ) + "\r\n"
+        writer.write(head.encode('latin-1') + (body or b""))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before a response was received")
+        status = int(status_line.split(None, 2)[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        return AsyncResponse(reader, status, response_headers, self.timeout)
+
+    async def request(self, method: str, path: str, body: bytes = None, headers: dict = None) -> tuple:
+        """Send a request and return (connection, response) with the body unread.
+
+        The caller reads the response and hands the connection back with
+        release(), which also lets the next waiting request open one.
+        """
+        _, slots = self._loop_state()
+        await slots.acquire()
+        try:
+            connection = self._checkout()
+            if connection is not None:
+                try:
+                    return connection, await asyncio.wait_for(
+                        self._send(connection, method, path, body, headers), self.timeout)
+                except _CONNECTION_ERRORS:
+                    # The server closed an idle pooled connection; retry once on a fresh one
+                    connection[1].close()
+                except BaseException:
+                    connection[1].close()
+                    raise
+
+            connection = await self._connect()
+            try:
+                return connection, await asyncio.wait_for(
+                    self._send(connection, method, path, body, headers), self.timeout)
+            except BaseException:
+                connection[1].close()
+                raise
+        except BaseException:
+            slots.release()
+            raise
+
+    async def request_json(self, method: str, path: str, payload=None) -> dict:
+        """Async request_json: send JSON (or pre-encoded bytes) and decode the JSON reply.
+
+        Raises HTTPStatusError on a non-2xx status.
+        """
+        body = payload if isinstance(payload, bytes) or payload is None else json.dumps(payload).encode('utf-8')
+        connection, response = await self.request(method, path, body, {"Content-Type": "application/json"})
+        try:
+            data = await response.read()
+        except BaseException:
+            self.release(connection, reusable=False)
+            raise
+        self.release(connection, reusable=response.reusable)
+
+        if not 200 <= response.status < 300:
+            raise HTTPStatusError(response.status, data.decode('utf-8', 'replace'),
+                                  _retry_after(response.headers.get('retry-after')))
+        return json.loads(data) if data.strip() else {}
+
+    def close(self):
+        """Close idle connections of the running loop (others close with their loop)"""
+        try:
+            idle, _ = self._loop_state()
+        except RuntimeError:
+            return
+        while idle:
+            idle.pop()[1].close()
@@ -1,109 +1,274 @@
 """
 Document Ingestion Module
-Handles reading files, chunking text, creating embeddings, and storing in Pinecone
+Handles reading files, chunking text, creating embeddings, and storing in the vector store
 """
+import copy
 import os
-from typing import List
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from pinecone import Pinecone, ServerlessSpec
+import threading
+import time
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator, List
 import config
+from dedup import NearDuplicateIndex
+from docstore import get_docstore
+from embedding_cache import EmbeddingCache, embed_with_cache
+from lexical_index import get_lexical_index
+from manifest import IngestionManifest, hash_file, hash_text
+from metadata_filter import validate_namespace
+from metrics import Trace
+from model_registry import get_ingestion_embeddings
+from vector_store import get_vector_store
+
+if TYPE_CHECKING:
+    # langchain takes about a second to import; it is loaded on first chunking
+    from langchain.schema import Document
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+def create_text_splitter() -> "RecursiveCharacterTextSplitter":
+    """Build the text splitter configured for ingestion"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP,
+        length_function=len,
+    )
+
+
+def stream_chunks(splitter: "RecursiveCharacterTextSplitter", segments: Iterable[str],
+                  metadata: dict = None, window_chars: int = None) -> Iterator["Document"]:
+    """Chunk a stream of text segments (e.g. PDF pages) without joining them all.
+    
+    Segments are buffered until the window is full, the buffer is split, and
+    every chunk except the last is emitted. The last chunk is carried over as
+    the start of the next window, so chunks never end at a window boundary and
+    memory stays bounded by the window size rather than the document size.
+    """
+    from langchain.schema import Document
+    metadata = metadata or {}
+    window_chars = window_chars or config.STREAM_WINDOW_CHARS
+    parts = []
+    size = 0
+    
+    for segment in segments:
+        parts.append(segment)
+        size += len(segment)
+        if size < window_chars:
+            continue
+        
+        pieces = splitter.split_text("".join(parts))
+        for piece in pieces[:-1]:
+            yield Document(page_content=piece, metadata=dict(metadata))
+        parts = [pieces[-1]] if pieces else []
+        size = len(parts[0]) if parts else 0
+    
+    if parts:
+        for piece in splitter.split_text("".join(parts)):
+            yield Document(page_content=piece, metadata=dict(metadata))
 
 
 class DocumentIngestion:
-    def __init__(self):
-        """Initialize document ingestion with embeddings and vector store"""
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=config.EMBEDDING_MODEL,
-            model_kwargs={'device': 'cpu'}
-        )
+    def __init__(self, embeddings=None, namespace: str = None):
+        """Initialize document ingestion with embeddings and vector store.
         
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=config.CHUNK_SIZE,
-            chunk_overlap=config.CHUNK_OVERLAP,
-            length_function=len,
-        )
+        Vectors are written to `namespace` (default config.DEFAULT_NAMESPACE);
+        use for_namespace() to ingest into another one with the same resources.
+        Raises ValueError for a name validate_namespace() rejects.
+        """
+        self.namespace = validate_namespace(config.DEFAULT_NAMESPACE if namespace is None else namespace)
+        
+        # The embedding model is shared process-wide and loaded on first use
+        self.embeddings = embeddings or get_ingestion_embeddings()
+        
+        self._text_splitter = None
+        
+        # Persistent embedding cache so unchanged chunks are never re-embedded
+        self.embedding_cache = None
+        if config.EMBEDDING_CACHE_ENABLED:
+            try:
+                self.embedding_cache = EmbeddingCache()
+            except Exception as e:
+                print(f"⚠️ Embedding cache unavailable: {e}")
+        
+        # Chunk text is kept locally so vectors only carry ids and small fields
+        self.docstore = None
+        if config.DOCSTORE_ENABLED:
+            try:
+                self.docstore = get_docstore()
+            except Exception as e:
+                print(f"⚠️ Docstore unavailable, storing text in vector metadata: {e}")
+        
+        # Identical chunks (and near-identical ones with DEDUP_NEAR_DUPLICATES) are stored
+        # once and shared between files; chunks planned in this session are tracked
+        # until they reach the docstore
+        self.dedup_enabled = config.DEDUP_ENABLED and self.docstore is not None
+        self.planned_chunks = NearDuplicateIndex()
+        
+        # BM25 index over every stored chunk for hybrid retrieval
+        self.lexical_index = None
+        if config.HYBRID_SEARCH_ENABLED:
+            try:
+                self.lexical_index = get_lexical_index()
+            except Exception as e:
+                print(f"⚠️ Lexical index unavailable: {e}")
+        
+        # Per-file record of ingested chunks for incremental re-ingestion
+        self.manifest = IngestionManifest()
+        
+        # The vector store client is created on first use
+        self._index = None
+        self._index_ready = False
+        self._index_lock = threading.Lock()
+    
+    @property
+    def index(self):
+        """The configured vector store, connected on first access"""
+        if not self._index_ready:
+            with self._index_lock:
+                if not self._index_ready:
+                    self._init_vector_store()
+                    self._index_ready = True
+        return self._index
+    
+    @index.setter
+    def index(self, value):
+        self._index = value
+        self._index_ready = True
+    
+    def for_namespace(self, namespace: str) -> "DocumentIngestion":
+        """A view of this ingestion that writes to another namespace.
+        
+        Caches, docstore, manifest and the vector store client are shared.
+        Raises ValueError for a name validate_namespace() rejects.
+        """
+        if validate_namespace(namespace) == self.namespace:
+            return self
+        view = copy.copy(self)
+        view.namespace = namespace
+        return view
+    
+    def record_name(self, file_name: str) -> str:
+        """Manifest key of a file; it also prefixes the file's vector ids.
         
-        # Initialize Pinecone
-        self.pc = None
-        self.index = None
-        if config.PINECONE_API_KEY:
-            self._init_pinecone()
+        Files in a named namespace are kept apart from same-named files elsewhere.
+        """
+        return f"{self.namespace}::{file_name}" if self.namespace else file_name
+    
+    def _owns(self, vector_id: str) -> bool:
+        """Whether a vector id belongs to this ingestion's namespace"""
+        if self.namespace:
+            return vector_id.startswith(f"{self.namespace}::")
+        return "::" not in vector_id
+    
+    def chunk_metadata(self, file_name: str, file_path: str = None, tags: List[str] = None) -> dict:
+        """Filterable fields stored with every chunk of a file"""
+        metadata = {
+            "source": file_name,
+            "file_type": os.path.splitext(file_path or file_name)[1].lower().lstrip('.'),
+            "ingested_at": int(time.time()),
+        }
+        if self.namespace:
+            metadata["namespace"] = self.namespace
+        if tags:
+            metadata["tags"] = sorted({tag.strip() for tag in tags if tag.strip()})
+        return metadata
+    
+    @property
+    def text_splitter(self) -> "RecursiveCharacterTextSplitter":
+        if self._text_splitter is None:
+            self._text_splitter = create_text_splitter()
+        return self._text_splitter
     
-    def _init_pinecone(self):
-        """Initialize Pinecone connection and index"""
+    def _init_vector_store(self):
+        """Initialize the configured vector store (Pinecone or local)"""
         try:
-            self.pc = Pinecone(api_key=config.PINECONE_API_KEY)
-            
-            # Check if index exists, create if not
-            if config.PINECONE_INDEX_NAME not in self.pc.list_indexes().names():
-                self.pc.create_index(
-                    name=config.PINECONE_INDEX_NAME,
-                    dimension=config.EMBEDDING_DIMENSION,
-                    metric='cosine',
-                    spec=ServerlessSpec(
-                        cloud='aws',
-                        region=config.PINECONE_ENVIRONMENT or 'us-east-1'
-                    )
-                )
-            
-            self.index = self.pc.Index(config.PINECONE_INDEX_NAME)
-            print(f"✅ Connected to Pinecone index: {config.PINECONE_INDEX_NAME}")
+            self._index = get_vector_store(create_if_missing=True)
+            if self._index:
+                print(f"✅ Connected to {self._index.name} vector store")
         except Exception as e:
-            print(f"⚠️ Pinecone initialization error: {e}")
+            print(f"⚠️ Vector store initialization error: {e}")
     
-    def read_text_file(self, file_path: str) -> str:
-        """Read content from a text file"""
+    @staticmethod
+    def iter_text_file(file_path: str, block_size: int = 65536) -> Iterator[str]:
+        """Yield a text file in fixed-size blocks"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+                for block in iter(lambda: f.read(block_size), ""):
+                    yield block
         except Exception as e:
             print(f"Error reading text file: {e}")
-            return ""
     
-    def read_pdf_file(self, file_path: str) -> str:
-        """Read content from a PDF file"""
+    @staticmethod
+    def iter_pdf_pages(file_path: str, start: int = 0, end: int = None) -> Iterator[str]:
+        """Yield the text of PDF pages lazily, optionally for a page range"""
         try:
             from pypdf import PdfReader
             reader = PdfReader(file_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            pages = reader.pages
+            end = len(pages) if end is None else min(end, len(pages))
+            for page_number in range(start, end):
+                yield (pages[page_number].extract_text() or "") + "\n"
         except Exception as e:
             print(f"Error reading PDF file: {e}")
-            return ""
     
-    def read_docx_file(self, file_path: str) -> str:
-        """Read content from a DOCX file"""
+    @staticmethod
+    def count_pdf_pages(file_path: str) -> int:
+        """Number of pages in a PDF, or 0 if it cannot be opened"""
+        try:
+            from pypdf import PdfReader
+            return len(PdfReader(file_path).pages)
+        except Exception:
+            return 0
+    
+    @staticmethod
+    def iter_docx_paragraphs(file_path: str) -> Iterator[str]:
+        """Yield the paragraphs of a DOCX file"""
         try:
             from docx import Document as DocxDocument
             doc = DocxDocument(file_path)
-            text = ""
             for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
+                yield paragraph.text + "\n"
         except Exception as e:
             print(f"Error reading DOCX file: {e}")
-            return ""
     
-    def read_file(self, file_path: str) -> str:
-        """Read file based on extension"""
+    @classmethod
+    def iter_file(cls, file_path: str) -> Iterator[str]:
+        """Yield a file's text in segments based on extension"""
         ext = os.path.splitext(file_path)[1].lower()
         
         if ext == '.txt':
-            return self.read_text_file(file_path)
+            return cls.iter_text_file(file_path)
         elif ext == '.pdf':
-            return self.read_pdf_file(file_path)
+            return cls.iter_pdf_pages(file_path)
         elif ext == '.docx':
-            return self.read_docx_file(file_path)
+            return cls.iter_docx_paragraphs(file_path)
         else:
             print(f"Unsupported file type: {ext}")
-            return ""
+            return iter(())
+    
+    @classmethod
+    def read_text_file(cls, file_path: str) -> str:
+        """Read content from a text file"""
+        return "".join(cls.iter_text_file(file_path))
+    
+    @classmethod
+    def read_pdf_file(cls, file_path: str) -> str:
+        """Read content from a PDF file"""
+        return "".join(cls.iter_pdf_pages(file_path))
+    
+    @classmethod
+    def read_docx_file(cls, file_path: str) -> str:
+        """Read content from a DOCX file"""
+        return "".join(cls.iter_docx_paragraphs(file_path))
     
-    def chunk_text(self, text: str, metadata: dict = None) -> List[Document]:
+    @classmethod
+    def read_file(cls, file_path: str) -> str:
+        """Read file based on extension"""
+        return "".join(cls.iter_file(file_path))
+    
+    def chunk_text(self, text: str, metadata: dict = None) -> List["Document"]:
         """Split text into chunks"""
+        from langchain.schema import Document
         if metadata is None:
             metadata = {}
         
@@ -111,64 +276,331 @@ class DocumentIngestion:
         chunks = self.text_splitter.split_documents(documents)
         return chunks
     
+    def chunk_stream(self, segments: Iterable[str], metadata: dict = None) -> Iterator["Document"]:
+        """Split a stream of text segments into chunks as they arrive"""
+        return stream_chunks(self.text_splitter, segments, metadata)
+    
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings for texts"""
-        return self.embeddings.embed_documents(texts)
+        """Create embeddings for texts, reusing cached vectors where possible"""
+        return embed_with_cache(self.embeddings, texts, self.embedding_cache)
+    
+    @staticmethod
+    def build_vectors(chunks: List["Document"], file_name: str, vector_ids: List[str],
+                      embeddings: List[List[float]], include_text: bool = True) -> List[dict]:
+        """Combine chunks, ids and embeddings into vector store records"""
+        vectors = []
+        for vector_id, chunk, embedding in zip(vector_ids, chunks, embeddings):
+            metadata = {
+                "source": file_name,
+                **chunk.metadata
+            }
+            if include_text:
+                metadata["text"] = chunk.page_content
+            vectors.append({
+                "id": vector_id,
+                "values": embedding,
+                "metadata": metadata
+            })
+        return vectors
+    
+    def store_texts(self, items: List[tuple]):
+        """Write (file_name, vector_id, chunk) items to the docstore and lexical index.
+        
+        Called ahead of the vector upsert so no vector is ever left without its text.
+        """
+        if self.docstore is not None:
+            self.docstore.put_many([
+                (vector_id, chunk.page_content, {"source": file_name, **chunk.metadata})
+                for file_name, vector_id, chunk in items
+            ])
+        if self.lexical_index is not None:
+            self.lexical_index.add(
+                [vector_id for _, vector_id, _ in items],
+                [chunk.page_content for _, _, chunk in items]
+            )
     
-    def store_in_pinecone(self, chunks: List[Document], file_name: str):
-        """Store document chunks in Pinecone"""
+    def flush(self):
+        """Persist the vector store and lexical index"""
+        if self.index:
+            self.index.flush()
+        if self.lexical_index is not None:
+            self.lexical_index.flush()
+    
+    def store_in_pinecone(self, chunks: List["Document"], file_name: str,
+                          vector_ids: List[str] = None, flush: bool = True, trace: Trace = None) -> bool:
+        """Store document chunks in the configured vector store"""
+        trace = trace or Trace("ingest")
         if not self.index:
-            print("⚠️ Pinecone index not initialized. Please check your API key.")
-            return
+            print("⚠️ Vector store not initialized. Please check your API key or backend setting.")
+            return False
+        
+        if vector_ids is None:
+            vector_ids = [f"{file_name}_{i}" for i in range(len(chunks))]
         
         try:
-            # Prepare data for Pinecone
+            # Prepare data for the vector store
             texts = [chunk.page_content for chunk in chunks]
-            embeddings = self.create_embeddings(texts)
-            
-            # Create vectors with metadata
-            vectors = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                vector_id = f"{file_name}_{i}"
-                metadata = {
-                    "text": chunk.page_content,
-                    "source": file_name,
-                    **chunk.metadata
-                }
-                vectors.append({
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": metadata
-                })
+            with trace.stage('embed'):
+                embeddings = self.create_embeddings(texts)
             
-            # Upsert to Pinecone in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
+            with trace.stage('store'):
+                # Text goes to the docstore and lexical index before the vectors
+                self.store_texts([(file_name, vector_id, chunk) for vector_id, chunk in zip(vector_ids, chunks)])
+                
+                # Create vectors with metadata
+                vectors = self.build_vectors(chunks, file_name, vector_ids, embeddings,
+                                             include_text=self.docstore is None)
+                
+                # Batches are sized, sent and retried by the store
+                result = self.index.upsert_many(vectors, namespace=self.namespace)
+                trace.set('upsert_retries', result.retries)
+                if not result.ok:
+                    print(f"❌ {len(result.failed)} of {result.batches} upsert batches for {file_name} failed: "
+                          f"{result.describe_failures()}")
+                    return False
+                if flush:
+                    self.flush()
             
-            print(f"✅ Stored {len(vectors)} chunks from {file_name} in Pinecone")
+            print(f"✅ Stored {len(vectors)} chunks from {file_name} in {self.index.name}"
+                  + (f" ({result.retries} retried requests)" if result.retries else ""))
+            if self.embedding_cache:
+                stats = self.embedding_cache.stats()
+                print(f"🗄️ Embedding cache: {stats['hits']} hits, {stats['misses']} misses")
+            return True
         except Exception as e:
-            print(f"❌ Error storing in Pinecone: {e}")
+            print(f"❌ Error storing vectors: {e}")
+            return False
+    
+    def delete_vectors(self, vector_ids: List[str], flush: bool = True) -> bool:
+        """Delete vectors from the store in batches"""
+        if not self.index or not vector_ids:
+            return True
+        
+        try:
+            batch_size = 1000
+            for i in range(0, len(vector_ids), batch_size):
+                self.index.delete(vector_ids[i:i + batch_size], namespace=self.namespace)
+            if self.lexical_index is not None:
+                self.lexical_index.remove(vector_ids)
+            if flush:
+                self.flush()
+            if self.docstore is not None:
+                self.docstore.delete(vector_ids)
+            print(f"🧹 Removed {len(vector_ids)} stale vectors")
+            return True
+        except Exception as e:
+            print(f"❌ Error deleting stale vectors: {e}")
+            return False
+    
+    def check_changed(self, file_path: str, file_name: str, force: bool = False):
+        """Return the file's content hash, or None if it is unchanged or unreadable"""
+        try:
+            content_hash = hash_file(file_path)
+        except OSError as e:
+            print(f"❌ Could not read {file_name}: {e}")
+            return None
+        
+        previous = self.manifest.get(file_name)
+        if previous and previous['content_hash'] == content_hash and not force:
+            print(f"⏭️ {file_name} is unchanged, skipping")
+            return None
+        return content_hash
+    
+    def start_plan(self, file_name: str, force: bool = False) -> dict:
+        """Begin an update plan for a file; feed chunks with extend_plan"""
+        previous_ids = self.manifest.vector_ids(file_name)
+        return {
+            'file_name': file_name,
+            'chunk_entries': [],
+            'new_chunks': [],
+            'new_ids': [],
+            'previous_ids': previous_ids,
+            'known_ids': set(previous_ids) if not force else set(),
+            'seen_hashes': set(),
+            'seen_ids': set(),
+            'shared_ids': [],
+            'stale_ids': [],
+            'released_ids': [],
+        }
+    
+    def find_duplicate(self, chunk_hash: str, text: str):
+        """Id of an already stored or planned chunk that this text duplicates"""
+        if not self.dedup_enabled:
+            return None
+        try:
+            # A vector can only be shared within its namespace
+            return (self.docstore.find_duplicate(text, accept=self._owns)
+                    or self.planned_chunks.find(chunk_hash, text, accept=self._owns))
+        except Exception as e:
+            print(f"⚠️ Duplicate lookup failed: {e}")
+            return None
+    
+    def extend_plan(self, plan: dict, chunks: Iterable["Document"]) -> tuple:
+        """Add chunks to a plan and return the (chunks, ids) that need upserting"""
+        new_chunks, new_ids = [], []
+        for chunk in chunks:
+            # Vector ids are derived from chunk content, so an unchanged chunk keeps
+            # its id even when earlier edits shift its position in the file
+            chunk_hash = hash_text(chunk.page_content)
+            if chunk_hash in plan['seen_hashes']:
+                continue
+            plan['seen_hashes'].add(chunk_hash)
+            
+            vector_id = f"{plan['file_name']}_{chunk_hash[:16]}"
+            if vector_id not in plan['known_ids']:
+                # A chunk that duplicates one stored for any file reuses that vector
+                duplicate = self.find_duplicate(chunk_hash, chunk.page_content)
+                if duplicate and duplicate != vector_id:
+                    if duplicate in plan['seen_ids']:
+                        continue
+                    vector_id = duplicate
+                    if vector_id not in plan['known_ids']:
+                        plan['shared_ids'].append(vector_id)
+                else:
+                    new_chunks.append(chunk)
+                    new_ids.append(vector_id)
+                    if self.dedup_enabled:
+                        self.planned_chunks.add(vector_id, chunk_hash, chunk.page_content)
+            
+            if vector_id in plan['seen_ids']:
+                continue
+            plan['seen_ids'].add(vector_id)
+            plan['chunk_entries'].append({'hash': chunk_hash, 'id': vector_id})
+        return new_chunks, new_ids
+    
+    def close_plan(self, plan: dict) -> dict:
+        """Work out which previously stored vectors are now stale"""
+        current_ids = {entry['id'] for entry in plan['chunk_entries']}
+        dropped = [vector_id for vector_id in plan['previous_ids'] if vector_id not in current_ids]
+        
+        # Vectors still shared with other files only lose this file's reference
+        shared = self.manifest.shared_ids(plan['file_name'], dropped)
+        plan['stale_ids'] = [vector_id for vector_id in dropped if vector_id not in shared]
+        plan['released_ids'] = [vector_id for vector_id in dropped if vector_id in shared]
+        
+        unchanged = len(plan['chunk_entries']) - sum(
+            1 for entry in plan['chunk_entries'] if entry['id'] not in plan['known_ids']
+        )
+        if unchanged:
+            print(f"♻️ {unchanged} chunks unchanged")
+        if plan['shared_ids']:
+            print(f"🧬 {len(plan['shared_ids'])} duplicate chunks shared with existing ones")
+        return plan
     
-    def ingest_file(self, file_path: str, file_name: str = None):
-        """Complete ingestion pipeline for a file"""
+    def plan_update(self, file_name: str, chunks: List["Document"], force: bool = False) -> dict:
+        """Work out which chunks need upserting and which vectors are stale"""
+        plan = self.start_plan(file_name, force)
+        plan['new_chunks'], plan['new_ids'] = self.extend_plan(plan, chunks)
+        return self.close_plan(plan)
+    
+    def finish_update(self, file_name: str, content_hash: str, plan: dict):
+        """Delete stale vectors and record the file in the manifest"""
+        stale_deleted = self.delete_vectors(plan['stale_ids'], flush=False)
+        self.flush()
+        self.record_update(file_name, content_hash, plan, stale_deleted)
+    
+    def record_update(self, file_name: str, content_hash: str, plan: dict, stale_deleted: bool = True):
+        """Record a file's ingested chunks in the manifest"""
+        chunk_entries = list(plan['chunk_entries'])
+        if not stale_deleted:
+            # Keep the leftovers in the manifest so the next run retries the delete
+            chunk_entries += [{'hash': None, 'id': vector_id} for vector_id in plan['stale_ids']]
+            content_hash = None
+        
+        if self.docstore is not None and (plan['shared_ids'] or plan['released_ids']):
+            try:
+                # A shared chunk planned by another file in this session may not be stored
+                # yet (or that file failed); re-check this file on the next run
+                if len(self.docstore.existing(plan['shared_ids'])) < len(set(plan['shared_ids'])):
+                    content_hash = None
+                self.docstore.add_refs(plan['shared_ids'], file_name)
+                self.docstore.remove_refs(plan['released_ids'], file_name)
+            except Exception as e:
+                print(f"⚠️ Could not update shared chunk references: {e}")
+        self.manifest.update(file_name, content_hash, chunk_entries)
+    
+    def clear_file(self, file_name: str, content_hash: str) -> bool:
+        """Release what an earlier version of a file stored once it yields no text.
+        
+        Its vectors, docstore refs and lexical entries go through the usual
+        stale-chunk path and the manifest records it as empty. Returns False
+        if the file was never ingested.
+        """
+        if self.manifest.get(file_name) is None:
+            return False
+        plan = self.close_plan(self.start_plan(file_name))
+        self.finish_update(file_name, content_hash, plan)
+        return True
+    
+    def ingest_file(self, file_path: str, file_name: str = None, force: bool = False, tags: List[str] = None):
+        """Complete ingestion pipeline for a file.
+        
+        Unchanged files are skipped, only new or modified chunks are
+        embedded and upserted, and vectors of chunks that no longer exist
+        are deleted. Pass force=True to re-process an unchanged file.
+        Chunks are stored in this ingestion's namespace with the file's
+        source, type, ingest time and `tags` as filterable metadata.
+        
+        Returns the per-stage timings of the file, or None if it was
+        skipped or failed.
+        """
         if file_name is None:
             file_name = os.path.basename(file_path)
+        record = self.record_name(file_name)
         
-        print(f"📄 Processing {file_name}...")
+        print(f"📄 Processing {record}...")
+        trace = Trace("ingest")
         
-        # Read file
-        text = self.read_file(file_path)
-        if not text:
-            print(f"❌ No content extracted from {file_name}")
-            return
+        with trace.stage('hash'):
+            content_hash = self.check_changed(file_path, record, force)
+        if content_hash is None:
+            return None
+        
+        # Read, chunk and store the file as a stream so memory stays bounded
+        # by a window of pages/blocks rather than by the document size
+        chunks = self.chunk_stream(self.iter_file(file_path), metadata=self.chunk_metadata(file_name, file_path, tags))
+        self.planned_chunks.clear()
+        plan = self.start_plan(record, force)
+        num_chunks = 0
         
-        # Chunk text
-        chunks = self.chunk_text(text, metadata={"source": file_name})
-        print(f"📝 Created {len(chunks)} chunks")
+        while True:
+            with trace.stage('read'):
+                batch = list(islice(chunks, config.PIPELINE_EMBED_BATCH_SIZE))
+            if not batch:
+                break
+            num_chunks += len(batch)
+            
+            with trace.stage('plan'):
+                new_chunks, new_ids = self.extend_plan(plan, batch)
+            if new_chunks:
+                stored = self.store_in_pinecone(new_chunks, record, vector_ids=new_ids,
+                                                flush=False, trace=trace)
+                if not stored:
+                    return None
+        
+        if num_chunks == 0:
+            print(f"❌ No content extracted from {file_name}")
+            # An emptied file must not keep its old chunks searchable
+            self.clear_file(record, content_hash)
+            return None
+        print(f"📝 Created {num_chunks} chunks")
         
-        # Store in Pinecone
-        self.store_in_pinecone(chunks, file_name)
+        with trace.stage('finalize'):
+            self.close_plan(plan)
+            self.finish_update(record, content_hash, plan)
+        self.planned_chunks.clear()
         
-        print(f"✅ Successfully ingested {file_name}")
+        trace.set('chunks', num_chunks)
+        timings = trace.finish()
+        breakdown = ", ".join(f"{name[:-3]} {value:.0f}ms" for name, value in timings.items() if name.endswith('_ms'))
+        print(f"✅ Successfully ingested {record} ({breakdown})")
+        return timings
+    
+    def ingest_files(self, files: List[tuple], force: bool = False, progress_callback=None) -> dict:
+        """Ingest many (file_path, file_name) pairs with the parallel pipeline"""
+        from ingestion_pipeline import IngestionPipeline
+        try:
+            return IngestionPipeline(self).run(files, force=force, progress_callback=progress_callback)
+        finally:
+            # Everything planned is now in the docstore (or its file failed)
+            self.planned_chunks.clear()
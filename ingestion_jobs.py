@@ -0,0 +1,377 @@
+"""
+Ingestion Jobs Module
+Persistent queue of files to ingest, drained by a background worker that
+checkpoints its progress so a restart resumes instead of starting over
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from itertools import islice
+from typing import List, Optional
+import config
+from ingestion import DocumentIngestion
+from metadata_filter import validate_namespace
+from metrics import Trace
+
+
+QUEUED, RUNNING, DONE, SKIPPED, FAILED, CANCELLED = "queued", "running", "done", "skipped", "failed", "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_COLUMNS = (
+    "id", "file_path", "file_name", "force", "status", "content_hash", "checkpoint",
+    "chunks_done", "chunks_total", "cancel_requested", "error", "created_at", "started_at", "finished_at",
+    "namespace", "tags"
+)
+# Columns added after the first release, created on older job tables at startup
+_ADDED_COLUMNS = {
+    "namespace": "TEXT NOT NULL DEFAULT ''",
+    "tags": "TEXT",
+}
+
+
+class JobQueue:
+    """SQLite table of ingestion jobs.
+
+    A job goes queued -> running -> done / skipped / failed / cancelled. While
+    it runs, `chunks_done` is the number of chunks processed so far and
+    `checkpoint` the position up to which everything is persisted; a job
+    interrupted by a restart is queued again and resumes from its checkpoint.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(config.DATA_DIR, config.JOBS_FILE)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, file_path TEXT NOT NULL, file_name TEXT NOT NULL, "
+            "force INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, content_hash TEXT, "
+            "checkpoint INTEGER NOT NULL DEFAULT 0, chunks_done INTEGER NOT NULL DEFAULT 0, "
+            "chunks_total INTEGER, cancel_requested INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "namespace TEXT NOT NULL DEFAULT '', tags TEXT)"
+        )
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, definition in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+        self._conn.commit()
+
+    @staticmethod
+    def _row(row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job['force'] = bool(job['force'])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        job['tags'] = json.loads(job['tags']) if job['tags'] else []
+        return job
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def submit(self, file_path: str, file_name: str, force: bool = False,
+               namespace: str = "", tags: List[str] = None) -> int:
+        """Queue a file for a namespace; returns the job id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (file_path, file_name, force, status, created_at, namespace, tags) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_path, file_name, int(force), QUEUED, time.time(), namespace or "",
+                 json.dumps(list(tags)) if tags else None)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def claim(self) -> Optional[dict]:
+        """Mark the oldest queued job as running and return it"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, error = NULL WHERE id = ?",
+                (RUNNING, time.time(), row[0])
+            )
+            self._conn.commit()
+        job = self._row(row)
+        job['status'] = RUNNING
+        return job
+
+    def get(self, job_id: int) -> Optional[dict]:
+        with self._lock:
+            return self._row(self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone())
+
+    def list(self, limit: int = 50) -> List[dict]:
+        """Most recent jobs first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def active_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchone()[0]
+
+    def start(self, job_id: int, content_hash: str, checkpoint: int):
+        """Record the file version being ingested and where this run resumes"""
+        self._execute(
+            "UPDATE jobs SET content_hash = ?, checkpoint = ?, chunks_done = ? WHERE id = ?",
+            (content_hash, checkpoint, checkpoint, job_id)
+        )
+
+    def progress(self, job_id: int, chunks_done: int, checkpoint: int = None):
+        if checkpoint is None:
+            self._execute("UPDATE jobs SET chunks_done = ? WHERE id = ?", (chunks_done, job_id))
+        else:
+            self._execute(
+                "UPDATE jobs SET chunks_done = ?, checkpoint = ? WHERE id = ?", (chunks_done, checkpoint, job_id)
+            )
+
+    def finish(self, job_id: int, status: str, error: str = None, chunks_total: int = None):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, chunks_total = COALESCE(?, chunks_total), "
+            "finished_at = ? WHERE id = ?",
+            (status, error, chunks_total, time.time(), job_id)
+        )
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued job now, or ask a running one to stop at its next batch"""
+        if self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED)
+        ):
+            return True
+        return self._execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING)
+        ) > 0
+
+    def cancel_requested(self, job_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def retry(self, job_id: int) -> bool:
+        """Queue a failed job again; it resumes from its last checkpoint"""
+        return self._execute(
+            "UPDATE jobs SET status = ?, error = NULL, finished_at = NULL WHERE id = ? AND status = ?",
+            (QUEUED, job_id, FAILED)
+        ) > 0
+
+    def requeue_interrupted(self) -> int:
+        """Queue jobs left running by a previous process (called before workers start)"""
+        return self._execute(
+            "UPDATE jobs SET status = ?, cancel_requested = 0 WHERE status = ?", (QUEUED, RUNNING)
+        )
+
+    def clear_finished(self) -> int:
+        return self._execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?, ?)", (DONE, SKIPPED, FAILED, CANCELLED)
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobRunner:
+    """Background thread that drains a JobQueue through a DocumentIngestion.
+
+    Files are read, chunked, embedded and upserted in batches as in
+    DocumentIngestion.ingest_file. Every JOBS_CHECKPOINT_CHUNKS stored chunks
+    the vector store and lexical index are flushed and the job's position is
+    saved; after a restart the file is chunked again, batches before the
+    checkpoint are only planned, and embedding resumes after it. Ingestion
+    embeddings run at bulk priority, so queries are served first while a
+    job is running.
+    """
+
+    def __init__(self, ingestion: DocumentIngestion = None, queue: JobQueue = None):
+        self.ingestion = ingestion or DocumentIngestion()
+        self.queue = queue or JobQueue()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"🔁 Resuming {requeued} interrupted ingestion job(s)")
+        self._thread = threading.Thread(target=self._loop, name="ingestion-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop after the current batch; an unfinished job resumes on the next start"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, file_path: str, file_name: str = None, force: bool = False,
+               namespace: str = None, tags: List[str] = None) -> int:
+        """Queue a file; it is ingested into `namespace` (default: the runner's) with `tags`.
+
+        Raises ValueError for a name validate_namespace() rejects.
+        """
+        namespace = self.ingestion.namespace if namespace is None else validate_namespace(namespace)
+        job_id = self.queue.submit(file_path, file_name or os.path.basename(file_path), force, namespace, tags)
+        self._wake.set()
+        return job_id
+
+    def cancel(self, job_id: int) -> bool:
+        return self.queue.cancel(job_id)
+
+    def retry(self, job_id: int) -> bool:
+        retried = self.queue.retry(job_id)
+        self._wake.set()
+        return retried
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wake.wait(config.JOBS_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                print(f"❌ Ingestion job {job['id']} failed: {e}")
+                self.queue.finish(job['id'], FAILED, error=str(e))
+            finally:
+                self.ingestion.planned_chunks.clear()
+
+    def run_job(self, job: dict):
+        """Ingest one claimed job, resuming from its checkpoint"""
+        ingestion = self.ingestion.for_namespace(job['namespace'])
+        job_id, file_path = job['id'], job['file_path']
+        file_name = ingestion.record_name(job['file_name'])
+        if not ingestion.index:
+            self.queue.finish(job_id, FAILED, error="Vector store not initialized")
+            return
+
+        print(f"📄 Processing {file_name} (job {job_id})...")
+        trace = Trace("ingest")
+        with trace.stage('hash'):
+            content_hash = ingestion.check_changed(file_path, file_name, job['force'])
+        if content_hash is None:
+            status = SKIPPED if os.path.exists(file_path) else FAILED
+            self.queue.finish(job_id, status, error=None if status == SKIPPED else "File not found")
+            return
+
+        # A checkpoint only applies to the exact file version it was taken on
+        resume_from = job['checkpoint'] if job['content_hash'] == content_hash else 0
+        if resume_from:
+            print(f"⏩ Resuming {file_name} after chunk {resume_from}")
+        self.queue.start(job_id, content_hash, resume_from)
+
+        chunks = ingestion.chunk_stream(
+            ingestion.iter_file(file_path),
+            metadata=ingestion.chunk_metadata(job['file_name'], file_path, job['tags'])
+        )
+        ingestion.planned_chunks.clear()
+        plan = ingestion.start_plan(file_name, job['force'])
+        position = unsaved = 0
+
+        try:
+            while True:
+                with trace.stage('read'):
+                    batch = list(islice(chunks, config.PIPELINE_EMBED_BATCH_SIZE))
+                if not batch:
+                    break
+                if self._stop.is_set():
+                    # Leave the job running; it is requeued on the next start
+                    return
+                if self.queue.cancel_requested(job_id):
+                    raise JobCancelled()
+
+                with trace.stage('plan'):
+                    new_chunks, new_ids = ingestion.extend_plan(plan, batch)
+                position += len(batch)
+                if position <= resume_from:
+                    # Stored before the restart; planning it again is enough
+                    continue
+
+                if new_chunks and not ingestion.store_in_pinecone(
+                        new_chunks, file_name, vector_ids=new_ids, flush=False, trace=trace):
+                    self.queue.finish(job_id, FAILED, error="Storing vectors failed")
+                    return
+                unsaved += len(new_chunks)
+
+                if unsaved >= config.JOBS_CHECKPOINT_CHUNKS:
+                    with trace.stage('store'):
+                        ingestion.flush()
+                    self.queue.progress(job_id, position, checkpoint=position)
+                    unsaved = 0
+                else:
+                    self.queue.progress(job_id, position)
+        except JobCancelled:
+            self._discard(ingestion, plan)
+            self.queue.finish(job_id, CANCELLED, chunks_total=position)
+            print(f"🛑 Cancelled ingestion of {file_name}")
+            return
+
+        if position == 0:
+            # An emptied file must not keep its old chunks searchable
+            ingestion.clear_file(file_name, content_hash)
+            self.queue.finish(job_id, FAILED, error="No content extracted")
+            return
+
+        with trace.stage('finalize'):
+            ingestion.close_plan(plan)
+            ingestion.finish_update(file_name, content_hash, plan)
+        self.queue.progress(job_id, position, checkpoint=position)
+        self.queue.finish(job_id, DONE, chunks_total=position)
+
+        trace.set('chunks', position)
+        timings = trace.finish()
+        print(f"✅ Successfully ingested {file_name} in {timings['total_ms'] / 1000:.1f}s (job {job_id})")
+
+    @staticmethod
+    def _discard(ingestion: DocumentIngestion, plan: dict):
+        """Delete vectors a cancelled job added that nothing else refers to"""
+        keep = set(plan['known_ids']) | set(plan['previous_ids']) | set(plan['shared_ids'])
+        added = [entry['id'] for entry in plan['chunk_entries'] if entry['id'] not in keep]
+        shared = ingestion.manifest.shared_ids(plan['file_name'], added)
+        added = [vector_id for vector_id in added if vector_id not in shared]
+        if added:
+            ingestion.delete_vectors(added)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner(ingestion: DocumentIngestion = None) -> JobRunner:
+    """Process-wide job runner, started on first use"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(ingestion)
+            _runner.start()
+        return _runner
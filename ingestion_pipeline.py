@@ -0,0 +1,371 @@
+"""
+Ingestion Pipeline Module
+Staged parallel ingestion: parsing, embedding and upserting overlap across files
+"""
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+import config
+from ingestion import DocumentIngestion, create_text_splitter, stream_chunks
+from metrics import Trace
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+
+_splitter = None
+
+
+def _parse_file(file_path: str, metadata: dict,
+                page_range: Optional[Tuple[int, int]] = None) -> Tuple[List["Document"], float]:
+    """Process-pool worker: read and chunk one file (or a page range of a PDF).
+
+    Every chunk carries a copy of `metadata`. Returns (chunks, seconds).
+    """
+    global _splitter
+    start = time.perf_counter()
+    if _splitter is None:
+        _splitter = create_text_splitter()
+
+    if page_range is not None:
+        segments = DocumentIngestion.iter_pdf_pages(file_path, *page_range)
+    else:
+        segments = DocumentIngestion.iter_file(file_path)
+
+    chunks = list(stream_chunks(_splitter, segments, metadata=metadata))
+    return chunks, time.perf_counter() - start
+
+
+def split_page_ranges(file_path: str) -> List[Optional[Tuple[int, int]]]:
+    """Split a large PDF into page ranges that can be parsed in parallel"""
+    if not file_path.lower().endswith('.pdf'):
+        return [None]
+
+    pages = DocumentIngestion.count_pdf_pages(file_path)
+    if pages < config.PDF_PARALLEL_MIN_PAGES:
+        return [None]
+
+    step = config.PDF_PAGES_PER_TASK
+    return [(start, min(start + step, pages)) for start in range(0, pages, step)]
+
+
+class StageStats:
+    """Thread-safe counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+            return {'chunks': self.items, 'busy_seconds': self.busy_seconds, 'chunks_per_sec': rate}
+
+
+class IngestionPipeline:
+    """Bulk ingestion built around a DocumentIngestion instance.
+
+    Files are parsed and chunked in a process pool, one embedding thread
+    gathers chunks from all files into large model batches, and a pool of
+    upsert threads writes to the vector store. Bounded queues between the
+    stages provide backpressure so memory stays flat on large loads.
+    """
+
+    def __init__(self, ingestion: DocumentIngestion, parse_workers: int = None,
+                 upsert_workers: int = None, embed_batch_size: int = None, queue_size: int = None):
+        self.ingestion = ingestion
+        self.parse_workers = parse_workers or config.PIPELINE_PARSE_WORKERS
+        self.upsert_workers = upsert_workers or config.PIPELINE_UPSERT_WORKERS
+        self.embed_batch_size = embed_batch_size or config.PIPELINE_EMBED_BATCH_SIZE
+        self.queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+
+    def run(self, files: List[Tuple[str, str]], force: bool = False,
+            progress_callback: Optional[Callable[[int, int, str], None]] = None) -> dict:
+        """Ingest (file_path, file_name) pairs and return throughput statistics.
+
+        `progress_callback(done, total, file_name)` is always called from the
+        calling thread, so it is safe to update UI elements from it.
+        """
+        if not self.ingestion.index:
+            print("⚠️ Vector store not initialized. Please check your API key or backend setting.")
+            return {}
+
+        start = time.perf_counter()
+        self._stats = {name: StageStats(name) for name in ('parse', 'embed', 'upsert')}
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._reported = set()
+        self._traces = {}
+        self._file_timings = {}
+
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        upsert_queue = queue.Queue(maxsize=self.upsert_workers * 2)
+        done_queue = queue.Queue()
+
+        threads = [threading.Thread(target=self._embed_stage, args=(embed_queue, upsert_queue, done_queue), daemon=True)]
+        threads += [
+            threading.Thread(target=self._upsert_stage, args=(upsert_queue, done_queue), daemon=True)
+            for _ in range(self.upsert_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        jobs = {}
+        ready = []
+        summary = {'total': len(files), 'done': 0, 'ingested': 0, 'skipped': 0, 'failed': 0}
+
+        def finish(file_name: str, outcome: str):
+            if outcome != 'ingested':
+                self._traces.pop(file_name, None)
+            summary['done'] += 1
+            summary[outcome] += 1
+            if progress_callback:
+                progress_callback(summary['done'], summary['total'], file_name)
+
+        def drain():
+            while True:
+                try:
+                    file_name, ok = done_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if ok:
+                    # Embedding and upserting are batched across files, so a
+                    # file's share is the wait from planning until its last vector landed
+                    self._traces[file_name].mark('stored')
+                    ready.append(file_name)
+                    finish(file_name, 'ingested')
+                else:
+                    print(f"❌ Failed to ingest {file_name}")
+                    finish(file_name, 'failed')
+            if len(ready) >= config.PIPELINE_CHECKPOINT_FILES:
+                self._finalize(ready, jobs)
+
+        pending_files = iter(files)
+        in_flight = {}
+        parts = {}
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            def submit_next():
+                for file_path, display_name in pending_files:
+                    # Files are tracked by their manifest key, which includes the namespace
+                    file_name = self.ingestion.record_name(display_name)
+                    trace = Trace("ingest")
+                    with trace.stage('hash'):
+                        content_hash = self.ingestion.check_changed(file_path, file_name, force)
+                    if content_hash is None:
+                        finish(file_name, 'skipped')
+                        continue
+                    self._traces[file_name] = trace
+                    ranges = split_page_ranges(file_path)
+                    parts[file_name] = [None] * len(ranges)
+                    metadata = self.ingestion.chunk_metadata(display_name, file_path)
+                    for part, page_range in enumerate(ranges):
+                        future = pool.submit(_parse_file, file_path, metadata, page_range)
+                        in_flight[future] = (file_name, content_hash, part)
+                    return
+
+            for _ in range(self.parse_workers * 2):
+                submit_next()
+
+            while in_flight:
+                done, _ = wait(list(in_flight), timeout=0.1, return_when=FIRST_COMPLETED)
+                drain()
+                for future in done:
+                    file_name, content_hash, part = in_flight.pop(future)
+                    if file_name not in parts:
+                        # Another page range of this file already failed
+                        continue
+                    try:
+                        part_chunks, seconds = future.result()
+                    except Exception as e:
+                        print(f"❌ Error parsing {file_name}: {e}")
+                        del parts[file_name]
+                        finish(file_name, 'failed')
+                        submit_next()
+                        continue
+
+                    self._stats['parse'].record(len(part_chunks), seconds)
+                    self._traces[file_name].add('parse', seconds)
+                    parts[file_name][part] = part_chunks
+                    if any(chunks is None for chunks in parts[file_name]):
+                        continue
+
+                    # All page ranges are in: reassemble the file in page order
+                    chunks = [chunk for part_chunks in parts.pop(file_name) for chunk in part_chunks]
+                    submit_next()
+                    if not chunks:
+                        print(f"❌ No content extracted from {file_name}")
+                        # An emptied file must not keep its old chunks searchable
+                        self.ingestion.clear_file(file_name, content_hash)
+                        finish(file_name, 'failed')
+                        continue
+
+                    with self._traces[file_name].stage('plan'):
+                        plan = self.ingestion.plan_update(file_name, chunks, force)
+                    self._traces[file_name].set('chunks', len(chunks))
+                    jobs[file_name] = (content_hash, plan)
+                    if not plan['new_chunks']:
+                        done_queue.put((file_name, True))
+                        continue
+
+                    with self._lock:
+                        self._pending[file_name] = len(plan['new_chunks'])
+                    for chunk, vector_id in zip(plan['new_chunks'], plan['new_ids']):
+                        # Blocks when the embedder falls behind (backpressure)
+                        embed_queue.put((file_name, vector_id, chunk))
+
+        embed_queue.put(None)
+        while any(thread.is_alive() for thread in threads):
+            drain()
+            time.sleep(0.05)
+        drain()
+        self._finalize(ready, jobs)
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            **summary,
+            'seconds': elapsed,
+            'stages': {name: stage.as_dict() for name, stage in self._stats.items()},
+            'files': self._file_timings,
+        }
+        stats['chunks_per_sec'] = self._stats['upsert'].items / elapsed if elapsed else 0.0
+        self._print_stats(stats)
+        return stats
+
+    def _embed_stage(self, embed_queue: queue.Queue, upsert_queue: queue.Queue, done_queue: queue.Queue):
+        """Collect chunks across files into large batches and embed them"""
+        finished = False
+        while not finished:
+            batch = []
+            item = embed_queue.get()
+            if item is None:
+                finished = True
+            else:
+                batch.append(item)
+
+            # Top the batch up with whatever arrives shortly after
+            while not finished and len(batch) < self.embed_batch_size:
+                try:
+                    item = embed_queue.get(timeout=config.PIPELINE_EMBED_WAIT_SECONDS)
+                except queue.Empty:
+                    break
+                if item is None:
+                    finished = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._embed_batch(batch, upsert_queue, done_queue)
+
+        for _ in range(self.upsert_workers):
+            upsert_queue.put(None)
+
+    def _embed_batch(self, batch: list, upsert_queue: queue.Queue, done_queue: queue.Queue):
+        start = time.perf_counter()
+        try:
+            embeddings = self.ingestion.create_embeddings([chunk.page_content for _, _, chunk in batch])
+        except Exception as e:
+            print(f"❌ Error creating embeddings: {e}")
+            self._mark_failed({file_name for file_name, _, _ in batch}, done_queue)
+            return
+        self._stats['embed'].record(len(batch), time.perf_counter() - start)
+
+        # Text is stored before its vectors are queued for upsert
+        try:
+            self.ingestion.store_texts(batch)
+        except Exception as e:
+            print(f"❌ Error storing chunk text: {e}")
+            self._mark_failed({file_name for file_name, _, _ in batch}, done_queue)
+            return
+
+        records = [
+            (file_name, DocumentIngestion.build_vectors(
+                [chunk], file_name, [vector_id], [embedding],
+                include_text=self.ingestion.docstore is None)[0])
+            for (file_name, vector_id, chunk), embedding in zip(batch, embeddings)
+        ]
+        for i in range(0, len(records), config.UPSERT_BATCH_SIZE):
+            upsert_queue.put(records[i:i + config.UPSERT_BATCH_SIZE])
+
+    def _upsert_stage(self, upsert_queue: queue.Queue, done_queue: queue.Queue):
+        """Write vector batches to the store; several of these run concurrently"""
+        while True:
+            records = upsert_queue.get()
+            if records is None:
+                return
+
+            counts = Counter(file_name for file_name, _ in records)
+            start = time.perf_counter()
+            try:
+                result = self.ingestion.index.upsert_many([vector for _, vector in records],
+                                                          namespace=self.ingestion.namespace)
+            except Exception as e:
+                print(f"❌ Error storing vectors: {e}")
+                self._mark_failed(set(counts), done_queue)
+                continue
+            if not result.ok:
+                # Only the files with vectors in a failed batch are failed
+                failed_ids = set(result.failed_ids)
+                failed_files = {file_name for file_name, vector in records if vector['id'] in failed_ids}
+                print(f"❌ Error storing vectors: {result.describe_failures()}")
+                self._mark_failed(failed_files, done_queue)
+                counts = Counter({file_name: count for file_name, count in counts.items()
+                                  if file_name not in failed_files})
+            self._stats['upsert'].record(len(records) - len(result.failed_ids), time.perf_counter() - start)
+
+            with self._lock:
+                for file_name, count in counts.items():
+                    self._pending[file_name] -= count
+                    if self._pending[file_name] == 0 and file_name not in self._reported:
+                        self._reported.add(file_name)
+                        done_queue.put((file_name, True))
+
+    def _mark_failed(self, file_names: set, done_queue: queue.Queue):
+        with self._lock:
+            for file_name in file_names:
+                if file_name not in self._reported:
+                    self._reported.add(file_name)
+                    done_queue.put((file_name, False))
+
+    def _finalize(self, ready: List[str], jobs: dict):
+        """Delete stale vectors, persist the store, then record files in the manifest"""
+        if not ready:
+            return
+
+        start = time.perf_counter()
+        deleted = {
+            file_name: self.ingestion.delete_vectors(jobs[file_name][1]['stale_ids'], flush=False)
+            for file_name in ready
+        }
+        self.ingestion.flush()
+        for file_name in ready:
+            content_hash, plan = jobs.pop(file_name)
+            self.ingestion.record_update(file_name, content_hash, plan, deleted[file_name])
+        # The checkpoint is shared, so every file in it is charged its full duration
+        seconds = time.perf_counter() - start
+        for file_name in ready:
+            trace = self._traces.pop(file_name)
+            trace.add('finalize', seconds)
+            self._file_timings[file_name] = trace.finish()
+        ready.clear()
+
+    @staticmethod
+    def _print_stats(stats: dict):
+        print(f"✅ Pipeline finished in {stats['seconds']:.1f}s: "
+              f"{stats['ingested']} ingested, {stats['skipped']} unchanged, {stats['failed']} failed "
+              f"({stats['chunks_per_sec']:.1f} chunks/sec overall)")
+        for name, stage in stats['stages'].items():
+            print(f"  {name:<7} {stage['chunks']:>7} chunks  {stage['chunks_per_sec']:>9.1f} chunks/sec")
+        if stats['files']:
+            slowest = max(stats['files'].items(), key=lambda item: item[1]['total_ms'])
+            print(f"  slowest file: {slowest[0]} ({slowest[1]['total_ms']:.0f}ms)")
+
@@ -0,0 +1,300 @@
+"""
+Lexical Index Module
+On-disk BM25 inverted index over chunk text, kept alongside the vector store
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+import config
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-:/#@][a-z0-9]+)*")
+_PART_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the "
+    "this to was were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Lower-case terms, keeping identifiers like `web-01.prod` or `INC-1234` whole.
+
+    Compound identifiers are also split into their parts, so `web-01.prod`
+    matches a search for `web-01.prod` exactly and for `prod` loosely.
+    """
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token not in _STOPWORDS:
+            yield token
+        if not token.isalnum():
+            for part in _PART_PATTERN.findall(token):
+                if part not in _STOPWORDS:
+                    yield part
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = None) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (k + rank)"""
+    k = k or config.HYBRID_RRF_K
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+class LexicalIndex:
+    """BM25 index with compressed-sparse postings and precomputed length norms.
+
+    Flushed postings are held as flat arrays (`offsets` per term into
+    `post_slots` / `post_tfs`); documents added since the last flush go to a
+    small per-term delta, and removed documents are masked out until the next
+    flush compacts them away. A lookup gathers the postings of the query
+    terms and scores them with one bincount, so it stays well under a
+    millisecond for typical note collections.
+    """
+
+    def __init__(self, path: str = None, k1: float = None, b: float = None):
+        self.path = path or os.path.join(config.DATA_DIR, config.LEXICAL_INDEX_DIR)
+        self.k1 = k1 or config.BM25_K1
+        self.b = config.BM25_B if b is None else b
+        self._postings_file = os.path.join(self.path, "postings.npz")
+        self._meta_file = os.path.join(self.path, "index.json")
+        self._lock = threading.RLock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self._ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._live = np.zeros(0, dtype=bool)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._total_length = 0
+
+        self._vocab: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._post_slots = np.zeros(0, dtype=np.int32)
+        self._post_tfs = np.zeros(0, dtype=np.float32)
+        self._delta = defaultdict(lambda: ([], []))
+
+        self._dirty = False
+        self._loaded_mtime = None
+
+    def _load(self):
+        """Load the persisted index, if any"""
+        if not (os.path.exists(self._postings_file) and os.path.exists(self._meta_file)):
+            return
+
+        with open(self._meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with np.load(self._postings_file) as arrays:
+            self._offsets = arrays['offsets']
+            self._post_slots = arrays['slots']
+            self._post_tfs = arrays['tfs'].astype(np.float32)
+            self._lengths = arrays['lengths']
+
+        self._ids = meta['ids']
+        self._slots = {doc_id: slot for slot, doc_id in enumerate(self._ids)}
+        self._vocab = {term: index for index, term in enumerate(meta['terms'])}
+        self._live = np.ones(len(self._ids), dtype=bool)
+        self._total_length = int(self._lengths.sum())
+        self._norms = self._compute_norms(self._lengths)
+        self._loaded_mtime = os.path.getmtime(self._meta_file)
+
+    def refresh(self):
+        """Reload if another process has flushed a newer index"""
+        with self._lock:
+            if self._dirty or not os.path.exists(self._meta_file):
+                return
+            if os.path.getmtime(self._meta_file) != self._loaded_mtime:
+                self._reset()
+                self._load()
+
+    @property
+    def size(self) -> int:
+        return len(self._slots)
+
+    def _compute_norms(self, lengths: np.ndarray) -> np.ndarray:
+        average = self._total_length / self.size if self.size else 1.0
+        return (self.k1 * (1 - self.b + self.b * lengths / max(average, 1e-9))).astype(np.float32)
+
+    def _grow(self, extra: int):
+        needed = len(self._ids) + extra
+        if needed <= len(self._lengths):
+            return
+        capacity = max(needed, 2 * len(self._lengths), 1024)
+        for name in ('_lengths', '_live', '_norms'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(self._ids)] = array[:len(self._ids)]
+            setattr(self, name, grown)
+
+    def add(self, ids: List[str], texts: List[str]):
+        """Index texts under their ids, replacing any previous version"""
+        if not ids:
+            return
+
+        tokenized = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            self.remove([doc_id for doc_id in ids if doc_id in self._slots])
+            self._grow(len(ids))
+            for doc_id, counts in zip(ids, tokenized):
+                slot = len(self._ids)
+                length = sum(counts.values())
+                self._ids.append(doc_id)
+                self._slots[doc_id] = slot
+                self._lengths[slot] = length
+                self._live[slot] = True
+                self._total_length += length
+                for term, tf in counts.items():
+                    slots, tfs = self._delta[term]
+                    slots.append(slot)
+                    tfs.append(tf)
+
+            # New documents use the current average length until the next flush
+            start = len(self._ids) - len(ids)
+            self._norms[start:len(self._ids)] = self._compute_norms(self._lengths[start:len(self._ids)])
+            self._dirty = True
+
+    def remove(self, ids: List[str]):
+        """Mask documents out; their postings are dropped on the next flush"""
+        with self._lock:
+            for doc_id in ids:
+                slot = self._slots.pop(doc_id, None)
+                if slot is None:
+                    continue
+                self._live[slot] = False
+                self._total_length -= int(self._lengths[slot])
+                self._dirty = True
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Live (slots, tfs) of a term across flushed and delta postings"""
+        parts_slots, parts_tfs = [], []
+        index = self._vocab.get(term)
+        if index is not None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+            parts_slots.append(self._post_slots[start:end])
+            parts_tfs.append(self._post_tfs[start:end])
+        if term in self._delta:
+            slots, tfs = self._delta[term]
+            parts_slots.append(np.asarray(slots, dtype=np.int32))
+            parts_tfs.append(np.asarray(tfs, dtype=np.float32))
+        if not parts_slots:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        slots = np.concatenate(parts_slots) if len(parts_slots) > 1 else parts_slots[0]
+        tfs = np.concatenate(parts_tfs) if len(parts_tfs) > 1 else parts_tfs[0]
+        live = self._live[slots]
+        return slots[live], tfs[live]
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """Return up to top_k (id, BM25 score) pairs, best first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            total = self.size
+            if not terms or total == 0 or top_k <= 0:
+                return []
+
+            all_slots, all_scores = [], []
+            for term in terms:
+                slots, tfs = self._postings(term)
+                if len(slots) == 0:
+                    continue
+                idf = math.log(1 + (total - len(slots) + 0.5) / (len(slots) + 0.5))
+                all_slots.append(slots)
+                all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + self._norms[slots]))
+            if not all_slots:
+                return []
+
+            candidates, inverse = np.unique(np.concatenate(all_slots), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                best = np.arange(len(scores))
+            best = best[np.argsort(-scores[best])]
+            return [(self._ids[candidates[i]], float(scores[i])) for i in best]
+
+    def flush(self):
+        """Merge the delta, drop removed documents and write the index atomically"""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            count = len(self._ids)
+            live = self._live[:count]
+            new_slot = np.cumsum(live) - 1
+
+            # Flushed postings as (term, slot, tf) triples, plus the delta
+            terms = list(self._vocab)
+            term_index = {term: i for i, term in enumerate(terms)}
+            post_terms = [np.repeat(np.arange(len(terms), dtype=np.int64), np.diff(self._offsets))]
+            post_slots = [self._post_slots]
+            post_tfs = [self._post_tfs]
+            for term, (slots, tfs) in self._delta.items():
+                if term not in term_index:
+                    term_index[term] = len(terms)
+                    terms.append(term)
+                post_terms.append(np.full(len(slots), term_index[term], dtype=np.int64))
+                post_slots.append(np.asarray(slots, dtype=np.int32))
+                post_tfs.append(np.asarray(tfs, dtype=np.float32))
+
+            post_terms = np.concatenate(post_terms)
+            post_slots = np.concatenate(post_slots)
+            post_tfs = np.concatenate(post_tfs)
+            keep = live[post_slots]
+            post_terms, post_slots, post_tfs = post_terms[keep], new_slot[post_slots[keep]], post_tfs[keep]
+
+            # Drop terms that lost all their postings and renumber the rest
+            used = np.bincount(post_terms, minlength=len(terms)) > 0
+            term_remap = np.cumsum(used) - 1
+            terms = [term for term, keep_term in zip(terms, used) if keep_term]
+            post_terms = term_remap[post_terms]
+
+            order = np.lexsort((post_slots, post_terms))
+            post_terms, post_slots, post_tfs = post_terms[order], post_slots[order], post_tfs[order]
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(post_terms, minlength=len(terms)), out=offsets[1:])
+
+            ids = [doc_id for doc_id, alive in zip(self._ids, live) if alive]
+            lengths = self._lengths[:count][live].astype(np.int32)
+
+            # Write to temp files first so a crash never leaves a torn index
+            os.makedirs(self.path, exist_ok=True)
+            tmp_postings = self._postings_file + ".tmp"
+            tmp_meta = self._meta_file + ".tmp"
+            with open(tmp_postings, 'wb') as f:
+                np.savez(f, offsets=offsets, slots=post_slots.astype(np.int32),
+                         tfs=np.minimum(post_tfs, 65535).astype(np.uint16), lengths=lengths)
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump({'ids': ids, 'terms': terms}, f)
+            os.replace(tmp_postings, self._postings_file)
+            os.replace(tmp_meta, self._meta_file)
+
+            self._reset()
+            self._load()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'documents': self.size,
+                'terms': len(self._vocab) + sum(1 for term in self._delta if term not in self._vocab),
+                'postings': int(len(self._post_slots) + sum(len(slots) for slots, _ in self._delta.values())),
+            }
+
+
+_lexical_index = None
+_lexical_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """Process-wide lexical index shared by ingestion and retrieval"""
+    global _lexical_index
+    with _lexical_index_lock:
+        if _lexical_index is None:
+            _lexical_index = LexicalIndex()
+        return _lexical_index
@@ -2,61 +2,299 @@
 LLM Integration Module
 Handles interaction with local LLaMA model via Ollama or OpenAI as fallback
 """
+import asyncio
+import json
+import threading
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncIterator, Iterator, Optional
 import config
+from llm_scheduler import INTERACTIVE_PRIORITY, LLMOverloaded, get_llm_scheduler
+
+
+# Process-wide cache of Ollama health probes: base_url -> (healthy, checked_at)
+_health_cache = {}
+_health_lock = threading.Lock()
+_warmed_models = set()
+
+
+def check_ollama_health(force: bool = False) -> bool:
+    """Probe Ollama's cheap /api/tags endpoint, caching the result for a TTL.
+
+    The server counts as healthy only if it answers and has the configured
+    model pulled, since a generate call would fail otherwise.
+    """
+    # urllib.request pulls in http.client, email and ssl, so it is loaded on first probe
+    import urllib.request
+    base_url = config.OLLAMA_BASE_URL
+    with _health_lock:
+        cached = _health_cache.get(base_url)
+        if cached and not force and time.monotonic() - cached[1] < config.LLM_HEALTH_TTL_SECONDS:
+            return cached[0]
+
+    healthy = False
+    try:
+        with urllib.request.urlopen(f"{base_url}/api/tags", timeout=config.LLM_HEALTH_TIMEOUT_SECONDS) as response:
+            models = json.load(response).get('models', [])
+        names = {model.get('name', '') for model in models}
+        healthy = any(name == config.OLLAMA_MODEL or name.split(':')[0] == config.OLLAMA_MODEL for name in names)
+    except Exception:
+        healthy = False
+
+    with _health_lock:
+        _health_cache[base_url] = (healthy, time.monotonic())
+    return healthy
+
+
+def mark_ollama_unhealthy():
+    """Record a failed Ollama call so the next health check is not served stale"""
+    with _health_lock:
+        _health_cache[config.OLLAMA_BASE_URL] = (False, time.monotonic())
+
+
+def warm_up_ollama():
+    """Ask Ollama to load the model into memory (an empty prompt only loads it)"""
+    key = (config.OLLAMA_BASE_URL, config.OLLAMA_MODEL)
+    with _health_lock:
+        if key in _warmed_models:
+            return
+        _warmed_models.add(key)
+
+    def _warm():
+        if not check_ollama_health():
+            return
+        import urllib.request
+        try:
+            body = json.dumps({
+                "model": config.OLLAMA_MODEL, "prompt": "", "stream": False, "keep_alive": config.OLLAMA_KEEP_ALIVE
+            }).encode('utf-8')
+            request = urllib.request.Request(
+                f"{config.OLLAMA_BASE_URL}/api/generate",
+                data=body,
+                headers={'Content-Type': 'application/json'}
+            )
+            start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=config.LLM_WARMUP_TIMEOUT_SECONDS):
+                pass
+            print(f"🔥 Warmed up Ollama model {config.OLLAMA_MODEL} in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            print(f"⚠️ Ollama warm-up failed: {e}")
+
+    threading.Thread(target=_warm, daemon=True).start()
+
+
+@asynccontextmanager
+async def _anullcontext():
+    yield
 
 
 class LLMHandler:
     def __init__(self):
-        """Initialize LLM handler"""
+        """Initialize LLM handler.
+
+        No network calls happen here: the provider is chosen on first use
+        from a cached health probe, and Ollama is warmed up in the background.
+        Ollama calls go through the process-wide LLMScheduler, so concurrent
+        sessions queue for a slot instead of overloading the local model, and
+        every session shares one OllamaClient and its connection pools.
+        """
         self.llm = None
-        self._init_llm()
-    
+        self.llm_type = None
+        self._lock = threading.Lock()
+        self._reported_unavailable = False
+        self.scheduler = get_llm_scheduler()
+
+        if config.LLM_WARMUP:
+            warm_up_ollama()
+
     def _init_llm(self):
         """Initialize the LLM (tries Ollama first, then OpenAI as fallback)"""
+        if check_ollama_health():
+            self._use_ollama()
+        elif config.OPENAI_API_KEY:
+            print(f"⚠️ Ollama not available at {config.OLLAMA_BASE_URL}")
+            self._use_openai()
+        else:
+            if not self._reported_unavailable:
+                print("❌ No LLM available. Please set up Ollama or provide OpenAI API key.")
+                self._reported_unavailable = True
+            self.llm = None
+            self.llm_type = None
+
+    def _use_ollama(self):
         try:
-            # Try Ollama for local LLaMA
-            from langchain_community.llms import Ollama
-            self.llm = Ollama(model=config.OLLAMA_MODEL)
-            # Test the connection
-            self.llm.invoke("Hello")
-            print(f"✅ Connected to Ollama with model: {config.OLLAMA_MODEL}")
+            from ollama_client import get_ollama_client
+            self.llm = get_ollama_client(config.OLLAMA_MODEL, config.OLLAMA_BASE_URL)
             self.llm_type = "ollama"
+            print(f"✅ Connected to Ollama with model: {config.OLLAMA_MODEL}")
         except Exception as e:
             print(f"⚠️ Ollama not available: {e}")
-            
-            # Fallback to OpenAI if available
-            if config.OPENAI_API_KEY:
-                try:
-                    from langchain_openai import ChatOpenAI
-                    self.llm = ChatOpenAI(
-                        temperature=0.7,
-                        model_name="gpt-3.5-turbo",
-                        openai_api_key=config.OPENAI_API_KEY
-                    )
-                    print("✅ Using OpenAI as LLM provider")
-                    self.llm_type = "openai"
-                except Exception as e:
-                    print(f"❌ Failed to initialize OpenAI: {e}")
-                    self.llm = None
-            else:
-                print("❌ No LLM available. Please set up Ollama or provide OpenAI API key.")
-                self.llm = None
-    
-    def generate_response(self, prompt: str) -> str:
+            self.llm = None
+            self.llm_type = None
+
+    def _use_openai(self):
+        try:
+            from langchain_openai import ChatOpenAI
+            self.llm = ChatOpenAI(
+                temperature=0.7,
+                model_name="gpt-3.5-turbo",
+                openai_api_key=config.OPENAI_API_KEY
+            )
+            print("✅ Using OpenAI as LLM provider")
+            self.llm_type = "openai"
+        except Exception as e:
+            print(f"❌ Failed to initialize OpenAI: {e}")
+            self.llm = None
+            self.llm_type = None
+
+    def _ensure_llm(self):
+        """Choose a provider on first use (or after a failed provider was dropped)"""
+        if self.llm is None:
+            with self._lock:
+                if self.llm is None:
+                    self._init_llm()
+        return self.llm
+
+    def _invoke(self, prompt: str) -> str:
+        response = self.llm.invoke(prompt)
+        if self.llm_type == "openai":
+            return response.content
+        return response
+
+    def _fall_back(self, error: Exception) -> bool:
+        """Switch from Ollama to OpenAI after a failed call; True if switched"""
+        if self.llm_type != "ollama" or not config.OPENAI_API_KEY:
+            return False
+        print(f"⚠️ Ollama request failed, falling back to OpenAI: {error}")
+        mark_ollama_unhealthy()
+        with self._lock:
+            self._use_openai()
+        return self.llm is not None
+
+    def _slot(self, priority: int = INTERACTIVE_PRIORITY):
+        """Scheduler slot for a local model call; remote providers handle their own load"""
+        if self.llm_type == "ollama":
+            return self.scheduler.slot(priority)
+        return nullcontext()
+
+    def _aslot(self, priority: int = INTERACTIVE_PRIORITY):
+        if self.llm_type == "ollama":
+            return self.scheduler.aslot(priority)
+        return _anullcontext()
+
+    def generate_response(self, prompt: str, priority: int = INTERACTIVE_PRIORITY) -> str:
         """Generate a response from the LLM"""
-        if not self.llm:
+        if not self._ensure_llm():
             return "❌ LLM is not configured. Please set up Ollama or OpenAI."
-        
+
         try:
-            if self.llm_type == "openai":
-                response = self.llm.invoke(prompt)
-                return response.content
-            else:
-                response = self.llm.invoke(prompt)
-                return response
+            with self._slot(priority):
+                return self._invoke(prompt)
+        except LLMOverloaded as e:
+            return f"❌ The assistant is busy ({e}). Please try again shortly."
         except Exception as e:
+            if self._fall_back(e):
+                try:
+                    return self._invoke(prompt)
+                except Exception as retry_error:
+                    e = retry_error
             return f"❌ Error generating response: {e}"
-    
+
+    async def agenerate_response(self, prompt: str, priority: int = INTERACTIVE_PRIORITY) -> str:
+        """Async counterpart of generate_response using the LLM's native async API"""
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self._ensure_llm):
+            return "❌ LLM is not configured. Please set up Ollama or OpenAI."
+
+        try:
+            async with self._aslot(priority):
+                return await self._ainvoke(prompt)
+        except asyncio.CancelledError:
+            raise
+        except LLMOverloaded as e:
+            return f"❌ The assistant is busy ({e}). Please try again shortly."
+        except Exception as e:
+            # Building the fallback client blocks, so it runs off the event loop
+            if await loop.run_in_executor(None, self._fall_back, e):
+                try:
+                    return await self._ainvoke(prompt)
+                except Exception as retry_error:
+                    e = retry_error
+            return f"❌ Error generating response: {e}"
+
+    async def _ainvoke(self, prompt: str) -> str:
+        response = await self.llm.ainvoke(prompt)
+        if self.llm_type == "openai":
+            return response.content
+        return response
+
+    def _token_text(self, chunk) -> str:
+        """Chat models stream message chunks, completion models stream strings"""
+        if self.llm_type == "openai":
+            return chunk.content
+        return chunk
+
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        """Yield the response token by token as the LLM produces it"""
+        if not self._ensure_llm():
+            yield "❌ LLM is not configured. Please set up Ollama or OpenAI."
+            return
+
+        started = False
+        try:
+            with self._slot():
+                for chunk in self.llm.stream(prompt):
+                    started = True
+                    yield self._token_text(chunk)
+        except LLMOverloaded as e:
+            yield f"❌ The assistant is busy ({e}). Please try again shortly."
+            return
+        except Exception as e:
+            # Only fall back if nothing was sent yet, otherwise the answer would be spliced
+            if started or not self._fall_back(e):
+                yield f"❌ Error generating response: {e}"
+                return
+            try:
+                for chunk in self.llm.stream(prompt):
+                    yield self._token_text(chunk)
+            except Exception as retry_error:
+                yield f"❌ Error generating response: {retry_error}"
+
+    async def astream_response(self, prompt: str) -> AsyncIterator[str]:
+        """Async counterpart of stream_response"""
+        loop = asyncio.get_running_loop()
+        # The first call probes Ollama's health over blocking HTTP
+        if not await loop.run_in_executor(None, self._ensure_llm):
+            yield "❌ LLM is not configured. Please set up Ollama or OpenAI."
+            return
+
+        started = False
+        try:
+            async with self._aslot():
+                async for chunk in self.llm.astream(prompt):
+                    started = True
+                    yield self._token_text(chunk)
+        except LLMOverloaded as e:
+            yield f"❌ The assistant is busy ({e}). Please try again shortly."
+            return
+        except Exception as e:
+            if started or not await loop.run_in_executor(None, self._fall_back, e):
+                yield f"❌ Error generating response: {e}"
+                return
+            try:
+                async for chunk in self.llm.astream(prompt):
+                    yield self._token_text(chunk)
+            except Exception as retry_error:
+                yield f"❌ Error generating response: {retry_error}"
+
+    def model_id(self) -> Optional[str]:
+        """Provider and model that answers prompts, e.g. "ollama:llama2" (None without an LLM)"""
+        if not self._ensure_llm():
+            return None
+        if self.llm_type == "ollama":
+            return f"ollama:{getattr(self.llm, 'model', config.OLLAMA_MODEL)}"
+        return f"{self.llm_type}:{getattr(self.llm, 'model_name', '')}"
+
     def is_available(self) -> bool:
-        """Check if LLM is available"""
-        return self.llm is not None
+        """Check if LLM is available (uses the cached health probe)"""
+        return self._ensure_llm() is not None
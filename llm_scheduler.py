@@ -0,0 +1,184 @@
+"""
+LLM Scheduler Module
+Bounded concurrency slots with priority classes in front of the local LLM
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+import config
+from metrics import get_metrics
+
+
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY = 1
+PRIORITY_NAMES = {INTERACTIVE_PRIORITY: "interactive", BATCH_PRIORITY: "batch"}
+
+
+class LLMOverloaded(Exception):
+    """Raised when a request's deadline passes before it gets a slot"""
+
+
+class _Waiter:
+    __slots__ = ('priority', 'enqueued_at', 'granted', 'event', 'loop', 'future')
+
+    def __init__(self, priority: int, loop: asyncio.AbstractEventLoop = None):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class LLMScheduler:
+    """Admits at most `slots` LLM calls at once and queues the rest.
+
+    A local model slows down for everyone when it serves more requests than
+    it has parallel slots, so callers wait here instead. Waiting requests are
+    served FIFO within a priority class and interactive chat goes ahead of
+    batch work; a batch request that has waited `promote_after` seconds is
+    served in arrival order with interactive ones so it cannot starve. A
+    request still queued at its deadline is shed with LLMOverloaded rather
+    than served late. Queue times are recorded per class in the metrics
+    registry.
+    """
+
+    def __init__(self, slots: int = None, promote_after: float = None):
+        self.slots = slots or config.LLM_MAX_CONCURRENCY
+        self.promote_after = config.LLM_BATCH_PROMOTE_SECONDS if promote_after is None else promote_after
+        self._queues: Dict[int, deque] = {priority: deque() for priority in PRIORITY_NAMES}
+        self._busy = 0
+        self._lock = threading.Lock()
+        self.served = 0
+        self.shed = 0
+
+    @staticmethod
+    def default_deadline(priority: int) -> float:
+        """Monotonic time after which a queued request of this class is shed"""
+        wait = config.LLM_BATCH_QUEUE_SECONDS if priority == BATCH_PRIORITY else config.LLM_INTERACTIVE_QUEUE_SECONDS
+        return time.monotonic() + wait
+
+    def _next_waiter(self):
+        interactive, batch = self._queues[INTERACTIVE_PRIORITY], self._queues[BATCH_PRIORITY]
+        if batch and (not interactive or (
+                time.monotonic() - batch[0].enqueued_at >= self.promote_after
+                and batch[0].enqueued_at < interactive[0].enqueued_at)):
+            return batch.popleft()
+        if interactive:
+            return interactive.popleft()
+        return None
+
+    def _dispatch(self):
+        """Hand free slots to waiters (lock held)"""
+        while self._busy < self.slots:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._busy += 1
+            self.served += 1
+            waiter.grant()
+
+    def _enqueue(self, waiter: _Waiter):
+        with self._lock:
+            self._queues[waiter.priority].append(waiter)
+            self._dispatch()
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Drop a waiter that gave up; False if it was granted a slot meanwhile"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._queues[waiter.priority].remove(waiter)
+            self.shed += 1
+        return True
+
+    def _admitted(self, waiter: _Waiter):
+        get_metrics().observe(
+            "jarvis_llm_queue_seconds", time.monotonic() - waiter.enqueued_at,
+            stage=PRIORITY_NAMES.get(waiter.priority, str(waiter.priority)),
+            help_text="Time LLM requests waited for a slot"
+        )
+
+    def acquire(self, priority: int = INTERACTIVE_PRIORITY, deadline: float = None):
+        """Block until a slot is free; raises LLMOverloaded past the deadline"""
+        deadline = deadline or self.default_deadline(priority)
+        waiter = _Waiter(priority)
+        self._enqueue(waiter)
+        if not waiter.event.wait(max(0.0, deadline - time.monotonic())) and self._abandon(waiter):
+            raise LLMOverloaded(f"No LLM slot free within the {PRIORITY_NAMES.get(priority)} deadline")
+        self._admitted(waiter)
+
+    async def aacquire(self, priority: int = INTERACTIVE_PRIORITY, deadline: float = None):
+        """Async acquire; waits on the event loop instead of blocking a thread"""
+        deadline = deadline or self.default_deadline(priority)
+        waiter = _Waiter(priority, asyncio.get_running_loop())
+        self._enqueue(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                raise LLMOverloaded(f"No LLM slot free within the {PRIORITY_NAMES.get(priority)} deadline")
+        except asyncio.CancelledError:
+            if not self._abandon(waiter):
+                self.release()
+            raise
+        self._admitted(waiter)
+
+    def release(self):
+        with self._lock:
+            self._busy -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: int = INTERACTIVE_PRIORITY, deadline: float = None):
+        self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, priority: int = INTERACTIVE_PRIORITY, deadline: float = None):
+        await self.aacquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'slots': self.slots,
+                'busy': self._busy,
+                'queued': {PRIORITY_NAMES.get(p, str(p)): len(q) for p, q in self._queues.items()},
+                'served': self.served,
+                'shed': self.shed,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Process-wide scheduler shared by every LLMHandler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
@@ -0,0 +1,102 @@
+"""
+Ingestion Manifest Module
+Tracks what has been ingested per file so re-ingestion only touches changes
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from typing import List, Optional
+import config
+
+
+def hash_text(text: str) -> str:
+    """Stable hash of a chunk's text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """Hash a file's bytes together with the settings that shape its vectors.
+
+    Changing the chunking parameters or the embedding model therefore makes
+    every file look modified and triggers a full re-ingestion.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{config.EMBEDDING_MODEL}|{config.CHUNK_SIZE}|{config.CHUNK_OVERLAP}|".encode('utf-8'))
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionManifest:
+    """JSON manifest of {file_name: {content_hash, chunks: [{hash, id}]}}"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(config.DATA_DIR, config.MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._files = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._files = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Could not read ingestion manifest, starting fresh: {e}")
+
+        # Number of files referring to each vector id (deduplicated chunks are shared)
+        self._ref_counts = Counter()
+        for entry in self._files.values():
+            self._ref_counts.update(self._entry_ids(entry))
+
+    @staticmethod
+    def _entry_ids(entry: dict) -> set:
+        return {chunk['id'] for chunk in entry['chunks']}
+
+    def get(self, file_name: str) -> Optional[dict]:
+        with self._lock:
+            return self._files.get(file_name)
+
+    def vector_ids(self, file_name: str) -> List[str]:
+        entry = self.get(file_name)
+        return [chunk['id'] for chunk in entry['chunks']] if entry else []
+
+    def update(self, file_name: str, content_hash: str, chunks: List[dict]):
+        """Record the current state of a file and persist the manifest"""
+        with self._lock:
+            previous = self._files.get(file_name)
+            if previous:
+                self._ref_counts.subtract(self._entry_ids(previous))
+            self._files[file_name] = {'content_hash': content_hash, 'chunks': chunks}
+            self._ref_counts.update(self._entry_ids(self._files[file_name]))
+            self._save()
+
+    def remove(self, file_name: str):
+        with self._lock:
+            previous = self._files.pop(file_name, None)
+            if previous is not None:
+                self._ref_counts.subtract(self._entry_ids(previous))
+                self._save()
+
+    def shared_ids(self, file_name: str, vector_ids: List[str]) -> set:
+        """The vector ids that files other than `file_name` still refer to"""
+        with self._lock:
+            entry = self._files.get(file_name)
+            own = self._entry_ids(entry) if entry else set()
+            return {
+                vector_id for vector_id in vector_ids
+                if self._ref_counts[vector_id] - (1 if vector_id in own else 0) > 0
+            }
+
+    def files(self) -> List[str]:
+        with self._lock:
+            return list(self._files)
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._files, f)
+        os.replace(tmp_path, self.path)
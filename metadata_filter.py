@@ -0,0 +1,135 @@
+"""
+Metadata Filter Module
+Search scope helpers: namespace names and Pinecone-style metadata filters,
+evaluated locally for the local store and lexical hits
+"""
+import time
+import unicodedata
+from typing import Iterable, List
+
+
+NAMESPACE_SEPARATOR = "::"
+MAX_NAMESPACE_LENGTH = 64
+
+
+def validate_namespace(namespace: str) -> str:
+    """Return `namespace` if it can be used as a namespace name, else raise ValueError.
+
+    "" is the default namespace. Other names may not contain the "::" that
+    joins a namespace to its manifest keys and vector ids, path separators
+    or control characters, and may not be "." or "..".
+    """
+    if not isinstance(namespace, str):
+        raise ValueError(f"Namespace must be a string, not {type(namespace).__name__}")
+    if not namespace:
+        return namespace
+    if namespace != namespace.strip():
+        raise ValueError("Namespace may not start or end with whitespace")
+    if len(namespace) > MAX_NAMESPACE_LENGTH:
+        raise ValueError(f"Namespace may be at most {MAX_NAMESPACE_LENGTH} characters")
+    if namespace in (".", ".."):
+        raise ValueError(f"Namespace may not be {namespace!r}")
+    if NAMESPACE_SEPARATOR in namespace:
+        raise ValueError(f"Namespace may not contain {NAMESPACE_SEPARATOR!r}")
+    if "/" in namespace or "\\" in namespace:
+        raise ValueError("Namespace may not contain path separators")
+    if any(unicodedata.category(char) in ("Cc", "Cf") for char in namespace):
+        raise ValueError("Namespace may not contain control characters")
+    return namespace
+
+
+def _compare(value, operator: str, operand) -> bool:
+    if operator == '$eq':
+        return value == operand
+    if operator == '$ne':
+        return value != operand
+    if operator == '$in':
+        return value in operand
+    if operator == '$nin':
+        return value not in operand
+    try:
+        if operator == '$gt':
+            return value > operand
+        if operator == '$gte':
+            return value >= operand
+        if operator == '$lt':
+            return value < operand
+        if operator == '$lte':
+            return value <= operand
+    except TypeError:
+        # Mismatched types (e.g. a string field against a number) never match
+        return False
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def _field_matches(metadata: dict, field: str, condition) -> bool:
+    if not isinstance(condition, dict):
+        condition = {'$eq': condition}
+
+    for operator, operand in condition.items():
+        if operator == '$exists':
+            if (field in metadata) != bool(operand):
+                return False
+            continue
+        if field not in metadata:
+            if operator in ('$ne', '$nin'):
+                continue
+            return False
+
+        value = metadata[field]
+        if isinstance(value, list):
+            # List fields (tags) match when any element does, and exclusions when none does
+            if operator in ('$ne', '$nin'):
+                matched = all(_compare(item, operator, operand) for item in value)
+            else:
+                matched = any(_compare(item, operator, operand) for item in value)
+        else:
+            matched = _compare(value, operator, operand)
+        if not matched:
+            return False
+    return True
+
+
+def matches_filter(metadata: dict, metadata_filter: dict) -> bool:
+    """Whether metadata satisfies a Pinecone metadata filter.
+
+    Supports field equality shorthand, $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin/
+    $exists, and $and/$or. List fields match like Pinecone's: a tag list
+    equals a value when it contains it.
+    """
+    if not metadata_filter:
+        return True
+    metadata = metadata or {}
+
+    for key, condition in metadata_filter.items():
+        if key == '$and':
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif not _field_matches(metadata, key, condition):
+            return False
+    return True
+
+
+def build_filter(sources: Iterable[str] = None, file_types: Iterable[str] = None,
+                 tags: Iterable[str] = None, since_days: float = None) -> dict:
+    """Filter on the fields DocumentIngestion stores with every chunk.
+
+    Each argument narrows the search; tags match chunks carrying any of
+    them. Returns {} when nothing is selected.
+    """
+    clauses: List[dict] = []
+    if sources:
+        clauses.append({'source': {'$in': list(sources)}})
+    if file_types:
+        clauses.append({'file_type': {'$in': [file_type.lower().lstrip('.') for file_type in file_types]}})
+    if tags:
+        clauses.append({'tags': {'$in': list(tags)}})
+    if since_days:
+        clauses.append({'ingested_at': {'$gte': int(time.time() - since_days * 86400)}})
+
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
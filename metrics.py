@@ -0,0 +1,240 @@
+"""
+Metrics Module
+Per-stage latency tracing, in-memory histograms and Prometheus text export
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import config
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+COUNT_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+RETRY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+# Buckets and help text of the values traces record with `set`; {kind} is the trace kind
+VALUE_METRICS = {
+    'prompt_tokens': (TOKEN_BUCKETS, "Prompt tokens sent to the LLM per {kind}"),
+    'chunks': (COUNT_BUCKETS, "Chunks produced per {kind}"),
+    'upsert_retries': (RETRY_BUCKETS, "Vector store upsert requests retried per {kind}"),
+}
+
+
+class Histogram:
+    """Cumulative Prometheus-style buckets plus a window of recent observations.
+
+    Buckets, count and sum cover the lifetime of the process; percentiles are
+    computed over the last `window` observations so they follow current load.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...], window: int):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentiles(self) -> dict:
+        if not self.recent:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+        p50, p95, p99 = np.percentile(np.fromiter(self.recent, dtype=np.float64), [50, 95, 99])
+        return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+
+class MetricsRegistry:
+    """Histograms keyed by metric name and an optional `stage` label"""
+
+    def __init__(self, window: int = None):
+        self.window = window or config.METRICS_WINDOW
+        self._histograms: Dict[Tuple[str, Optional[str]], Histogram] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, stage: str = None, help_text: str = "",
+                buckets: Tuple[float, ...] = SECONDS_BUCKETS):
+        with self._lock:
+            key = (name, stage)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets, self.window)
+                self._help.setdefault(name, help_text)
+            self._histograms[key].observe(value)
+
+    def _sorted(self) -> List[Tuple[Tuple[str, Optional[str]], Histogram]]:
+        return sorted(self._histograms.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+
+    def summary(self) -> List[dict]:
+        """One row per histogram: name, stage, count, mean and recent percentiles"""
+        with self._lock:
+            rows = []
+            for (name, stage), histogram in self._sorted():
+                rows.append({
+                    'metric': name,
+                    'stage': stage,
+                    'count': histogram.count,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                    **histogram.percentiles(),
+                })
+            return rows
+
+    def to_prometheus(self) -> str:
+        """Render every histogram in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            current = None
+            for (name, stage), histogram in self._sorted():
+                if name != current:
+                    current = name
+                    lines.append(f"# HELP {name} {self._help.get(name) or name}")
+                    lines.append(f"# TYPE {name} histogram")
+                label = f'stage="{stage}",' if stage else ""
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label}le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label}le="+Inf"}} {histogram.count}')
+                suffix = f"{{{label.rstrip(',')}}}" if label else ""
+                lines.append(f"{name}_sum{suffix} {histogram.sum}")
+                lines.append(f"{name}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+class Trace:
+    """Timings of one request (a chat, or one ingested file).
+
+    Stages are timed with `with trace.stage('embed'):`; `mark` records a
+    point in time since the trace started (e.g. the first streamed token)
+    and `set` records a value such as the prompt token count, published with
+    its buckets and help text from VALUE_METRICS. Nothing is published until
+    `finish` (or `publish`) is called, so passing a throwaway Trace is free.
+    A trace built from a `parent` starts with its timings and start time, for
+    requests that share work done once for a batch. The inherited timings
+    and values are reported in its result but not published again: the
+    parent publishes them once with `publish`.
+    """
+
+    def __init__(self, kind: str = "chat", parent: "Trace" = None):
+        self.kind = kind
+        self.timings: Dict[str, float] = dict(parent.timings) if parent else {}
+        self.values: Dict[str, float] = dict(parent.values) if parent else {}
+        self._inherited = (set(self.timings), set(self.values))
+        self._start = parent._start if parent else time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        """Add time measured elsewhere (e.g. in a worker process) to a stage"""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self._inherited[0].discard(name)
+
+    def mark(self, name: str):
+        if name not in self.timings:
+            self.timings[name] = time.perf_counter() - self._start
+
+    def set(self, name: str, value: float):
+        self.values[name] = value
+        self._inherited[1].discard(name)
+
+    def as_dict(self) -> dict:
+        """Timings in milliseconds plus recorded values"""
+        result = {f"{name}_ms": round(seconds * 1000, 2) for name, seconds in self.timings.items()}
+        result.update(self.values)
+        return result
+
+    def publish(self, registry: MetricsRegistry = None):
+        """Publish the timings and values recorded so far, except those inherited from a parent"""
+        if not config.METRICS_ENABLED:
+            return
+        registry = registry or get_metrics()
+        inherited_timings, inherited_values = self._inherited
+        for name, seconds in self.timings.items():
+            if name not in inherited_timings:
+                registry.observe(f"jarvis_{self.kind}_stage_seconds", seconds, stage=name,
+                                 help_text=f"Duration of each {self.kind} stage in seconds")
+        for name, value in self.values.items():
+            if name in inherited_values:
+                continue
+            buckets, help_text = VALUE_METRICS.get(
+                name, (COUNT_BUCKETS, f"{name.replace('_', ' ').capitalize()} per {{kind}}")
+            )
+            registry.observe(f"jarvis_{self.kind}_{name}", value,
+                             help_text=help_text.format(kind=self.kind), buckets=buckets)
+
+    def finish(self, registry: MetricsRegistry = None) -> dict:
+        """Record the total and publish every timing and value"""
+        self.timings['total'] = time.perf_counter() - self._start
+        self._inherited[0].discard('total')
+        self.publish(registry)
+        return self.as_dict()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = None):
+    """Serve /metrics in Prometheus text format from a daemon thread (once per process)"""
+    global _server
+    port = port or config.METRICS_PORT
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = get_metrics().to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+        except OSError as e:
+            print(f"⚠️ Could not start metrics server on port {port}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"📊 Serving Prometheus metrics on :{port}/metrics")
+        return _server
@@ -0,0 +1,115 @@
+"""
+Model Registry Module
+Process-wide, lazily loaded embedding models shared by every component
+"""
+import asyncio
+import threading
+import time
+from typing import List
+import config
+from embedding_batcher import BULK_PRIORITY, QUERY_PRIORITY, BatchedEmbeddings, EmbeddingBatcher
+
+
+def embedding_model_id(model_name: str = None, backend: str = None) -> str:
+    """Identity of the vectors a model produces, used to key cached embeddings"""
+    model_name = model_name or config.EMBEDDING_MODEL
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend == "onnx":
+        return f"{model_name}#onnx-{'int8' if config.ONNX_QUANTIZE else 'fp32'}"
+    return model_name
+
+
+class SharedEmbeddings:
+    """Thread-safe, lazily loaded wrapper around the configured embedding backend.
+
+    The underlying model (HuggingFaceEmbeddings, or OnnxEmbeddings when
+    EMBEDDING_BACKEND is "onnx") is built on the first embed call, so
+    constructing components is cheap and the model is only loaded once per
+    process.
+    """
+
+    def __init__(self, model_name: str, device: str = 'cpu', backend: str = None):
+        self.model_name = model_name
+        self.device = device
+        self.backend = backend or config.EMBEDDING_BACKEND
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = self._load()
+                    print(f"✅ Loaded embedding model {self.model_name} ({self.backend}) "
+                          f"in {time.perf_counter() - start:.1f}s")
+        return self._model
+
+    def _load(self):
+        if self.backend == "onnx":
+            from onnx_embeddings import OnnxEmbeddings
+            try:
+                return OnnxEmbeddings(self.model_name)
+            except ImportError as e:
+                raise ImportError(f"EMBEDDING_BACKEND=onnx requires `pip install onnxruntime onnx` ({e})") from e
+
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=self.model_name,
+            model_kwargs={'device': self.device}
+        )
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.embed_query, text)
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_embeddings(model_name: str = None, device: str = 'cpu') -> SharedEmbeddings:
+    """Return the process-wide embedding model for a name, creating it on demand"""
+    model_name = model_name or config.EMBEDDING_MODEL
+    key = (model_name, device)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = SharedEmbeddings(model_name, device)
+        return _models[key]
+
+
+_batchers = {}
+
+
+def get_batcher(model_name: str = None) -> EmbeddingBatcher:
+    """Return the process-wide micro-batching scheduler for a model"""
+    model = get_embeddings(model_name)
+    with _models_lock:
+        if model.model_name not in _batchers:
+            _batchers[model.model_name] = EmbeddingBatcher(model)
+        return _batchers[model.model_name]
+
+
+def get_query_embeddings(model_name: str = None):
+    """Embeddings for interactive queries (high priority when batching)"""
+    if config.EMBEDDING_BATCHING_ENABLED:
+        return BatchedEmbeddings(get_batcher(model_name), QUERY_PRIORITY)
+    return get_embeddings(model_name)
+
+
+def get_ingestion_embeddings(model_name: str = None):
+    """Embeddings for bulk ingestion (yields to queries when batching)"""
+    if config.EMBEDDING_BATCHING_ENABLED:
+        return BatchedEmbeddings(get_batcher(model_name), BULK_PRIORITY)
+    return get_embeddings(model_name)
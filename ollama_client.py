@@ -0,0 +1,158 @@
+"""
+Ollama Client Module
+Minimal client for Ollama's /api/generate over pooled keep-alive connections
+"""
+import atexit
+import json
+import threading
+from typing import AsyncIterator, Iterator
+import config
+from http_pool import AsyncHTTPPool, HTTPPool
+
+
+class OllamaError(Exception):
+    pass
+
+
+class OllamaClient:
+    """Talks to Ollama directly with persistent HTTP connections.
+
+    Provides the `invoke` / `stream` / `ainvoke` / `astream` calls LLMHandler
+    uses from langchain's Ollama LLM. Connections are kept in a small pool and
+    reused across requests, so a chat does not pay a TCP handshake each time.
+    The async calls read the NDJSON stream with asyncio, so an async
+    generation holds no thread while the model runs. Every request sends
+    `keep_alive` so Ollama keeps the model loaded between requests instead of
+    unloading it after its default five minutes.
+    """
+
+    def __init__(self, model: str = None, base_url: str = None, keep_alive: str = None,
+                 timeout: float = None, pool_size: int = None):
+        self.model = model or config.OLLAMA_MODEL
+        self.keep_alive = keep_alive or config.OLLAMA_KEEP_ALIVE
+        pool_options = {
+            'size': pool_size or config.OLLAMA_POOL_SIZE,
+            'timeout': timeout or config.OLLAMA_REQUEST_TIMEOUT_SECONDS,
+        }
+        self.pool = HTTPPool(base_url or config.OLLAMA_BASE_URL, **pool_options)
+        self.apool = AsyncHTTPPool(base_url or config.OLLAMA_BASE_URL, **pool_options)
+
+    def _body(self, prompt: str, stream: bool) -> bytes:
+        return json.dumps({
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }).encode('utf-8')
+
+    def _post(self, prompt: str, stream: bool) -> tuple:
+        """Send a generate request; returns (connection, response)"""
+        connection, response = self.pool.request(
+            "POST", "/api/generate", body=self._body(prompt, stream), headers={"Content-Type": "application/json"}
+        )
+        if response.status != 200:
+            detail = response.read().decode('utf-8', 'replace')
+            self.pool.release(connection)
+            raise OllamaError(f"Ollama returned HTTP {response.status}: {detail[:200]}")
+        return connection, response
+
+    def _events(self, prompt: str, stream: bool) -> Iterator[dict]:
+        connection, response = self._post(prompt, stream)
+        finished = False
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get('error'):
+                    raise OllamaError(event['error'])
+                yield event
+                if event.get('done'):
+                    break
+            # Drain anything left so the connection can be reused
+            response.read()
+            finished = True
+        finally:
+            self.pool.release(connection, reusable=finished)
+
+    def invoke(self, prompt: str) -> str:
+        return "".join(event.get('response', '') for event in self._events(prompt, stream=False))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for event in self._events(prompt, stream=True):
+            if event.get('response'):
+                yield event['response']
+
+    async def _aevents(self, prompt: str, stream: bool) -> AsyncIterator[dict]:
+        """Async _events: the response is read on the event loop as it arrives"""
+        connection, response = await self.apool.request(
+            "POST", "/api/generate", body=self._body(prompt, stream), headers={"Content-Type": "application/json"}
+        )
+        finished = False
+        try:
+            if response.status != 200:
+                detail = (await response.read()).decode('utf-8', 'replace')
+                finished = True
+                raise OllamaError(f"Ollama returned HTTP {response.status}: {detail[:200]}")
+            # Read to the end of the body (Ollama closes it after the `done` event) so the connection is reusable
+            async for line in response.lines():
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get('error'):
+                    raise OllamaError(event['error'])
+                yield event
+            finished = True
+        finally:
+            # A generation abandoned midway closes its connection, which stops it in Ollama
+            self.apool.release(connection, reusable=finished and response.reusable)
+
+    async def ainvoke(self, prompt: str) -> str:
+        events = self._aevents(prompt, stream=False)
+        try:
+            return "".join([event.get('response', '') async for event in events])
+        finally:
+            await events.aclose()
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        events = self._aevents(prompt, stream=True)
+        try:
+            async for event in events:
+                if event.get('response'):
+                    yield event['response']
+        finally:
+            await events.aclose()
+
+    def close(self):
+        self.pool.close()
+        self.apool.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_ollama_client(model: str = None, base_url: str = None) -> OllamaClient:
+    """Process-wide client per (base_url, model), so every session shares its connection pools"""
+    key = (base_url or config.OLLAMA_BASE_URL, model or config.OLLAMA_MODEL)
+    with _clients_lock:
+        if key not in _clients:
+            if not _clients:
+                atexit.register(close_ollama_clients)
+            _clients[key] = OllamaClient(model=key[1], base_url=key[0])
+        return _clients[key]
+
+
+def close_ollama_clients():
+    """Close the shared clients (registered to run at exit once one is created)"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"⚠️ Could not close Ollama client for {client.model}: {e}")
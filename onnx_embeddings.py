@@ -0,0 +1,122 @@
+"""
+ONNX Embeddings Module
+CPU-optimised sentence embeddings with ONNX Runtime (optionally int8-quantised)
+
+Requires the optional packages `onnxruntime` and `onnx` (see requirements.txt).
+"""
+import os
+import re
+import threading
+from typing import List
+import numpy as np
+import config
+
+
+def onnx_model_dir(model_name: str) -> str:
+    """Directory holding the exported model and tokenizer for a model name"""
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    return os.path.join(config.DATA_DIR, config.ONNX_MODEL_DIR, safe_name)
+
+
+def export_onnx_model(model_name: str, quantize: bool = False) -> str:
+    """Export a Hugging Face encoder to ONNX (and int8) once; return the model path"""
+    directory = onnx_model_dir(model_name)
+    fp32_path = os.path.join(directory, "model.onnx")
+    int8_path = os.path.join(directory, "model.int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(directory, exist_ok=True)
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        print(f"📦 Exporting {model_name} to ONNX...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["JARVIS export sample"], return_tensors="pt")
+
+        # Pass inputs in the order of the model's forward() signature
+        names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in names}
+        dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in names),
+                fp32_path,
+                input_names=names,
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(directory)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print("📦 Quantizing ONNX model to int8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    return target
+
+
+class OnnxEmbeddings:
+    """Drop-in replacement for HuggingFaceEmbeddings backed by ONNX Runtime.
+
+    Reproduces the sentence-transformers pipeline for MiniLM (mean pooling
+    over the attention mask followed by L2 normalisation) so vectors stay
+    comparable with the PyTorch ones already stored in the index.
+    """
+
+    def __init__(self, model_name: str = None, quantize: bool = None, threads: int = None,
+                 max_length: int = None, batch_size: int = 32):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name or config.EMBEDDING_MODEL
+        self.quantize = config.ONNX_QUANTIZE if quantize is None else quantize
+        self.max_length = max_length or config.ONNX_MAX_SEQ_LENGTH
+        self.batch_size = batch_size
+
+        model_path = export_onnx_model(self.model_name, self.quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(model_path))
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or config.ONNX_INTRA_OP_THREADS or (os.cpu_count() or 1)
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names}
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = encoded['attention_mask'][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        # Sort by length so each batch pads to a similar size
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            positions = order[start:start + self.batch_size]
+            with self._lock:
+                vectors = self._encode([texts[i] for i in positions])
+            for position, vector in zip(positions, vectors):
+                results[position] = vector.tolist()
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -2,71 +2,303 @@
 RAG (Retrieval Augmented Generation) Module
 Handles retrieving relevant context and generating responses
 """
-from typing import List
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from pinecone import Pinecone
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterator, List, Optional
 import config
+from answer_cache import AnswerCache, answer_scope
+from context_packer import ContextPacker
+from docstore import get_docstore
+from lexical_index import get_lexical_index, reciprocal_rank_fusion
 from llm_handler import LLMHandler
+from llm_scheduler import BATCH_PRIORITY, INTERACTIVE_PRIORITY
+from metadata_filter import matches_filter, validate_namespace
+from metrics import Trace
+from model_registry import get_query_embeddings
+from vector_store import get_vector_store
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+_lexical_pool = None
+_lexical_pool_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache shared by every assistant"""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = AnswerCache()
+        return _answer_cache
+
+
+def _get_lexical_pool() -> ThreadPoolExecutor:
+    """Threads that run lexical lookups alongside embedding and vector search"""
+    global _lexical_pool
+    with _lexical_pool_lock:
+        if _lexical_pool is None:
+            _lexical_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lexical-search")
+        return _lexical_pool
 
 
 class RAGAssistant:
-    def __init__(self):
-        """Initialize RAG assistant"""
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=config.EMBEDDING_MODEL,
-            model_kwargs={'device': 'cpu'}
-        )
+    def __init__(self, embeddings=None, namespace: str = None, filters: dict = None):
+        """Initialize RAG assistant.
+        
+        Searches stay within `namespace` (default config.DEFAULT_NAMESPACE) and
+        chunks matching the metadata `filters`; see set_scope().
+        """
+        # Search scope used by chat and retrieval unless a call overrides it
+        self.namespace = validate_namespace(config.DEFAULT_NAMESPACE if namespace is None else namespace)
+        self.filters = filters or None
+        
+        # The embedding model is shared process-wide and loaded on first use
+        self.embeddings = embeddings or get_query_embeddings()
         
         self.llm_handler = LLMHandler()
         
-        # Initialize Pinecone
-        self.pc = None
-        self.index = None
-        if config.PINECONE_API_KEY:
-            self._init_pinecone()
+        # Keeps retrieved context within the prompt token budget
+        self.context_packer = ContextPacker()
+        
+        # Semantic cache of previous answers
+        self.answer_cache = None
+        if config.ANSWER_CACHE_ENABLED:
+            try:
+                self.answer_cache = get_answer_cache()
+            except Exception as e:
+                print(f"⚠️ Answer cache unavailable: {e}")
+        
+        # Chunk text is fetched from the local docstore by vector id
+        self.docstore = None
+        if config.DOCSTORE_ENABLED:
+            try:
+                self.docstore = get_docstore()
+            except Exception as e:
+                print(f"⚠️ Docstore unavailable: {e}")
+        
+        # BM25 index searched alongside the vectors (lexical hits need the docstore for text)
+        self.lexical_index = None
+        if config.HYBRID_SEARCH_ENABLED and self.docstore is not None:
+            try:
+                self.lexical_index = get_lexical_index()
+            except Exception as e:
+                print(f"⚠️ Lexical index unavailable: {e}")
+        
+        # The vector store client is created on first use
+        self._index = None
+        self._index_ready = False
+        self._index_lock = threading.Lock()
+    
+    @property
+    def index(self):
+        """The configured vector store, connected on first access"""
+        if not self._index_ready:
+            with self._index_lock:
+                if not self._index_ready:
+                    self._init_vector_store()
+                    self._index_ready = True
+        return self._index
     
-    def _init_pinecone(self):
-        """Initialize Pinecone connection"""
+    @index.setter
+    def index(self, value):
+        self._index = value
+        self._index_ready = True
+    
+    def _init_vector_store(self):
+        """Initialize the configured vector store (Pinecone or local)"""
         try:
-            self.pc = Pinecone(api_key=config.PINECONE_API_KEY)
-            self.index = self.pc.Index(config.PINECONE_INDEX_NAME)
-            print(f"✅ RAG connected to Pinecone index: {config.PINECONE_INDEX_NAME}")
+            self._index = get_vector_store()
+            if self._index:
+                print(f"✅ RAG connected to {self._index.name} vector store")
         except Exception as e:
-            print(f"⚠️ Pinecone initialization error: {e}")
+            print(f"⚠️ Vector store initialization error: {e}")
+    
+    def set_scope(self, namespace: str = None, filters: dict = None):
+        """Search only `namespace` and chunks matching `filters` (None keeps the namespace, clears filters).
+        
+        Raises ValueError for a name validate_namespace() rejects.
+        """
+        if namespace is not None:
+            self.namespace = validate_namespace(namespace)
+        self.filters = filters or None
+    
+    def _scope(self, namespace: Optional[str], filters: Optional[dict]) -> tuple:
+        """Resolve per-call scope arguments against the assistant's scope"""
+        return (self.namespace if namespace is None else validate_namespace(namespace),
+                self.filters if filters is None else (filters or None))
     
-    def retrieve_context(self, query: str, top_k: int = None) -> List[dict]:
-        """Retrieve relevant context from Pinecone"""
+    def embed_query(self, query: str) -> Optional[List[float]]:
+        """Embed a query, returning None on failure"""
+        try:
+            return self.embeddings.embed_query(query)
+        except Exception as e:
+            print(f"❌ Error embedding query: {e}")
+            return None
+    
+    def retrieve_context(self, query: str, top_k: int = None, query_embedding: List[float] = None,
+                         namespace: str = None, filters: dict = None) -> List[dict]:
+        """Retrieve relevant context from the vector store.
+        
+        Only `namespace` is searched, and only chunks whose metadata matches
+        `filters` are scored; both default to the assistant's scope.
+        """
         if not self.index:
-            print("⚠️ Pinecone index not available")
+            print("⚠️ Vector store not available")
             return []
         
         if top_k is None:
             top_k = config.TOP_K_RESULTS
+        namespace, filters = self._scope(namespace, filters)
+        
+        # Lexical search runs while the query is embedded and searched
+        lexical = None
+        if self.lexical_index is not None:
+            lexical = _get_lexical_pool().submit(self._lexical_search, query, namespace, filters)
         
         try:
             # Create query embedding
-            query_embedding = self.embeddings.embed_query(query)
+            if query_embedding is None:
+                query_embedding = self.embeddings.embed_query(query)
             
-            # Search Pinecone
+            # Search the vector store
             results = self.index.query(
                 vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True
+                top_k=self._dense_top_k(top_k),
+                include_metadata=True,
+                namespace=namespace,
+                filter=filters
             )
             
-            # Extract relevant information
+            if lexical is not None:
+                results = self._fuse(results, lexical.result(), top_k)
+            return self._contexts_from_matches(results)
+        except Exception as e:
+            print(f"❌ Error retrieving context: {e}")
+            return []
+    
+    def _dense_top_k(self, top_k: int) -> int:
+        """Vector results to fetch: extra candidates when they will be fused"""
+        if self.lexical_index is None:
+            return top_k
+        return max(top_k, config.HYBRID_CANDIDATES)
+    
+    def _lexical_search(self, query: str, namespace: str = "", filters: dict = None) -> List[str]:
+        """Ids of the best BM25 matches for a query within a scope, or [] on failure.
+        
+        The BM25 index spans every namespace, so extra hits are fetched and
+        checked against their docstore metadata.
+        """
+        try:
+            self.lexical_index.refresh()
+            ids = [doc_id for doc_id, _ in self.lexical_index.search(query, config.FILTERED_LEXICAL_CANDIDATES)]
+            documents = self.docstore.get_many(ids)
+            return [
+                doc_id for doc_id in ids
+                if doc_id in documents
+                and documents[doc_id]['metadata'].get('namespace', "") == namespace
+                and matches_filter(documents[doc_id]['metadata'], filters)
+            ][:config.HYBRID_CANDIDATES]
+        except Exception as e:
+            print(f"⚠️ Lexical search failed: {e}")
+            return []
+    
+    @staticmethod
+    def _fuse(results: dict, lexical_ids: List[str], top_k: int) -> dict:
+        """Combine dense matches and lexical hits with reciprocal rank fusion.
+        
+        Lexical-only hits have no metadata; their text and source are filled
+        in from the docstore. Scores become fused RRF scores.
+        """
+        dense = {match['id']: match for match in results['matches']}
+        if not lexical_ids:
+            return {'matches': results['matches'][:top_k]}
+        
+        fused = reciprocal_rank_fusion([list(dense), lexical_ids])[:top_k]
+        return {'matches': [
+            {**dense.get(doc_id, {'id': doc_id, 'metadata': {}}), 'score': score}
+            for doc_id, score in fused
+        ]}
+    
+    def _contexts_from_matches(self, results) -> List[dict]:
+        """Extract relevant information from a vector store query result"""
+        return self._contexts_from_many([results])[0]
+    
+    def _contexts_from_many(self, results_list: list) -> List[List[dict]]:
+        """Build contexts for several query results with one docstore fetch.
+        
+        Vectors written before the docstore existed still carry their text in
+        metadata; everything else is looked up by id.
+        """
+        missing = [
+            match['id']
+            for results in results_list for match in results['matches']
+            if 'text' not in (match.get('metadata') or {})
+        ]
+        documents = {}
+        if missing and self.docstore is not None:
+            try:
+                documents = self.docstore.get_many(missing)
+            except Exception as e:
+                print(f"⚠️ Could not read chunk text from docstore: {e}")
+        
+        contexts_list = []
+        for results in results_list:
             contexts = []
             for match in results['matches']:
+                metadata = match.get('metadata') or {}
+                document = documents.get(match['id'])
+                if document:
+                    metadata = {**document['metadata'], 'text': document['text'], **metadata}
+                    if document['sources']:
+                        # Deduplicated chunks list every file that contains them
+                        prefix = f"{document['metadata'].get('namespace')}::"
+                        metadata['source'] = ", ".join(
+                            source[len(prefix):] if source.startswith(prefix) else source
+                            for source in document['sources']
+                        )
                 contexts.append({
-                    'text': match['metadata'].get('text', ''),
-                    'source': match['metadata'].get('source', 'Unknown'),
+                    'id': match['id'],
+                    'text': metadata.get('text', ''),
+                    'source': metadata.get('source', 'Unknown'),
                     'score': match['score']
                 })
-            
-            return contexts
+            contexts_list.append(contexts)
+        return contexts_list
+    
+    def retrieve_many(self, queries: List[str], top_k: int = None, query_embeddings: List[List[float]] = None,
+                      namespace: str = None, filters: dict = None) -> List[List[dict]]:
+        """Retrieve context for many queries with one embedding batch.
+        
+        Searches run concurrently (remote store) or as one matrix product
+        (local store). Results are in the same order as `queries`.
+        """
+        if not self.index:
+            print("⚠️ Vector store not available")
+            return [[] for _ in queries]
+        
+        if top_k is None:
+            top_k = config.TOP_K_RESULTS
+        namespace, filters = self._scope(namespace, filters)
+        
+        lexical = None
+        if self.lexical_index is not None:
+            lexical = _get_lexical_pool().submit(
+                lambda: [self._lexical_search(query, namespace, filters) for query in queries]
+            )
+        
+        try:
+            if query_embeddings is None:
+                query_embeddings = self.embeddings.embed_documents(queries)
+            results = self.index.query_many(query_embeddings, top_k=self._dense_top_k(top_k), include_metadata=True,
+                                            namespace=namespace, filter=filters)
+            if lexical is not None:
+                results = [self._fuse(result, ids, top_k) for result, ids in zip(results, lexical.result())]
+            return self._contexts_from_many(results)
         except Exception as e:
             print(f"❌ Error retrieving context: {e}")
-            return []
+            return [[] for _ in queries]
     
     def format_context(self, contexts: List[dict]) -> str:
         """Format retrieved contexts into a string"""
@@ -79,16 +311,12 @@ class RAGAssistant:
         
         return formatted
     
-    def generate_answer(self, query: str, contexts: List[dict]) -> str:
-        """Generate answer using LLM with retrieved context"""
-        if not self.llm_handler.is_available():
-            # If no LLM, just return the context
-            return self.format_context(contexts)
-        
-        # Create prompt with context
-        context_text = "\n\n".join([ctx['text'] for ctx in contexts])
+    def build_prompt(self, query: str, contexts: List[dict]) -> str:
+        """Create the LLM prompt from the query and the context that fits the token budget"""
+        packed = self.context_packer.pack(contexts)
+        context_text = "\n\n".join([ctx['text'] for ctx in packed])
         
-        prompt = f"""You are JARVIS, a helpful personal assistant. Answer the user's question based on the provided context from their notes.
+        return f"""You are JARVIS, a helpful personal assistant. Answer the user's question based on the provided context from their notes.
 
 Context from notes:
 {context_text}
@@ -102,24 +330,336 @@ Instructions:
 - Cite sources when relevant
 
 Answer:"""
+    
+    def _traced_prompt(self, query: str, contexts: List[dict], trace: Trace) -> str:
+        """Build the prompt, recording its duration and token count"""
+        with trace.stage('format'):
+            prompt = self.build_prompt(query, contexts)
+        trace.set('prompt_tokens', self.context_packer.measure(prompt))
+        return prompt
+    
+    def generate_answer(self, query: str, contexts: List[dict], trace: Trace = None,
+                        priority: int = INTERACTIVE_PRIORITY) -> str:
+        """Generate answer using LLM with retrieved context"""
+        trace = trace or Trace()
+        if not self.llm_handler.is_available():
+            # If no LLM, just return the context
+            with trace.stage('format'):
+                return self.format_context(contexts)
         
-        # Generate response
-        response = self.llm_handler.generate_response(prompt)
+        # Create prompt with context
+        prompt = self._traced_prompt(query, contexts, trace)
+        
+        # Generate response; without streaming the first token arrives with the whole answer
+        with trace.stage('generate'):
+            response = self.llm_handler.generate_response(prompt, priority)
+        trace.mark('first_token')
         return response
     
+    def stream_answer(self, query: str, contexts: List[dict], trace: Trace = None) -> Iterator[str]:
+        """Yield the answer token by token"""
+        trace = trace or Trace()
+        if not self.llm_handler.is_available():
+            yield self.format_context(contexts)
+            return
+        
+        prompt = self._traced_prompt(query, contexts, trace)
+        with trace.stage('generate'):
+            for token in self.llm_handler.stream_response(prompt):
+                trace.mark('first_token')
+                yield token
+    
+    def _answer_scope(self) -> str:
+        """Answers are only reused within the same search scope and from the same model"""
+        return answer_scope(self.namespace, self.filters, self.llm_handler.model_id())
+    
+    def _cached_answer(self, query_embedding: List[float], contexts: List[dict]) -> Optional[dict]:
+        """Look up a previous answer for a similar query over the same chunks"""
+        if self.answer_cache is None or query_embedding is None:
+            return None
+        return self.answer_cache.lookup(query_embedding, [ctx['id'] for ctx in contexts], self._answer_scope())
+    
+    def _cache_answer(self, query: str, query_embedding: List[float], contexts: List[dict], answer: str):
+        """Remember a generated answer (never errors or context-only fallbacks)"""
+        if self.answer_cache is None or query_embedding is None:
+            return
+        if self.llm_handler.llm is None or not answer or answer.startswith("❌"):
+            return
+        try:
+            self.answer_cache.store(
+                query, query_embedding, [ctx['id'] for ctx in contexts],
+                answer, [ctx['source'] for ctx in contexts], self._answer_scope()
+            )
+        except Exception as e:
+            print(f"⚠️ Could not cache answer: {e}")
+    
     def chat(self, query: str) -> dict:
         """Main chat function that retrieves context and generates response"""
         print(f"💬 Processing query: {query}")
+        trace = Trace("chat")
         
         # Retrieve relevant context
-        contexts = self.retrieve_context(query)
+        with trace.stage('embed'):
+            query_embedding = self.embed_query(query)
+        with trace.stage('search'):
+            contexts = self.retrieve_context(query, query_embedding=query_embedding) if query_embedding else []
+        
+        # Reuse a cached answer, or generate one
+        with trace.stage('cache'):
+            cached = self._cached_answer(query_embedding, contexts)
+        if cached:
+            answer = cached['answer']
+        else:
+            answer = self.generate_answer(query, contexts, trace)
+            self._cache_answer(query, query_embedding, contexts, answer)
+        
+        return {
+            'query': query,
+            'answer': answer,
+            'sources': [ctx['source'] for ctx in contexts],
+            'num_sources': len(contexts),
+            'cached': cached is not None,
+            'timings': trace.finish()
+        }
+    
+    def chat_many(self, queries: List[str], max_concurrency: int = None) -> Iterator[dict]:
+        """Answer many queries, yielding results in completion order.
+        
+        All queries are embedded in one batch and searched together; LLM
+        calls then go through a bounded pool of `max_concurrency` workers.
+        Each result has the chat() fields plus 'index', the position of its
+        query in `queries`.
+        """
+        if not queries:
+            return
+        
+        print(f"💬 Processing {len(queries)} queries")
+        batch_trace = Trace("chat")
+        with batch_trace.stage('embed'):
+            try:
+                query_embeddings = self.embeddings.embed_documents(queries)
+            except Exception as e:
+                print(f"❌ Error embedding queries: {e}")
+                query_embeddings = [None] * len(queries)
+        
+        with batch_trace.stage('search'):
+            if query_embeddings[0] is not None:
+                all_contexts = self.retrieve_many(queries, query_embeddings=query_embeddings)
+            else:
+                all_contexts = [[] for _ in queries]
+        
+        # Embedding and search ran once for the whole batch, so they are published once;
+        # each query's result still reports them alongside its own stages
+        batch_trace.publish()
+        
+        def answer(index: int) -> dict:
+            query, query_embedding, contexts = queries[index], query_embeddings[index], all_contexts[index]
+            trace = Trace("chat", parent=batch_trace)
+            with trace.stage('cache'):
+                cached = self._cached_answer(query_embedding, contexts)
+            if cached:
+                response = cached['answer']
+            else:
+                # Bulk questions queue behind interactive chat for the LLM
+                response = self.generate_answer(query, contexts, trace, BATCH_PRIORITY)
+                self._cache_answer(query, query_embedding, contexts, response)
+            return {
+                'index': index,
+                'query': query,
+                'answer': response,
+                'sources': [ctx['source'] for ctx in contexts],
+                'num_sources': len(contexts),
+                'cached': cached is not None,
+                'timings': trace.finish()
+            }
+        
+        max_concurrency = max_concurrency or config.CHAT_MANY_LLM_CONCURRENCY
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            futures = [pool.submit(answer, index) for index in range(len(queries))]
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def chat_stream(self, query: str) -> Iterator[dict]:
+        """Streaming chat: yields a 'sources' event, then 'token' events, then 'done'.
+        
+        Sources are sent before the first token so the UI can show them while
+        the answer is still being generated.
+        """
+        print(f"💬 Processing query: {query}")
+        trace = Trace("chat")
+        
+        with trace.stage('embed'):
+            query_embedding = self.embed_query(query)
+        with trace.stage('search'):
+            contexts = self.retrieve_context(query, query_embedding=query_embedding) if query_embedding else []
+        sources = [ctx['source'] for ctx in contexts]
+        yield {'type': 'sources', 'sources': sources, 'num_sources': len(contexts)}
+        
+        with trace.stage('cache'):
+            cached = self._cached_answer(query_embedding, contexts)
+        if cached:
+            tokens = [cached['answer']]
+            trace.mark('first_token')
+            yield {'type': 'token', 'text': cached['answer']}
+        else:
+            tokens = []
+            for token in self.stream_answer(query, contexts, trace):
+                tokens.append(token)
+                yield {'type': 'token', 'text': token}
+            self._cache_answer(query, query_embedding, contexts, "".join(tokens))
+        
+        yield {
+            'type': 'done',
+            'query': query,
+            'answer': "".join(tokens),
+            'sources': sources,
+            'num_sources': len(contexts),
+            'cached': cached is not None,
+            'timings': trace.finish()
+        }
+    
+    async def aembed_query(self, query: str) -> Optional[List[float]]:
+        """Embed a query without blocking the event loop, with a timeout"""
+        try:
+            return await asyncio.wait_for(
+                self.embeddings.aembed_query(query),
+                timeout=config.ASYNC_EMBED_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            print(f"❌ Embedding timed out after {config.ASYNC_EMBED_TIMEOUT_SECONDS}s")
+            return None
+        except Exception as e:
+            print(f"❌ Error embedding query: {e}")
+            return None
+    
+    async def aretrieve_context(self, query: str, top_k: int = None, query_embedding: List[float] = None,
+                                namespace: str = None, filters: dict = None) -> List[dict]:
+        """Async counterpart of retrieve_context"""
+        if not self.index:
+            print("⚠️ Vector store not available")
+            return []
+        
+        if top_k is None:
+            top_k = config.TOP_K_RESULTS
+        namespace, filters = self._scope(namespace, filters)
+        
+        lexical = None
+        if self.lexical_index is not None:
+            lexical = asyncio.wrap_future(_get_lexical_pool().submit(self._lexical_search, query, namespace, filters))
+        
+        if query_embedding is None:
+            query_embedding = await self.aembed_query(query)
+            if query_embedding is None:
+                return []
+        
+        try:
+            results = await asyncio.wait_for(
+                self.index.aquery(query_embedding, top_k=self._dense_top_k(top_k), include_metadata=True,
+                                  namespace=namespace, filter=filters),
+                timeout=config.ASYNC_SEARCH_TIMEOUT_SECONDS
+            )
+            if lexical is not None:
+                results = self._fuse(results, await lexical, top_k)
+            return self._contexts_from_matches(results)
+        except asyncio.TimeoutError:
+            print(f"❌ Vector search timed out after {config.ASYNC_SEARCH_TIMEOUT_SECONDS}s")
+            return []
+        except Exception as e:
+            print(f"❌ Error retrieving context: {e}")
+            return []
+    
+    async def agenerate_answer(self, query: str, contexts: List[dict], trace: Trace = None,
+                               priority: int = INTERACTIVE_PRIORITY) -> str:
+        """Async counterpart of generate_answer"""
+        trace = trace or Trace()
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.llm_handler.is_available):
+            return self.format_context(contexts)
+        
+        prompt = self._traced_prompt(query, contexts, trace)
+        try:
+            with trace.stage('generate'):
+                response = await asyncio.wait_for(
+                    self.llm_handler.agenerate_response(prompt, priority),
+                    timeout=config.ASYNC_LLM_TIMEOUT_SECONDS
+                )
+            trace.mark('first_token')
+            return response
+        except asyncio.TimeoutError:
+            return f"❌ Timed out generating response after {config.ASYNC_LLM_TIMEOUT_SECONDS}s"
+    
+    async def achat(self, query: str) -> dict:
+        """Async counterpart of chat.
+        
+        Cancelling the awaiting task cancels whichever stage is running.
+        Each stage has its own timeout (see ASYNC_*_TIMEOUT_SECONDS).
+        """
+        print(f"💬 Processing query: {query}")
+        loop = asyncio.get_running_loop()
+        trace = Trace("chat")
+        
+        with trace.stage('embed'):
+            query_embedding = await self.aembed_query(query)
+        with trace.stage('search'):
+            contexts = await self.aretrieve_context(query, query_embedding=query_embedding) if query_embedding else []
         
-        # Generate answer
-        answer = self.generate_answer(query, contexts)
+        with trace.stage('cache'):
+            cached = await loop.run_in_executor(None, self._cached_answer, query_embedding, contexts)
+        if cached:
+            answer = cached['answer']
+        else:
+            answer = await self.agenerate_answer(query, contexts, trace)
+            await loop.run_in_executor(None, self._cache_answer, query, query_embedding, contexts, answer)
         
         return {
             'query': query,
             'answer': answer,
             'sources': [ctx['source'] for ctx in contexts],
-            'num_sources': len(contexts)
+            'num_sources': len(contexts),
+            'cached': cached is not None,
+            'timings': trace.finish()
+        }
+    
+    async def achat_stream(self, query: str) -> AsyncIterator[dict]:
+        """Async counterpart of chat_stream"""
+        print(f"💬 Processing query: {query}")
+        
+        loop = asyncio.get_running_loop()
+        trace = Trace("chat")
+        with trace.stage('embed'):
+            query_embedding = await self.aembed_query(query)
+        with trace.stage('search'):
+            contexts = await self.aretrieve_context(query, query_embedding=query_embedding) if query_embedding else []
+        sources = [ctx['source'] for ctx in contexts]
+        yield {'type': 'sources', 'sources': sources, 'num_sources': len(contexts)}
+        
+        with trace.stage('cache'):
+            cached = await loop.run_in_executor(None, self._cached_answer, query_embedding, contexts)
+        tokens = []
+        if cached:
+            tokens.append(cached['answer'])
+            trace.mark('first_token')
+            yield {'type': 'token', 'text': cached['answer']}
+        elif await loop.run_in_executor(None, self.llm_handler.is_available):
+            prompt = self._traced_prompt(query, contexts, trace)
+            with trace.stage('generate'):
+                async for token in self.llm_handler.astream_response(prompt):
+                    trace.mark('first_token')
+                    tokens.append(token)
+                    yield {'type': 'token', 'text': token}
+            await loop.run_in_executor(
+                None, self._cache_answer, query, query_embedding, contexts, "".join(tokens)
+            )
+        else:
+            tokens.append(self.format_context(contexts))
+            yield {'type': 'token', 'text': tokens[0]}
+        
+        yield {
+            'type': 'done',
+            'query': query,
+            'answer': "".join(tokens),
+            'sources': sources,
+            'num_sources': len(contexts),
+            'cached': cached is not None,
+            'timings': trace.finish()
         }
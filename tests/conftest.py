@@ -0,0 +1,58 @@
+"""
+Shared pytest fixtures: modules are imported from the repository root and
+nothing is written under the real DATA_DIR
+"""
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import docstore  # noqa: E402
+import lexical_index  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Point config.DATA_DIR at a fresh temporary directory for each test.
+
+    The process-wide docstore and lexical index are reset so they open their
+    files under it; local vector stores are already shared per path.
+    """
+    monkeypatch.setattr(config, "DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(docstore, "_docstore", None)
+    monkeypatch.setattr(lexical_index, "_lexical_index", None)
+    return tmp_path / "data"
+
+
+class HashEmbeddings:
+    """Deterministic stand-in for the embedding model: one pseudo-random vector per text"""
+
+    def __init__(self, dimension: int = 16):
+        self.dimension = dimension
+        self.calls = []
+
+    def _embed(self, text: str) -> list:
+        seed = int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=self.dimension).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        self.calls.append(len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+@pytest.fixture
+def ingestion(monkeypatch):
+    """DocumentIngestion on the local backend with hash embeddings"""
+    from ingestion import DocumentIngestion
+
+    monkeypatch.setattr(config, "VECTOR_STORE_BACKEND", "local")
+    monkeypatch.setattr(config, "EMBEDDING_DIMENSION", 16)
+    return DocumentIngestion(embeddings=HashEmbeddings())
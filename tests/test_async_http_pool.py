@@ -0,0 +1,218 @@
+"""
+AsyncHTTPPool against a scripted HTTP/1.1 server: Content-Length and chunked
+bodies, keep-alive reuse, partial reads, and connections the server closes
+"""
+import asyncio
+
+import pytest
+
+from http_pool import AsyncHTTPPool, HTTPStatusError
+
+
+class ScriptedServer:
+    """Answers each request by path; counts accepted and concurrently open connections"""
+
+    def __init__(self):
+        self.accepted = 0
+        self.open = 0
+        self.max_open = 0
+        self.requests = []
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self.accepted += 1
+        self.open += 1
+        self.max_open = max(self.max_open, self.open)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, path, _ = request_line.decode('latin-1').split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                self.requests.append((method, path, body))
+                if not await self._respond(path, writer):
+                    return
+        finally:
+            self.open -= 1
+            writer.close()
+
+    async def _respond(self, path: str, writer) -> bool:
+        """Write the response for `path`; False closes the connection afterwards"""
+        if path.startswith("/length"):
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 11\r\n\r\nhello world")
+        elif path == "/chunked":
+            writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+            for piece in (b'{"n": 1}\n{"n"', b': 2}\n', b'{"n": 3}'):
+                writer.write(b"%x;ext=1\r\n%s\r\n" % (len(piece), piece))
+                await writer.drain()
+                await asyncio.sleep(0.01)
+            writer.write(b"0\r\nX-Trailer: yes\r\n\r\n")
+        elif path == "/large":
+            writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+            for _ in range(50):
+                writer.write(b"%x\r\n%s\r\n" % (4096, b"x" * 4096))
+            writer.write(b"0\r\n\r\n")
+        elif path == "/then-close":
+            # Keep-alive response, then the server drops the idle connection
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+            return False
+        elif path == "/until-eof":
+            writer.write(b"HTTP/1.1 200 OK\r\n\r\nbody without a length")
+            await writer.drain()
+            return False
+        elif path == "/json":
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 9\r\n\r\n{"ok": 1}')
+        elif path == "/overloaded":
+            writer.write(b"HTTP/1.1 429 Too Many Requests\r\nRetry-After: 2\r\nContent-Length: 4\r\n\r\nbusy")
+        elif path == "/slow":
+            await asyncio.sleep(0.05)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        await writer.drain()
+        return True
+
+
+async def fetch(pool: AsyncHTTPPool, path: str) -> bytes:
+    connection, response = await pool.request("GET", path)
+    body = await response.read()
+    pool.release(connection, reusable=response.reusable)
+    return body
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_content_length_body_and_keep_alive_reuse():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url, size=2)
+            assert [await fetch(pool, f"/length/{i}") for i in range(3)] == [b"hello world"] * 3
+            pool.close()
+            return server.accepted
+
+    assert run(scenario()) == 1
+
+
+def test_chunked_body_is_dechunked_and_split_into_lines():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url)
+            connection, response = await pool.request("POST", "/chunked", b'{"prompt": "hi"}')
+            lines = [line async for line in response.lines()]
+            assert response.reusable
+            pool.release(connection, reusable=response.reusable)
+
+            # The trailer was consumed, so the next response parses cleanly on the same connection
+            assert await fetch(pool, "/length") == b"hello world"
+            assert await fetch(pool, "/chunked") == b'{"n": 1}\n{"n": 2}\n{"n": 3}'
+            assert server.requests[0] == ("POST", "/chunked", b'{"prompt": "hi"}')
+            return lines, server.accepted
+
+    lines, accepted = run(scenario())
+    assert lines == [b'{"n": 1}', b'{"n": 2}', b'{"n": 3}']
+    assert accepted == 1
+
+
+def test_partial_read_does_not_poison_the_pool():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url)
+            connection, response = await pool.request("GET", "/large")
+            assert await response.read_some()
+            assert not response.reusable
+            pool.release(connection, reusable=response.reusable)
+
+            assert await fetch(pool, "/length") == b"hello world"
+            return server.accepted
+
+    assert run(scenario()) == 2
+
+
+def test_server_closed_keep_alive_connection_is_replaced():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url)
+            # Pooled right away: the close is not noticed until the next request uses it
+            assert await fetch(pool, "/then-close") == b"ok"
+            assert await fetch(pool, "/length") == b"hello world"
+
+            # Pooled after the close has arrived: the checkout skips it
+            assert await fetch(pool, "/then-close") == b"ok"
+            await asyncio.sleep(0.05)
+            assert await fetch(pool, "/length") == b"hello world"
+            return server.accepted
+
+    assert run(scenario()) >= 3
+
+
+def test_body_without_length_runs_until_close():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url)
+            connection, response = await pool.request("GET", "/until-eof")
+            assert response.will_close
+            body = await response.read()
+            assert not response.reusable
+            pool.release(connection, reusable=response.reusable)
+            return body
+
+    assert run(scenario()) == b"body without a length"
+
+
+def test_request_json_decodes_and_raises_on_status():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url)
+            assert await pool.request_json("POST", "/json", {'q': 1}) == {'ok': 1}
+            with pytest.raises(HTTPStatusError) as error:
+                await pool.request_json("POST", "/overloaded", {'q': 1})
+            # The error body was read, so the connection is still usable
+            assert await pool.request_json("POST", "/json", b"{}") == {'ok': 1}
+            return error.value, server.accepted
+
+    error, accepted = run(scenario())
+    assert error.status == 429 and error.retry_after == 2
+    assert accepted == 1
+
+
+def test_pool_bounds_open_connections_per_loop():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url, size=2)
+            bodies = await asyncio.gather(*(fetch(pool, "/slow") for _ in range(8)))
+            return bodies, server.max_open
+
+    bodies, max_open = run(scenario())
+    assert bodies == [b"ok"] * 8
+    assert max_open <= 2
+
+
+def test_cancelled_request_releases_its_slot():
+    async def scenario():
+        async with ScriptedServer() as server:
+            pool = AsyncHTTPPool(server.url, size=1)
+            task = asyncio.ensure_future(fetch(pool, "/slow"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return await asyncio.wait_for(fetch(pool, "/length"), 2)
+
+    assert run(scenario()) == b"hello world"
@@ -0,0 +1,133 @@
+"""
+Deduplication: identical chunks share one vector, near-identical ones keep
+their own text unless DEDUP_NEAR_DUPLICATES is set, and sharing stays inside
+a namespace
+"""
+import random
+
+import pytest
+
+import config
+from docstore import DocStore
+from dedup import NearDuplicateIndex, hamming, simhash
+from manifest import hash_text
+
+WORDS = (
+    "backup replica lag threshold engineer paused restarted verified log applied manual "
+    "alert dashboard panel health nightly job failed write ahead"
+).split()
+_rng = random.Random(0)
+BODY = " ".join(_rng.choice(WORDS) for _ in range(300))
+
+
+def report(n: int) -> str:
+    """A templated incident report; only the ticket number and host differ"""
+    return f"Incident report INC-{4000 + 37 * n}\nHost: db-{n:02d}.prod\n{BODY}"
+
+
+@pytest.fixture(autouse=True)
+def one_chunk_per_report(monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_SIZE", 4000)
+
+
+def write_reports(tmp_path, count: int = 4) -> list:
+    files = []
+    for n in range(count):
+        path = tmp_path / f"inc{n}.txt"
+        path.write_text(report(n), encoding='utf-8')
+        files.append((str(path), f"inc{n}.txt"))
+    return files
+
+
+def test_reports_are_near_duplicates():
+    # The fixture only means something if SimHash considers the variants near-identical
+    assert hamming(simhash(report(0)), simhash(report(3))) <= config.DEDUP_MAX_HAMMING
+
+
+def test_docstore_matches_exact_copies_only_by_default(tmp_path):
+    store = DocStore(str(tmp_path / "docstore.sqlite3"))
+    store.put_many([("inc0_a", report(0), {'source': "inc0.txt"})])
+
+    assert store.find_duplicate(report(0)) == "inc0_a"
+    assert store.find_duplicate(report(3)) is None
+    assert store.find_duplicate(report(3), near=True) == "inc0_a"
+
+
+def test_docstore_keeps_to_accepted_ids(tmp_path):
+    store = DocStore(str(tmp_path / "docstore.sqlite3"))
+    store.put_many([
+        ("work::inc0_a", report(0), {'source': "inc0.txt"}),
+        ("inc0_b", report(0), {'source': "inc0.txt"}),
+        ("work::inc1_a", report(1), {'source': "inc1.txt"}),
+    ])
+    default_only = lambda vector_id: "::" not in vector_id  # noqa: E731
+
+    assert store.find_duplicate(report(0), accept=default_only) == "inc0_b"
+    assert store.find_duplicate(report(1), accept=default_only, near=True) == "inc0_b"
+    assert store.find_duplicate(report(2), accept=lambda vector_id: False, near=True) is None
+
+
+def test_planned_chunks_match_exact_copies_only_by_default():
+    planned = NearDuplicateIndex()
+    planned.add("work::a", hash_text(report(0)), report(0))
+    planned.add("a", hash_text(report(0)), report(0))
+
+    assert planned.find(hash_text(report(0)), report(0)) == "work::a"
+    assert planned.find(hash_text(report(0)), report(0), accept=lambda vector_id: "::" not in vector_id) == "a"
+    assert planned.find(hash_text(report(3)), report(3)) is None
+    assert NearDuplicateIndex(near=True).find(hash_text(report(3)), report(3)) is None
+    near = NearDuplicateIndex(near=True)
+    near.add("a", hash_text(report(0)), report(0))
+    assert near.find(hash_text(report(3)), report(3)) == "a"
+
+
+def test_identifier_unique_to_a_variant_can_be_retrieved(ingestion, tmp_path):
+    for path, name in write_reports(tmp_path):
+        assert ingestion.ingest_file(path, name) is not None
+
+    assert ingestion.index.describe_index_stats()['total_vector_count'] == 4
+    hits = ingestion.lexical_index.search("db-03.prod", 3)
+    assert hits
+    best = ingestion.docstore.get_many([hits[0][0]])[hits[0][0]]
+    assert "db-03.prod" in best['text'] and "INC-4111" in best['text']
+    assert best['sources'] == ["inc3.txt"]
+
+
+def test_identical_chunks_share_one_vector(ingestion, tmp_path):
+    (path, name), = write_reports(tmp_path, 1)
+    copy_path = tmp_path / "copy.txt"
+    copy_path.write_text(report(0), encoding='utf-8')
+
+    ingestion.ingest_file(path, name)
+    ingestion.ingest_file(str(copy_path), "copy.txt")
+
+    assert ingestion.index.describe_index_stats()['total_vector_count'] == 1
+    shared_id, = ingestion.manifest.vector_ids("copy.txt")
+    assert shared_id == ingestion.manifest.vector_ids(name)[0]
+    assert ingestion.docstore.get_many([shared_id])[shared_id]['sources'] == ["inc0.txt", "copy.txt"]
+
+
+def test_near_duplicate_sharing_is_opt_in(ingestion, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DEDUP_NEAR_DUPLICATES", True)
+    for path, name in write_reports(tmp_path):
+        ingestion.ingest_file(path, name)
+
+    assert ingestion.index.describe_index_stats()['total_vector_count'] == 1
+
+
+def test_exact_duplicate_is_found_behind_another_namespace(ingestion, tmp_path):
+    path = tmp_path / "runbook.txt"
+    path.write_text(report(0), encoding='utf-8')
+    copy_path = tmp_path / "copy.txt"
+    copy_path.write_text(report(0), encoding='utf-8')
+
+    # The first stored copy belongs to another namespace and cannot be shared
+    ingestion.for_namespace("work").ingest_file(str(path), "runbook.txt")
+    ingestion.ingest_file(str(path), "runbook.txt")
+    ingestion.ingest_file(str(copy_path), "copy.txt")
+
+    stats = ingestion.index.describe_index_stats()
+    assert stats['namespaces']['work'] == {'vector_count': 1}
+    assert stats['total_vector_count'] == 2
+    assert ingestion.manifest.vector_ids("copy.txt") == ingestion.manifest.vector_ids("runbook.txt")
+    assert not ingestion.manifest.vector_ids("copy.txt")[0].startswith("work::")
@@ -0,0 +1,69 @@
+"""
+EmbeddingBatcher: concurrent queries share a forward pass, and a full bulk
+batch runs as one pass instead of being split behind queries
+"""
+import threading
+
+from conftest import HashEmbeddings
+from embedding_batcher import BULK_PRIORITY, QUERY_PRIORITY, BatchedEmbeddings, EmbeddingBatcher
+
+
+class GatedEmbeddings(HashEmbeddings):
+    """Blocks each forward pass until the test lets it run"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def embed_documents(self, texts: list) -> list:
+        self.started.set()
+        self.gate.wait(5)
+        return super().embed_documents(texts)
+
+
+def test_full_bulk_batch_runs_in_one_pass():
+    model = HashEmbeddings()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=0, bulk_batch_size=16)
+    texts = [f"chunk {i}" for i in range(16)]
+
+    vectors = BatchedEmbeddings(batcher, BULK_PRIORITY).embed_documents(texts)
+
+    assert model.calls == [16]
+    assert vectors == [model._embed(text) for text in texts]
+
+
+def test_bulk_requests_larger_than_the_bulk_size_are_split():
+    model = HashEmbeddings()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=0, bulk_batch_size=8)
+    texts = [f"chunk {i}" for i in range(20)]
+
+    vectors = BatchedEmbeddings(batcher, BULK_PRIORITY).embed_documents(texts)
+
+    assert model.calls == [8, 8, 4]
+    assert vectors == [model._embed(text) for text in texts]
+
+
+def test_queries_are_split_at_the_batch_size():
+    model = HashEmbeddings()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=0, bulk_batch_size=16)
+
+    BatchedEmbeddings(batcher, QUERY_PRIORITY).embed_documents([f"q {i}" for i in range(10)])
+
+    assert model.calls == [4, 4, 2]
+
+
+def test_queued_queries_run_before_a_waiting_bulk_batch():
+    model = GatedEmbeddings()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=0, bulk_batch_size=16)
+    blocker = batcher.submit(["first"], QUERY_PRIORITY)
+    assert model.started.wait(5)
+
+    # Queued while the first pass runs: the bulk batch first, then two queries
+    bulk = batcher.submit([f"chunk {i}" for i in range(16)], BULK_PRIORITY)
+    queries = [batcher.submit([f"q {i}"], QUERY_PRIORITY) for i in range(2)]
+    model.gate.set()
+
+    for future in [blocker, bulk, *queries]:
+        future.result(5)
+    assert model.calls == [1, 2, 16]
@@ -0,0 +1,134 @@
+"""
+Incremental ingestion: unchanged files are skipped, edited files only embed
+their new chunks and drop stale ones, and an emptied file releases everything
+it stored
+"""
+import pytest
+
+import config
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_SIZE", 120)
+    monkeypatch.setattr(config, "CHUNK_OVERLAP", 0)
+
+
+def paragraph(word: str) -> str:
+    """Exactly one chunk of text whose distinctive term is `word`"""
+    text = f"{word} " + " ".join(f"{word}{i}" for i in range(20))
+    return text[:config.CHUNK_SIZE - 2].ljust(config.CHUNK_SIZE - 2, ".") + "\n\n"
+
+
+def write(path, *words):
+    path.write_text("".join(paragraph(word) for word in words), encoding='utf-8')
+    return str(path)
+
+
+def vector_count(ingestion) -> int:
+    return ingestion.index.describe_index_stats()['total_vector_count']
+
+
+def found(ingestion, word: str) -> bool:
+    """Whether the lexical index and the docstore still return a chunk for `word`"""
+    hits = ingestion.lexical_index.search(word, 5)
+    return bool(hits) and bool(ingestion.docstore.get_many([doc_id for doc_id, _ in hits]))
+
+
+def test_unchanged_file_is_skipped(ingestion, tmp_path):
+    path = write(tmp_path / "notes.txt", "alpha", "beta")
+    assert ingestion.ingest_file(path) is not None
+    calls = len(ingestion.embeddings.calls)
+
+    assert ingestion.ingest_file(path) is None
+    assert len(ingestion.embeddings.calls) == calls
+    assert ingestion.ingest_file(path, force=True) is not None
+
+
+def test_edit_embeds_only_new_chunks_and_drops_stale_ones(ingestion, tmp_path):
+    path = write(tmp_path / "notes.txt", "alpha", "beta", "gamma")
+    ingestion.ingest_file(path)
+    count = vector_count(ingestion)
+    ingestion.embedding_cache = None
+    ingestion.embeddings.calls.clear()
+
+    write(tmp_path / "notes.txt", "alpha", "delta", "gamma")
+    ingestion.ingest_file(path)
+
+    # Only the edited paragraph's chunks were embedded
+    assert sum(ingestion.embeddings.calls) < count
+    assert vector_count(ingestion) == count
+    assert found(ingestion, "delta") and found(ingestion, "alpha")
+    assert not found(ingestion, "beta")
+    assert len(ingestion.manifest.vector_ids("notes.txt")) == count
+
+
+def test_emptied_file_releases_its_chunks(ingestion, tmp_path):
+    path = write(tmp_path / "notes.txt", "alpha", "beta")
+    ingestion.ingest_file(path)
+    assert vector_count(ingestion) > 0
+
+    (tmp_path / "notes.txt").write_text("", encoding='utf-8')
+    assert ingestion.ingest_file(path) is None
+
+    assert vector_count(ingestion) == 0
+    assert not found(ingestion, "alpha") and not found(ingestion, "beta")
+    assert ingestion.docstore.stats()['chunks'] == 0
+    assert ingestion.manifest.vector_ids("notes.txt") == []
+    # Recorded as empty, so the next run skips it until it changes again
+    assert ingestion.manifest.get("notes.txt")['content_hash'] is not None
+    write(tmp_path / "notes.txt", "gamma")
+    assert ingestion.ingest_file(path) is not None
+    assert found(ingestion, "gamma")
+
+
+def test_emptied_file_keeps_chunks_other_files_share(ingestion, tmp_path):
+    first = write(tmp_path / "a.txt", "shared", "alpha")
+    second = write(tmp_path / "b.txt", "shared", "beta")
+    ingestion.ingest_file(first)
+    ingestion.ingest_file(second)
+    shared_ids = set(ingestion.manifest.vector_ids("a.txt")) & set(ingestion.manifest.vector_ids("b.txt"))
+    assert shared_ids
+
+    (tmp_path / "a.txt").write_text("", encoding='utf-8')
+    ingestion.ingest_file(first)
+
+    assert found(ingestion, "shared") and not found(ingestion, "alpha")
+    texts = ingestion.docstore.get_many(list(shared_ids))
+    assert all(text['sources'] == ["b.txt"] for text in texts.values())
+
+
+def test_emptied_file_in_a_namespace(ingestion, tmp_path):
+    work = ingestion.for_namespace("work")
+    path = write(tmp_path / "notes.txt", "alpha")
+    work.ingest_file(path)
+    ingestion.ingest_file(path)
+
+    (tmp_path / "notes.txt").write_text("", encoding='utf-8')
+    work.ingest_file(path)
+
+    stats = ingestion.index.describe_index_stats()
+    assert stats['namespaces'].get('work', {'vector_count': 0}) == {'vector_count': 0}
+    assert ingestion.manifest.vector_ids("work::notes.txt") == []
+    assert ingestion.manifest.vector_ids("notes.txt")
+
+
+def test_unreadable_new_file_records_nothing(ingestion, tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("", encoding='utf-8')
+    assert ingestion.ingest_file(str(path)) is None
+    assert ingestion.manifest.get("empty.txt") is None
+
+
+def test_bulk_pipeline_releases_an_emptied_file(ingestion, tmp_path):
+    first = write(tmp_path / "a.txt", "alpha")
+    second = write(tmp_path / "b.txt", "beta")
+    stats = ingestion.ingest_files([(first, "a.txt"), (second, "b.txt")])
+    assert stats['ingested'] == 2
+
+    (tmp_path / "a.txt").write_text("", encoding='utf-8')
+    stats = ingestion.ingest_files([(first, "a.txt"), (second, "b.txt")])
+
+    assert stats['failed'] == 1 and stats['skipped'] == 1
+    assert not found(ingestion, "alpha") and found(ingestion, "beta")
+    assert ingestion.manifest.vector_ids("a.txt") == []
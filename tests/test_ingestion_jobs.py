@@ -0,0 +1,133 @@
+"""
+Ingestion jobs: a stopped job resumes after its checkpoint without embedding
+stored chunks again, a cancelled job discards what it added, and an emptied
+file releases its chunks
+"""
+import pytest
+
+import config
+from ingestion_jobs import CANCELLED, DONE, FAILED, RUNNING, JobQueue, JobRunner
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_SIZE", 120)
+    monkeypatch.setattr(config, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(config, "PIPELINE_EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "JOBS_CHECKPOINT_CHUNKS", 2)
+
+
+def paragraph(word: str) -> str:
+    """Exactly one chunk of text whose distinctive term is `word`"""
+    text = f"{word} " + " ".join(f"{word}{i}" for i in range(20))
+    return text[:config.CHUNK_SIZE - 2].ljust(config.CHUNK_SIZE - 2, ".") + "\n\n"
+
+
+def write(path, *words):
+    path.write_text("".join(paragraph(word) for word in words), encoding='utf-8')
+    return str(path)
+
+
+WORDS = ("alpha", "beta", "gamma", "delta", "epsilon", "zeta")
+
+
+def run_next(runner: JobRunner) -> dict:
+    """Claim and run the next queued job on this thread; returns its final row"""
+    job = runner.queue.claim()
+    try:
+        runner.run_job(job)
+    finally:
+        runner.ingestion.planned_chunks.clear()
+    return runner.queue.get(job['id'])
+
+
+def stop_after(runner: JobRunner, batches: int):
+    """Ask the runner to stop once `batches` batches have been stored"""
+    store = runner.ingestion.store_in_pinecone
+    stored = []
+
+    def store_then_stop(*args, **kwargs):
+        result = store(*args, **kwargs)
+        stored.append(len(args[0]))
+        if len(stored) == batches:
+            runner._stop.set()
+        return result
+
+    runner.ingestion.store_in_pinecone = store_then_stop
+
+
+def test_stopped_job_resumes_after_its_checkpoint(ingestion, tmp_path):
+    path = write(tmp_path / "notes.txt", *WORDS)
+    queue = JobQueue()
+    runner = JobRunner(ingestion, queue)
+    job_id = runner.submit(path)
+    stop_after(runner, 2)
+
+    assert run_next(runner)['status'] == RUNNING
+    assert queue.get(job_id)['checkpoint'] == 4
+    assert sum(ingestion.embeddings.calls) == 4
+
+    # A restart requeues the interrupted job; only the chunks after the checkpoint are embedded
+    ingestion.embeddings.calls.clear()
+    restarted = JobRunner(ingestion, queue)
+    assert queue.requeue_interrupted() == 1
+    job = run_next(restarted)
+
+    assert job['status'] == DONE and job['chunks_total'] == len(WORDS)
+    assert ingestion.embeddings.calls == [2]
+    assert len(ingestion.manifest.vector_ids("notes.txt")) == len(WORDS)
+    assert ingestion.index.describe_index_stats()['total_vector_count'] == len(WORDS)
+
+
+def test_checkpoint_is_ignored_once_the_file_changes(ingestion, tmp_path):
+    path = write(tmp_path / "notes.txt", *WORDS)
+    queue = JobQueue()
+    runner = JobRunner(ingestion, queue)
+    runner.submit(path)
+    stop_after(runner, 2)
+    run_next(runner)
+
+    write(tmp_path / "notes.txt", "eta", "theta", "iota", "kappa")
+    ingestion.embeddings.calls.clear()
+    queue.requeue_interrupted()
+    job = run_next(JobRunner(ingestion, queue))
+
+    assert job['status'] == DONE and job['chunks_total'] == 4
+    assert sum(ingestion.embeddings.calls) == 4
+    assert len(ingestion.manifest.vector_ids("notes.txt")) == 4
+
+
+def test_cancelled_job_discards_the_vectors_it_added(ingestion, tmp_path):
+    path = write(tmp_path / "notes.txt", *WORDS)
+    queue = JobQueue()
+    runner = JobRunner(ingestion, queue)
+    job_id = runner.submit(path)
+    store = ingestion.store_in_pinecone
+
+    def store_then_cancel(*args, **kwargs):
+        result = store(*args, **kwargs)
+        queue.cancel(job_id)
+        return result
+
+    ingestion.store_in_pinecone = store_then_cancel
+    job = run_next(runner)
+
+    assert job['status'] == CANCELLED
+    assert ingestion.index.describe_index_stats()['total_vector_count'] == 0
+    assert ingestion.manifest.get("notes.txt") is None
+
+
+def test_emptied_file_job_releases_its_chunks(ingestion, tmp_path):
+    path = write(tmp_path / "notes.txt", "alpha", "beta")
+    queue = JobQueue()
+    runner = JobRunner(ingestion, queue)
+    runner.submit(path)
+    assert run_next(runner)['status'] == DONE
+
+    (tmp_path / "notes.txt").write_text("", encoding='utf-8')
+    runner.submit(path)
+    job = run_next(runner)
+
+    assert job['status'] == FAILED and job['error'] == "No content extracted"
+    assert ingestion.index.describe_index_stats()['total_vector_count'] == 0
+    assert ingestion.manifest.vector_ids("notes.txt") == []
@@ -0,0 +1,124 @@
+"""
+LexicalIndex: BM25 results before and after flush compaction, and after reload
+"""
+import random
+
+import pytest
+
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+WORDS = [
+    "router", "firewall", "ticket", "deploy", "rollback", "kafka", "postgres", "latency",
+    "incident", "runbook", "certificate", "dns", "cache", "queue", "backup", "restore",
+]
+
+
+def corpus(count: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    documents = {}
+    for i in range(count):
+        words = rng.choices(WORDS, k=rng.randint(3, 30))
+        documents[f"doc{i}"] = " ".join(words) + f" ERR-{i % 7} host{i}.example.com"
+    return documents
+
+
+QUERIES = ["router firewall", "kafka latency incident", "ERR-3", "host12.example.com", "backup restore dns", "unknown"]
+
+
+def assert_same_results(index: LexicalIndex, expected: LexicalIndex, top_k: int = 10):
+    for query in QUERIES:
+        got, want = index.search(query, top_k), expected.search(query, top_k)
+        assert [score for _, score in got] == pytest.approx([score for _, score in want], rel=1e-5)
+        # Ties may come back in either order; compare ids per (rounded) score
+        assert sorted((round(score, 4), doc_id) for doc_id, score in got) == \
+            sorted((round(score, 4), doc_id) for doc_id, score in want)
+
+
+def build_reference(tmp_path, documents: dict) -> LexicalIndex:
+    reference = LexicalIndex(str(tmp_path / "reference"))
+    reference.add(list(documents), list(documents.values()))
+    reference.flush()
+    return reference
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert list(tokenize("Ticket ERR-42 on host12.example.com")) == [
+        "ticket", "err-42", "err", "42", "host12.example.com", "host12", "example", "com",
+    ]
+
+
+def test_search_ranks_by_bm25(tmp_path):
+    index = LexicalIndex(str(tmp_path / "index"))
+    index.add(["a", "b", "c"], ["router router firewall", "router", "dns cache"])
+
+    hits = index.search("router firewall", 10)
+    assert [doc_id for doc_id, _ in hits] == ["a", "b"]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("missing words", 10) == []
+    assert index.search("router", 0) == []
+
+
+def test_compaction_matches_a_fresh_index(tmp_path):
+    documents = corpus(200)
+    index = LexicalIndex(str(tmp_path / "index"))
+    ids = list(documents)
+    index.add(ids[:120], [documents[doc_id] for doc_id in ids[:120]])
+    index.flush()
+
+    # Mix flushed and delta postings, removals of both, and re-added ids
+    index.add(ids[120:], [documents[doc_id] for doc_id in ids[120:]])
+    removed = set(random.Random(1).sample(ids, 60))
+    index.remove(sorted(removed))
+    replaced = {"doc5": "router firewall rewritten", "doc150": "kafka kafka kafka"}
+    index.add(list(replaced), list(replaced.values()))
+    removed -= set(replaced)
+
+    survivors = {doc_id: replaced.get(doc_id, text) for doc_id, text in documents.items() if doc_id not in removed}
+    for query in QUERIES:
+        assert not {doc_id for doc_id, _ in index.search(query, 200)} & removed
+
+    index.flush()
+    assert index.size == len(survivors)
+    assert index.stats()['documents'] == len(survivors)
+    assert not index._delta
+    assert_same_results(index, build_reference(tmp_path, survivors))
+    for query in QUERIES:
+        assert not {doc_id for doc_id, _ in index.search(query, 200)} & removed
+
+
+def test_compaction_drops_terms_without_postings(tmp_path):
+    index = LexicalIndex(str(tmp_path / "index"))
+    index.add(["a", "b"], ["router firewall", "zookeeper"])
+    index.flush()
+    index.remove(["b"])
+    index.flush()
+
+    assert "zookeeper" not in index._vocab
+    assert index.search("zookeeper", 5) == []
+    assert index.stats() == {'documents': 1, 'terms': 2, 'postings': 2}
+
+
+def test_reload_after_compaction(tmp_path):
+    documents = corpus(150, seed=2)
+    index = LexicalIndex(str(tmp_path / "index"))
+    index.add(list(documents), list(documents.values()))
+    index.flush()
+    index.remove([f"doc{i}" for i in range(0, 150, 4)])
+    index.flush()
+
+    reloaded = LexicalIndex(str(tmp_path / "index"))
+    assert reloaded.size == index.size
+    assert_same_results(reloaded, index)
+
+    # Another process flushing is picked up by refresh
+    index.remove(["doc1"])
+    index.flush()
+    reloaded._loaded_mtime = None
+    reloaded.refresh()
+    assert "doc1" not in {doc_id for doc_id, _ in reloaded.search("host1.example.com", 5)}
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert fused[0][0] == "b"
+    assert {doc_id for doc_id, _ in fused} == {"a", "b", "c", "d"}
@@ -0,0 +1,87 @@
+"""
+LLMHandler async paths: provider setup and fallback never block the event loop
+"""
+import asyncio
+import threading
+
+import pytest
+
+import config
+from llm_handler import LLMHandler
+
+
+class FailingLLM:
+    async def ainvoke(self, prompt: str) -> str:
+        raise ConnectionError("ollama went away")
+
+    async def astream(self, prompt: str):
+        raise ConnectionError("ollama went away")
+        yield
+
+
+class EchoLLM:
+    async def ainvoke(self, prompt: str) -> str:
+        return f"answer to {prompt}"
+
+    async def astream(self, prompt: str):
+        for token in ("answer ", "to ", prompt):
+            yield token
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(config, "LLM_WARMUP", False)
+    handler = LLMHandler()
+    handler.blocking_threads = []
+
+    def ensure_llm():
+        handler.blocking_threads.append(threading.current_thread())
+        if handler.llm is None:
+            handler.llm, handler.llm_type = FailingLLM(), "ollama"
+        return handler.llm
+
+    def fall_back(error):
+        handler.blocking_threads.append(threading.current_thread())
+        handler.llm, handler.llm_type = EchoLLM(), "ollama"
+        return True
+
+    handler._ensure_llm = ensure_llm
+    handler._fall_back = fall_back
+    return handler
+
+
+def test_agenerate_response_sets_up_and_falls_back_off_the_loop(handler):
+    async def run():
+        return await handler.agenerate_response("hi"), threading.current_thread()
+
+    answer, loop_thread = asyncio.run(run())
+    assert answer == "answer to hi"
+    assert len(handler.blocking_threads) == 2
+    assert loop_thread not in handler.blocking_threads
+
+
+def test_astream_response_sets_up_and_falls_back_off_the_loop(handler):
+    async def run():
+        return [token async for token in handler.astream_response("hi")], threading.current_thread()
+
+    tokens, loop_thread = asyncio.run(run())
+    assert "".join(tokens) == "answer to hi"
+    assert len(handler.blocking_threads) == 2
+    assert loop_thread not in handler.blocking_threads
+
+
+def test_sessions_share_one_ollama_client(monkeypatch):
+    import llm_handler
+    import ollama_client
+
+    monkeypatch.setattr(config, "LLM_WARMUP", False)
+    monkeypatch.setattr(ollama_client, "_clients", {})
+    monkeypatch.setattr(llm_handler, "check_ollama_health", lambda *args, **kwargs: True)
+
+    first, second = LLMHandler(), LLMHandler()
+    assert first._ensure_llm() is second._ensure_llm()
+    assert first.llm_type == second.llm_type == "ollama"
+    assert ollama_client.get_ollama_client(model="other") is not first.llm
+
+    ollama_client.close_ollama_clients()
+    assert ollama_client._clients == {}
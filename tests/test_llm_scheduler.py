@@ -0,0 +1,160 @@
+"""
+LLMScheduler: priorities, promotion of aged batch requests, deadlines, and the
+busy reply LLMHandler gives when a request is shed
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import config
+from llm_handler import LLMHandler
+from llm_scheduler import BATCH_PRIORITY, INTERACTIVE_PRIORITY, LLMOverloaded, LLMScheduler
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def start_waiter(scheduler: LLMScheduler, priority: int, served: list) -> threading.Thread:
+    """Queue a request on a thread; it records its priority when admitted"""
+    def run():
+        with scheduler.slot(priority, deadline=time.monotonic() + 10):
+            served.append(priority)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def queued(scheduler: LLMScheduler) -> int:
+    return sum(scheduler.stats()['queued'].values())
+
+
+def serve_after_release(scheduler: LLMScheduler, first: int, second: int, gap: float) -> list:
+    """Hold the only slot, queue `first` then `second` `gap` seconds later, release and
+    return the order they were served in"""
+    served = []
+    scheduler.acquire(INTERACTIVE_PRIORITY)
+    threads = [start_waiter(scheduler, first, served)]
+    wait_until(lambda: queued(scheduler) == 1)
+    time.sleep(gap)
+    threads.append(start_waiter(scheduler, second, served))
+    wait_until(lambda: queued(scheduler) == 2)
+
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+    assert scheduler.stats()['busy'] == 0
+    return served
+
+
+def test_interactive_is_served_before_batch():
+    scheduler = LLMScheduler(slots=1, promote_after=30)
+    assert serve_after_release(scheduler, BATCH_PRIORITY, INTERACTIVE_PRIORITY, gap=0.05) == [
+        INTERACTIVE_PRIORITY, BATCH_PRIORITY,
+    ]
+
+
+def test_batch_is_promoted_after_waiting_promote_after():
+    scheduler = LLMScheduler(slots=1, promote_after=0.1)
+    assert serve_after_release(scheduler, BATCH_PRIORITY, INTERACTIVE_PRIORITY, gap=0.2) == [
+        BATCH_PRIORITY, INTERACTIVE_PRIORITY,
+    ]
+
+
+def test_promoted_batch_does_not_overtake_older_interactive():
+    scheduler = LLMScheduler(slots=1, promote_after=0.0)
+    assert serve_after_release(scheduler, INTERACTIVE_PRIORITY, BATCH_PRIORITY, gap=0.05) == [
+        INTERACTIVE_PRIORITY, BATCH_PRIORITY,
+    ]
+
+
+def test_promote_after_defaults_to_config(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BATCH_PROMOTE_SECONDS", 0.1)
+    scheduler = LLMScheduler(slots=1)
+    assert scheduler.promote_after == 0.1
+    assert serve_after_release(scheduler, BATCH_PRIORITY, INTERACTIVE_PRIORITY, gap=0.2) == [
+        BATCH_PRIORITY, INTERACTIVE_PRIORITY,
+    ]
+
+
+def test_request_is_shed_at_its_deadline():
+    scheduler = LLMScheduler(slots=1)
+    scheduler.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(LLMOverloaded):
+        scheduler.acquire(INTERACTIVE_PRIORITY, deadline=time.monotonic() + 0.1)
+    assert 0.05 < time.monotonic() - start < 2
+    stats = scheduler.stats()
+    assert stats['shed'] == 1 and stats['queued'] == {'interactive': 0, 'batch': 0}
+
+    # The shed request did not take the slot with it
+    scheduler.release()
+    with scheduler.slot(deadline=time.monotonic() + 0.1):
+        assert scheduler.stats()['busy'] == 1
+    assert scheduler.stats()['busy'] == 0
+
+
+def test_async_request_is_shed_at_its_deadline():
+    scheduler = LLMScheduler(slots=1)
+
+    async def run():
+        async with scheduler.aslot():
+            with pytest.raises(LLMOverloaded):
+                await scheduler.aacquire(BATCH_PRIORITY, deadline=time.monotonic() + 0.1)
+        async with scheduler.aslot(deadline=time.monotonic() + 0.1):
+            return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats['busy'] == 1 and stats['shed'] == 1
+    assert scheduler.stats()['busy'] == 0
+
+
+class FakeLLM:
+    """Stands in for OllamaClient"""
+
+    model = "test-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt: str) -> str:
+        self.calls += 1
+        return f"answer to {prompt}"
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(config, "LLM_WARMUP", False)
+    monkeypatch.setattr(config, "OPENAI_API_KEY", None)
+    handler = LLMHandler()
+    handler.llm = FakeLLM()
+    handler.llm_type = "ollama"
+    handler.scheduler = LLMScheduler(slots=1)
+    return handler
+
+
+def test_handler_answers_when_a_slot_is_free(handler):
+    assert handler.generate_response("hi") == "answer to hi"
+    assert handler.scheduler.stats()['served'] == 1
+
+
+def test_handler_replies_busy_at_the_deadline(handler, monkeypatch):
+    monkeypatch.setattr(config, "LLM_INTERACTIVE_QUEUE_SECONDS", 0.1)
+    handler.scheduler.acquire()
+
+    reply = handler.generate_response("hi")
+
+    assert reply.startswith("❌ The assistant is busy (")
+    assert reply.endswith("Please try again shortly.")
+    assert handler.llm.calls == 0
+    assert handler.scheduler.stats()['shed'] == 1
+
+    handler.scheduler.release()
+    assert handler.generate_response("hi") == "answer to hi"
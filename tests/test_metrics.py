@@ -0,0 +1,58 @@
+"""
+Trace publishing: a batch's shared stages are counted once, not once per query
+"""
+import config
+from metrics import MetricsRegistry, Trace
+
+
+def counts(registry: MetricsRegistry) -> dict:
+    return {(row['metric'], row['stage']): row['count'] for row in registry.summary()}
+
+
+def test_child_traces_do_not_republish_inherited_stages(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    registry = MetricsRegistry(window=100)
+    batch = Trace("chat")
+    batch.add('embed', 0.2)
+    batch.add('search', 0.1)
+    batch.set('queries', 3)
+    batch.publish(registry)
+
+    results = []
+    for _ in range(3):
+        trace = Trace("chat", parent=batch)
+        trace.add('generation', 0.5)
+        trace.set('prompt_tokens', 100)
+        results.append(trace.finish(registry))
+
+    seen = counts(registry)
+    assert seen[("jarvis_chat_stage_seconds", "embed")] == 1
+    assert seen[("jarvis_chat_stage_seconds", "search")] == 1
+    assert seen[("jarvis_chat_queries", None)] == 1
+    assert seen[("jarvis_chat_stage_seconds", "generation")] == 3
+    assert seen[("jarvis_chat_stage_seconds", "total")] == 3
+    assert seen[("jarvis_chat_prompt_tokens", None)] == 3
+    # Each query's own result still shows the shared stages
+    assert all(result['embed_ms'] == 200.0 and result['search_ms'] == 100.0 for result in results)
+
+
+def test_child_publishes_a_stage_it_adds_to(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    registry = MetricsRegistry(window=100)
+    batch = Trace("chat")
+    batch.add('search', 0.1)
+
+    trace = Trace("chat", parent=batch)
+    trace.add('search', 0.05)
+    trace.finish(registry)
+
+    assert counts(registry)[("jarvis_chat_stage_seconds", "search")] == 1
+
+
+def test_nothing_is_published_when_metrics_are_disabled(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", False)
+    registry = MetricsRegistry(window=100)
+    trace = Trace("ingest")
+    trace.add('embed', 0.1)
+    assert 'total_ms' in trace.finish(registry)
+    assert registry.summary() == []
@@ -0,0 +1,103 @@
+"""
+Upsert batching: split_by_size ranges and how PineconeVectorStore.upsert_many
+reports a vector too large for any request
+"""
+import json
+import random
+
+import pytest
+
+import config
+from vector_store import PineconeVectorStore, encode_vector, split_by_size
+
+
+def check_ranges(sizes: list, ranges: list, max_bytes: int, max_count: int):
+    """Ranges cover every record once, in order, and only exceed a limit for a lone record"""
+    assert [start for start, _ in ranges] == [0] + [end for _, end in ranges[:-1]]
+    assert ranges[-1][1] == len(sizes)
+    for start, end in ranges:
+        assert 0 < end - start <= max_count
+        if end - start > 1:
+            assert sum(size + 1 for size in sizes[start:end]) <= max_bytes
+
+
+def test_empty_input_has_no_batches():
+    assert split_by_size([], 100, 10) == []
+
+
+def test_single_oversized_vector_gets_its_own_batch():
+    assert split_by_size([500], 100, 10) == [(0, 1)]
+    assert split_by_size([10, 10, 500, 10, 10], 100, 10) == [(0, 2), (2, 3), (3, 5)]
+    assert split_by_size([500, 500], 100, 10) == [(0, 1), (1, 2)]
+
+
+def test_byte_limit_counts_the_separator():
+    # Each record costs its size plus one byte for the comma between records
+    assert split_by_size([49, 49], 100, 10) == [(0, 2)]
+    assert split_by_size([49, 50], 100, 10) == [(0, 1), (1, 2)]
+
+
+def test_count_limit():
+    assert split_by_size([1] * 7, 10000, 3) == [(0, 3), (3, 6), (6, 7)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_sizes_respect_both_limits(seed):
+    rng = random.Random(seed)
+    sizes = [rng.choice([rng.randint(1, 300), rng.randint(900, 1500)]) for _ in range(500)]
+    ranges = split_by_size(sizes, 1000, 8)
+    check_ranges(sizes, ranges, 1000, 8)
+
+
+def test_encode_vector_is_compact_json():
+    record = encode_vector({'id': "a", 'values': [0.1234567891, 1.0], 'metadata': {'source': "x.md"}})
+    assert json.loads(record) == {'id': "a", 'values': [0.12345679, 1.0], 'metadata': {'source': "x.md"}}
+    assert b" " not in record
+    assert json.loads(encode_vector({'id': "b", 'values': [2.0], 'metadata': {}})) == {'id': "b", 'values': [2.0]}
+
+
+@pytest.fixture
+def pinecone(monkeypatch):
+    """A store whose requests are answered in-process, rejecting bodies over the byte budget"""
+    monkeypatch.setattr(config, "UPSERT_MAX_BATCH_BYTES", 2000)
+    monkeypatch.setattr(config, "UPSERT_BATCH_SIZE", 5)
+    store = PineconeVectorStore(host="http://127.0.0.1:9")
+    bodies = []
+
+    def request(path, body):
+        assert path == "/vectors/upsert"
+        bodies.append(body)
+        if len(body) > 2100:
+            raise RuntimeError("HTTP 400: request size exceeds the limit")
+        return {'upsertedCount': len(json.loads(body)['vectors'])}, 0
+
+    monkeypatch.setattr(store, "_request", request)
+    yield store, bodies
+    store.close()
+
+
+def vector(vector_id: str, dimension: int) -> dict:
+    return {'id': vector_id, 'values': [0.5] * dimension, 'metadata': {'source': "notes.md"}}
+
+
+def test_upsert_many_isolates_an_oversized_vector(pinecone):
+    store, bodies = pinecone
+    vectors = [vector(f"v{i}", 8) for i in range(12)]
+    vectors.insert(6, vector("huge", 1000))
+
+    result = store.upsert_many(vectors, namespace="work")
+
+    assert result.failed_ids == ["huge"]
+    assert result.upserted == 12
+    assert "starting at huge" in result.describe_failures()
+    sent = [[record['id'] for record in json.loads(body)['vectors']] for body in bodies]
+    assert ["huge"] in sent
+    assert sorted(vector_id for ids in sent for vector_id in ids) == sorted(v['id'] for v in vectors)
+    assert all(json.loads(body)['namespace'] == "work" for body in bodies)
+    assert result.batches == len(bodies)
+
+
+def test_upsert_raises_with_the_failed_batch(pinecone):
+    store, _ = pinecone
+    with pytest.raises(RuntimeError, match="batch of 1 starting at huge"):
+        store.upsert([vector("small", 8), vector("huge", 1000)])
@@ -0,0 +1,229 @@
+"""
+LocalVectorStore: upsert / delete / reload round trips, IVF consistency after
+deletes, and namespace partitions
+"""
+import os
+
+import numpy as np
+import pytest
+
+import config
+from vector_store import LocalVectorStore
+
+DIMENSION = 8
+
+
+def random_vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+def records(prefix: str, vectors: np.ndarray) -> list:
+    return [
+        {'id': f"{prefix}{i}", 'values': values.tolist(), 'metadata': {'n': i, 'prefix': prefix}}
+        for i, values in enumerate(vectors)
+    ]
+
+
+def exact_top(store: LocalVectorStore, query: np.ndarray, top_k: int) -> list:
+    """Ids of the top_k rows by brute-force cosine similarity"""
+    matrix = np.asarray(store._matrix[:store._count])
+    scores = matrix @ (query / np.linalg.norm(query))
+    return [store._ids[row] for row in np.argsort(-scores)[:top_k]]
+
+
+def assert_consistent(store: LocalVectorStore):
+    """Ids, positions, metadata and matrix rows all describe the same vectors"""
+    assert len(store._ids) == len(store._metadata) == store._count
+    assert store._positions == {vector_id: row for row, vector_id in enumerate(store._ids)}
+    for row, vector_id in enumerate(store._ids):
+        assert store._metadata[row]['prefix'] + str(store._metadata[row]['n']) == vector_id
+
+
+def assert_ivf_consistent(store: LocalVectorStore):
+    """Every live row is in exactly the cluster it is assigned to, and no other row is listed"""
+    ann = store._ann
+    listed = sorted(row for rows in ann.lists for row in rows)
+    assert listed == list(range(store._count))
+    for row in range(store._count):
+        assert row in ann.lists[ann.assignments[row]]
+    assert (ann.assignments[store._count:] == -1).all()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(str(tmp_path / "store"), DIMENSION)
+
+
+def test_upsert_query_and_replace(store):
+    vectors = random_vectors(20)
+    store.upsert(records("v", vectors))
+
+    result = store.query(vectors[3].tolist(), 1)
+    assert result['matches'][0]['id'] == "v3"
+    assert result['matches'][0]['metadata'] == {'n': 3, 'prefix': "v"}
+    assert result['matches'][0]['score'] == pytest.approx(1.0, abs=1e-5)
+
+    # Upserting an existing id replaces its vector and metadata in place
+    store.upsert([{'id': "v3", 'values': vectors[7].tolist(), 'metadata': {'n': 3, 'prefix': "v", 'new': True}}])
+    assert store._count == 20
+    matches = store.query(vectors[7].tolist(), 2)['matches']
+    assert {match['id'] for match in matches} == {"v3", "v7"}
+    assert store.query(vectors[7].tolist(), 2, include_metadata=False)['matches'][0].keys() == {'id', 'score'}
+
+
+def test_delete_swaps_last_row_into_the_hole(store):
+    vectors = random_vectors(10)
+    store.upsert(records("v", vectors))
+
+    store.delete(["v2", "v9", "missing"])
+
+    assert store._count == 8
+    assert "v2" not in store._positions and "v9" not in store._positions
+    # The last row moved into the deleted one's place
+    assert store._ids[2] == "v8"
+    np.testing.assert_allclose(store._matrix[2], vectors[8] / np.linalg.norm(vectors[8]), rtol=1e-5)
+    assert_consistent(store)
+    for i in (0, 1, 3, 4, 5, 6, 7, 8):
+        assert store.query(vectors[i].tolist(), 1)['matches'][0]['id'] == f"v{i}"
+
+
+def test_flush_and_reload_round_trip(store, tmp_path):
+    vectors = random_vectors(50)
+    store.upsert(records("v", vectors))
+    store.delete([f"v{i}" for i in range(0, 50, 5)])
+    store.flush()
+
+    reloaded = LocalVectorStore(store.path, DIMENSION)
+    assert reloaded._count == 40
+    assert reloaded._ids == store._ids
+    assert reloaded._metadata == store._metadata
+    assert_consistent(reloaded)
+    query = vectors[11].tolist()
+    assert reloaded.query(query, 5) == store.query(query, 5)
+
+    # The reloaded matrix is a read-only memmap; writes copy it first
+    reloaded.delete(["v11"])
+    reloaded.upsert(records("w", random_vectors(3, seed=1)))
+    reloaded.flush()
+
+    again = LocalVectorStore(store.path, DIMENSION)
+    assert again._count == 42
+    assert "v11" not in again._positions
+    assert again.query(random_vectors(3, seed=1)[2].tolist(), 1)['matches'][0]['id'] == "w2"
+    assert_consistent(again)
+
+
+def test_query_many_matches_query(store):
+    vectors = random_vectors(100)
+    store.upsert(records("v", vectors))
+    queries = random_vectors(5, seed=3).tolist()
+
+    for filter in (None, {'n': {'$lt': 10}}):
+        batched = store.query_many(queries, 4, filter=filter)
+        single = [store.query(query, 4, filter=filter) for query in queries]
+        for many, one in zip(batched, single):
+            assert [match['id'] for match in many['matches']] == [match['id'] for match in one['matches']]
+            # A matrix product and a matrix-vector product may differ in the last bits
+            assert [match['score'] for match in many['matches']] == pytest.approx(
+                [match['score'] for match in one['matches']], abs=1e-5)
+
+
+def test_filter_selects_rows_before_scoring(store):
+    vectors = random_vectors(30)
+    store.upsert(records("v", vectors))
+
+    matches = store.query(vectors[4].tolist(), 30, filter={'n': {'$gte': 20}})['matches']
+    assert sorted(match['id'] for match in matches) == sorted(f"v{i}" for i in range(20, 30))
+
+    # The cached filter rows are dropped when the store changes
+    store.delete(["v25"])
+    matches = store.query(vectors[4].tolist(), 30, filter={'n': {'$gte': 20}})['matches']
+    assert "v25" not in {match['id'] for match in matches} and len(matches) == 9
+
+
+@pytest.fixture
+def ivf_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ANN_INDEX", "ivf")
+    monkeypatch.setattr(config, "ANN_MIN_VECTORS", 200)
+    monkeypatch.setattr(config, "ANN_NLIST", 8)
+    store = LocalVectorStore(str(tmp_path / "ivf"), DIMENSION)
+    store.upsert(records("v", random_vectors(400)))
+    store.flush()
+    assert store._ann is not None
+    return store
+
+
+def test_ivf_stays_consistent_after_deletes_and_upserts(ivf_store):
+    rng = np.random.default_rng(5)
+    deleted = [f"v{i}" for i in rng.choice(400, size=120, replace=False)] + ["v399"]
+    ivf_store.delete(deleted)
+    ivf_store.upsert(records("w", random_vectors(30, seed=6)))
+
+    assert_ivf_consistent(ivf_store)
+
+    # Probing every cluster must give exactly the brute-force answer
+    ivf_store.nprobe = ivf_store._ann.nlist
+    for query in random_vectors(10, seed=7):
+        ids = [match['id'] for match in ivf_store.query(query.tolist(), 5)['matches']]
+        assert ids == exact_top(ivf_store, query, 5)
+        assert not set(ids) & set(deleted)
+
+
+def test_ivf_reloads_consistently_after_deletes(ivf_store):
+    ivf_store.delete([f"v{i}" for i in range(0, 400, 3)])
+    ivf_store.flush()
+
+    reloaded = LocalVectorStore(ivf_store.path, DIMENSION)
+    assert reloaded._ann is not None
+    assert_ivf_consistent(reloaded)
+    query = random_vectors(1, seed=8)[0].tolist()
+    assert reloaded.query(query, 5) == ivf_store.query(query, 5)
+
+
+def test_stale_ivf_files_are_removed_when_ann_is_disabled(ivf_store, monkeypatch):
+    monkeypatch.setattr(config, "ANN_INDEX", "none")
+    store = LocalVectorStore(ivf_store.path, DIMENSION)
+    store.delete(["v1", "v2"])
+    store.upsert(records("w", random_vectors(2, seed=9)))
+    store.flush()
+    assert not any(name.startswith("ivf_") for name in os.listdir(store.path))
+
+    # Re-enabling ANN must not pick up an index built for other rows
+    monkeypatch.setattr(config, "ANN_INDEX", "ivf")
+    assert LocalVectorStore(store.path, DIMENSION)._ann is None
+
+
+def test_namespaces_are_isolated_and_reloaded(store):
+    store.upsert(records("d", random_vectors(5)))
+    store.upsert(records("w", random_vectors(5, seed=1)), namespace="work")
+    store.upsert(records("p", random_vectors(5, seed=2)), namespace="personal notes")
+    store.flush()
+
+    reloaded = LocalVectorStore(store.path, DIMENSION)
+    assert reloaded.namespaces() == ["personal notes", "work"]
+    stats = reloaded.describe_index_stats()
+    assert stats['total_vector_count'] == 15
+    assert stats['namespaces']['work'] == {'vector_count': 5}
+
+    query = random_vectors(1, seed=3)[0].tolist()
+    assert {match['id'][0] for match in reloaded.query(query, 15)['matches']} == {"d"}
+    assert {match['id'][0] for match in reloaded.query(query, 15, namespace="work")['matches']} == {"w"}
+    assert reloaded.query(query, 3, namespace="missing") == {'matches': []}
+
+    reloaded.delete(["w0"], namespace="work")
+    assert reloaded.describe_index_stats()['namespaces']['work'] == {'vector_count': 4}
+    assert reloaded._count == 5
+
+
+@pytest.mark.parametrize("namespace", ["..", ".", "a::b", "../x", "x/y", "a\\b", "tab\there", " padded "])
+def test_unsafe_namespaces_are_rejected(store, namespace):
+    store.upsert(records("d", random_vectors(3)))
+    store.flush()
+
+    with pytest.raises(ValueError):
+        store.upsert(records("x", random_vectors(1, seed=1)), namespace=namespace)
+    store.flush()
+
+    # The default namespace's files were not touched
+    reloaded = LocalVectorStore(store.path, DIMENSION)
+    assert reloaded._ids == ["d0", "d1", "d2"]
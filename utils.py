@@ -1,6 +1,7 @@
 """
 Utility functions for JARVIS Assistant
 """
+import importlib.util
 import os
 from typing import List
 from pathlib import Path
@@ -14,6 +15,14 @@ def create_directories():
         print(f"✅ Created directory: {directory}")
 
 
+def is_installed(module: str) -> bool:
+    """Whether a module can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
 def check_environment():
     """Check if environment is properly configured"""
     print("🔍 Checking environment configuration...\n")
@@ -32,7 +41,9 @@ def check_environment():
         load_dotenv()
         
         # Check Pinecone
-        if not os.getenv('PINECONE_API_KEY'):
+        if os.getenv('VECTOR_STORE_BACKEND', 'pinecone') == 'local':
+            print("✅ Using local vector store (PINECONE_API_KEY not required)")
+        elif not os.getenv('PINECONE_API_KEY'):
             issues.append("❌ PINECONE_API_KEY not set in .env")
         else:
             print("✅ PINECONE_API_KEY is set")
@@ -59,24 +70,13 @@ def check_environment():
     except Exception as e:
         warnings.append(f"⚠️ Could not check Ollama: {e}")
     
-    # Check Python packages
-    try:
-        import streamlit
-        print("✅ Streamlit installed")
-    except ImportError:
-        issues.append("❌ Streamlit not installed. Run: pip install -r requirements.txt")
-    
-    try:
-        import pinecone
-        print("✅ Pinecone client installed")
-    except ImportError:
-        issues.append("❌ Pinecone not installed. Run: pip install -r requirements.txt")
-    
-    try:
-        from langchain_community.embeddings import HuggingFaceEmbeddings
-        print("✅ LangChain installed")
-    except ImportError:
-        issues.append("❌ LangChain not installed. Run: pip install -r requirements.txt")
+    # Check Python packages (located, not imported, so the check stays fast)
+    for module, name in [('streamlit', "Streamlit"), ('pinecone', "Pinecone client"),
+                         ('langchain_community', "LangChain")]:
+        if is_installed(module):
+            print(f"✅ {name} installed")
+        else:
+            issues.append(f"❌ {name} not installed. Run: pip install -r requirements.txt")
     
     # Summary
     print("\n" + "=" * 50)
@@ -115,23 +115,23 @@ def list_uploaded_files() -> List[str]:
 
 
 def get_index_stats():
-    """Get statistics about the Pinecone index"""
+    """Get statistics about the configured vector store"""
     try:
-        from pinecone import Pinecone
-        import config
+        from vector_store import get_vector_store
         
-        if not config.PINECONE_API_KEY:
+        index = get_vector_store()
+        if index is None:
             print("❌ Pinecone API key not configured")
             return
         
-        pc = Pinecone(api_key=config.PINECONE_API_KEY)
-        index = pc.Index(config.PINECONE_INDEX_NAME)
         stats = index.describe_index_stats()
         
-        print("📊 Pinecone Index Statistics:")
+        print(f"📊 Vector Store Statistics ({index.name}):")
         print(f"  Total vectors: {stats.get('total_vector_count', 0)}")
         print(f"  Dimension: {stats.get('dimension', 'N/A')}")
         print(f"  Index fullness: {stats.get('index_fullness', 0)}")
+        for namespace, namespace_stats in stats.get('namespaces', {}).items():
+            print(f"  Namespace {namespace or '(default)'}: {namespace_stats.get('vector_count', 0)} vectors")
         
     except Exception as e:
         print(f"❌ Error getting index stats: {e}")
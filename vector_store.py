@@ -0,0 +1,713 @@
+"""
+Vector Store Module
+Pluggable vector storage backends (remote Pinecone or an embedded local store)
+"""
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import numpy as np
+import config
+from ann_index import IVFIndex, default_nlist
+from http_pool import AsyncHTTPPool, HTTPPool, backoff_delay, is_transient
+from metadata_filter import matches_filter, validate_namespace
+
+
+class UpsertResult:
+    """Outcome of upsert_many: how much was written and which batches failed"""
+
+    def __init__(self):
+        self.upserted = 0
+        self.batches = 0
+        self.retries = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.failed: List[dict] = []   # {'ids', 'error', 'attempts'} per failed batch
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    @property
+    def failed_ids(self) -> List[str]:
+        return [vector_id for batch in self.failed for vector_id in batch['ids']]
+
+    def describe_failures(self) -> str:
+        return "; ".join(
+            f"batch of {len(batch['ids'])} starting at {batch['ids'][0]} "
+            f"failed after {batch['attempts']} attempt(s): {batch['error']}"
+            for batch in self.failed
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            'upserted': self.upserted,
+            'batches': self.batches,
+            'failed_batches': len(self.failed),
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'seconds': self.seconds,
+        }
+
+
+class VectorStore:
+    """Common interface for vector storage backends.
+
+    The method names and return shapes follow the Pinecone index API so the
+    ingestion and retrieval code can talk to any backend the same way.
+    Every call works within one namespace ("" is the default one), and
+    queries take an optional Pinecone-style metadata `filter`.
+    """
+    name = "base"
+
+    def upsert(self, vectors: List[dict], namespace: str = ""):
+        """Insert or replace vectors given as {'id', 'values', 'metadata'} dicts"""
+        raise NotImplementedError
+
+    def upsert_many(self, vectors: List[dict], namespace: str = "") -> UpsertResult:
+        """Upsert any number of vectors, reporting failures per batch instead of raising"""
+        result = UpsertResult()
+        start = time.perf_counter()
+        for i in range(0, len(vectors), config.UPSERT_BATCH_SIZE):
+            batch = vectors[i:i + config.UPSERT_BATCH_SIZE]
+            result.batches += 1
+            try:
+                self.upsert(batch, namespace)
+                result.upserted += len(batch)
+            except Exception as e:
+                result.failed.append({'ids': [vector['id'] for vector in batch], 'error': str(e), 'attempts': 1})
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def query(self, vector: List[float], top_k: int, include_metadata: bool = True,
+              namespace: str = "", filter: dict = None) -> dict:
+        """Return {'matches': [{'id', 'score', 'metadata'}, ...]} sorted by score"""
+        raise NotImplementedError
+
+    def query_many(self, vectors: List[List[float]], top_k: int, include_metadata: bool = True,
+                   namespace: str = "", filter: dict = None) -> List[dict]:
+        """Run several queries; results are in the same order as `vectors`"""
+        return [self.query(vector, top_k, include_metadata, namespace, filter) for vector in vectors]
+
+    async def aquery(self, vector: List[float], top_k: int, include_metadata: bool = True,
+                     namespace: str = "", filter: dict = None) -> dict:
+        """Async query; by default the blocking query runs on the store's query threads.
+
+        They are separate from the loop's default executor, so searches never
+        queue behind unrelated blocking work (or hold its threads).
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_query_executor(), self.query, vector, top_k, include_metadata,
+                                          namespace, filter)
+
+    def delete(self, ids: List[str], namespace: str = ""):
+        """Delete vectors by id"""
+        raise NotImplementedError
+
+    def describe_index_stats(self) -> dict:
+        """Return basic statistics about the store, with a vector count per namespace"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Persist pending writes (no-op for remote backends)"""
+        pass
+
+    def close(self):
+        """Release connections and worker threads; the store cannot be used afterwards"""
+        pass
+
+
+def encode_vector(vector: dict) -> bytes:
+    """JSON for one upsert record.
+
+    Values are written with 8 significant digits, enough to round-trip the
+    float32 the index stores, which keeps requests about half the size of
+    json.dumps output for the same vector.
+    """
+    parts = ['{"id":', json.dumps(vector['id']), ',"values":[',
+             ",".join(f"{value:.8g}" for value in vector['values']), ']']
+    if vector.get('metadata'):
+        parts += [',"metadata":', json.dumps(vector['metadata'], separators=(',', ':'))]
+    parts.append('}')
+    return "".join(parts).encode('utf-8')
+
+
+def split_by_size(sizes: List[int], max_bytes: int, max_count: int) -> List[tuple]:
+    """(start, end) ranges of consecutive records within both limits.
+
+    A record larger than max_bytes on its own still gets a batch, so the
+    server's rejection is reported against it.
+    """
+    ranges, start, total = [], 0, 0
+    for position, size in enumerate(sizes):
+        if position > start and (total + size + 1 > max_bytes or position - start >= max_count):
+            ranges.append((start, position))
+            start, total = position, 0
+        total += size + 1
+    if start < len(sizes):
+        ranges.append((start, len(sizes)))
+    return ranges
+
+
+_query_executor = None
+_query_executor_lock = threading.Lock()
+
+
+def _get_query_executor() -> ThreadPoolExecutor:
+    """Threads that run blocking searches for aquery, sized by config.ASYNC_QUERY_WORKERS"""
+    global _query_executor
+    with _query_executor_lock:
+        if _query_executor is None:
+            _query_executor = ThreadPoolExecutor(max_workers=config.ASYNC_QUERY_WORKERS,
+                                                 thread_name_prefix="vector-query")
+        return _query_executor
+
+
+class PineconeVectorStore(VectorStore):
+    """Vector store backed by a remote Pinecone index.
+
+    Data-plane calls go straight to the index host over a pool of keep-alive
+    connections (the Pinecone SDK is only used to look up or create the
+    index). Large upserts are split into requests by payload size and sent
+    concurrently, and transient failures are retried with jittered
+    exponential backoff, so ingesting a file costs a few bandwidth-bound
+    requests instead of many sequential round trips. Async queries use
+    asyncio connections, so they hold no thread while waiting on the index.
+    """
+    name = "pinecone"
+
+    def __init__(self, create_if_missing: bool = False, host: str = None):
+        self.host = host or config.PINECONE_HOST or self._lookup_host(create_if_missing)
+        headers = {"Api-Key": config.PINECONE_API_KEY or "", "X-Pinecone-API-Version": config.PINECONE_API_VERSION}
+        self.pool = HTTPPool(self.host, size=config.PINECONE_POOL_SIZE,
+                             timeout=config.PINECONE_TIMEOUT_SECONDS, headers=headers)
+        self.apool = AsyncHTTPPool(self.host, size=config.PINECONE_POOL_SIZE,
+                                   timeout=config.PINECONE_TIMEOUT_SECONDS, headers=headers)
+        self._upserts = ThreadPoolExecutor(max_workers=config.UPSERT_CONCURRENCY, thread_name_prefix="upsert")
+
+    @staticmethod
+    def _lookup_host(create_if_missing: bool) -> str:
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=config.PINECONE_API_KEY)
+
+        # Check if index exists, create if not
+        if create_if_missing and config.PINECONE_INDEX_NAME not in pc.list_indexes().names():
+            pc.create_index(
+                name=config.PINECONE_INDEX_NAME,
+                dimension=config.EMBEDDING_DIMENSION,
+                metric='cosine',
+                spec=ServerlessSpec(
+                    cloud='aws',
+                    region=config.PINECONE_ENVIRONMENT or 'us-east-1'
+                )
+            )
+
+        return pc.describe_index(config.PINECONE_INDEX_NAME).host
+
+    def _request(self, path: str, payload) -> tuple:
+        """POST with retries on transient failures; returns (reply, retries).
+
+        The error of the last attempt is raised with an `attempts` attribute.
+        """
+        attempt = 1
+        while True:
+            try:
+                return self.pool.request_json("POST", path, payload), attempt - 1
+            except Exception as e:
+                if attempt >= config.VECTOR_STORE_MAX_ATTEMPTS or not is_transient(e):
+                    e.attempts = attempt
+                    raise
+                time.sleep(backoff_delay(attempt, config.VECTOR_STORE_RETRY_BASE_SECONDS,
+                                         config.VECTOR_STORE_RETRY_MAX_SECONDS, e))
+                attempt += 1
+
+    async def _arequest(self, path: str, payload) -> dict:
+        """Async POST with the same retry policy as _request"""
+        attempt = 1
+        while True:
+            try:
+                return await self.apool.request_json("POST", path, payload)
+            except Exception as e:
+                if attempt >= config.VECTOR_STORE_MAX_ATTEMPTS or not is_transient(e):
+                    e.attempts = attempt
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, config.VECTOR_STORE_RETRY_BASE_SECONDS,
+                                                  config.VECTOR_STORE_RETRY_MAX_SECONDS, e))
+                attempt += 1
+
+    def _upsert_batch(self, ids: List[str], records: List[bytes], namespace: str) -> dict:
+        body = b'{"vectors":[' + b','.join(records) + b'],"namespace":' + json.dumps(namespace).encode('utf-8') + b'}'
+        try:
+            reply, retries = self._request("/vectors/upsert", body)
+            return {'upserted': reply.get('upsertedCount', len(ids)), 'retries': retries, 'bytes': len(body)}
+        except Exception as e:
+            return {'ids': ids, 'error': str(e), 'attempts': getattr(e, 'attempts', 1), 'bytes': len(body)}
+
+    def upsert(self, vectors: List[dict], namespace: str = ""):
+        result = self.upsert_many(vectors, namespace)
+        if not result.ok:
+            raise RuntimeError(result.describe_failures())
+
+    def upsert_many(self, vectors: List[dict], namespace: str = "") -> UpsertResult:
+        result = UpsertResult()
+        start = time.perf_counter()
+        records = [encode_vector(vector) for vector in vectors]
+        ranges = split_by_size([len(record) for record in records],
+                               config.UPSERT_MAX_BATCH_BYTES, config.UPSERT_BATCH_SIZE)
+
+        # The shared executor bounds how many requests are in flight across all callers
+        futures = [
+            self._upserts.submit(self._upsert_batch, [vector['id'] for vector in vectors[first:last]],
+                                 records[first:last], namespace)
+            for first, last in ranges
+        ]
+        for future in futures:
+            outcome = future.result()
+            result.batches += 1
+            result.bytes += outcome['bytes']
+            if 'error' in outcome:
+                result.failed.append({key: outcome[key] for key in ('ids', 'error', 'attempts')})
+                result.retries += outcome['attempts'] - 1
+            else:
+                result.upserted += outcome['upserted']
+                result.retries += outcome['retries']
+        result.seconds = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    def _query_payload(vector: List[float], top_k: int, include_metadata: bool, namespace: str,
+                       filter: Optional[dict]) -> dict:
+        payload = {
+            'vector': [float(value) for value in vector],
+            'topK': top_k,
+            'includeMetadata': include_metadata,
+            'includeValues': False,
+            'namespace': namespace,
+        }
+        if filter:
+            # Pinecone applies the filter before scoring
+            payload['filter'] = filter
+        return payload
+
+    def query(self, vector: List[float], top_k: int, include_metadata: bool = True,
+              namespace: str = "", filter: dict = None) -> dict:
+        reply, _ = self._request("/query", self._query_payload(vector, top_k, include_metadata, namespace, filter))
+        return {'matches': reply.get('matches', [])}
+
+    async def aquery(self, vector: List[float], top_k: int, include_metadata: bool = True,
+                     namespace: str = "", filter: dict = None) -> dict:
+        reply = await self._arequest("/query", self._query_payload(vector, top_k, include_metadata, namespace, filter))
+        return {'matches': reply.get('matches', [])}
+
+    def query_many(self, vectors: List[List[float]], top_k: int, include_metadata: bool = True,
+                   namespace: str = "", filter: dict = None) -> List[dict]:
+        # Each query is a network round trip, so overlap them
+        with ThreadPoolExecutor(max_workers=config.QUERY_MANY_CONCURRENCY) as pool:
+            return list(pool.map(lambda vector: self.query(vector, top_k, include_metadata, namespace, filter),
+                                 vectors))
+
+    def delete(self, ids: List[str], namespace: str = ""):
+        if ids:
+            self._request("/vectors/delete", {'ids': list(ids), 'namespace': namespace})
+
+    def close(self):
+        """Wait for in-flight upserts, then stop the upsert threads and close all connections"""
+        self._upserts.shutdown(wait=True)
+        self.pool.close()
+        self.apool.close()
+
+    def describe_index_stats(self) -> dict:
+        reply, _ = self._request("/describe_index_stats", {})
+        return {
+            'total_vector_count': reply.get('totalVectorCount', 0),
+            'dimension': reply.get('dimension'),
+            'index_fullness': reply.get('indexFullness', 0.0),
+            'namespaces': {
+                namespace: {'vector_count': stats.get('vectorCount', 0)}
+                for namespace, stats in reply.get('namespaces', {}).items()
+            },
+        }
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store persisted under config.DATA_DIR.
+
+    Vectors live in a float32 matrix whose rows are L2-normalised, so cosine
+    similarity against a query is a single matrix-vector product. The matrix
+    is saved as a .npy file and memory-mapped on load; ids and metadata are
+    kept in a JSON sidecar aligned with the matrix rows.
+
+    Once the store holds config.ANN_MIN_VECTORS vectors an IVF index is
+    trained on flush and queries only score the `nprobe` closest clusters.
+    Setting `nprobe` to 0 forces an exact scan.
+
+    This store holds the default namespace; every other namespace is a
+    LocalVectorStore of its own under `namespaces/`, with its own matrix and
+    IVF index, so a scoped search never touches other partitions' vectors.
+    Partition directories are named by a hash of the namespace, which is
+    kept in a namespace.json sidecar, so no name can point outside the store.
+    A metadata filter selects the matching rows before any scoring.
+    """
+    name = "local"
+
+    def __init__(self, path: str = None, dimension: int = None, namespace: str = ""):
+        self.path = path or os.path.join(config.DATA_DIR, config.LOCAL_VECTOR_STORE_DIR)
+        self.dimension = dimension or config.EMBEDDING_DIMENSION
+        self.namespace = namespace
+        self._vectors_file = os.path.join(self.path, "vectors.npy")
+        self._meta_file = os.path.join(self.path, "metadata.json")
+        self._lock = threading.RLock()
+
+        self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+        self._count = 0
+        self._ids: List[str] = []
+        self._metadata: List[dict] = []
+        self._positions = {}
+        self._dirty = False
+        self._ann: Optional[IVFIndex] = None
+        self.nprobe = config.ANN_NPROBE
+        self._partitions = {}
+        self._filter_rows = {}
+        self._load()
+
+    def _load(self):
+        """Load a previously persisted store, memory-mapping the vectors"""
+        if not (os.path.exists(self._vectors_file) and os.path.exists(self._meta_file)):
+            return
+
+        with open(self._meta_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+
+        self._matrix = np.load(self._vectors_file, mmap_mode='r')
+        self._count = len(records)
+        self._ids = [record['id'] for record in records]
+        self._metadata = [record.get('metadata', {}) for record in records]
+        self._positions = {vector_id: row for row, vector_id in enumerate(self._ids)}
+
+        if config.ANN_INDEX == "ivf":
+            self._ann = IVFIndex.load(self.path)
+            # A stale index (e.g. written before ANN was disabled) is dropped and retrained on next flush
+            if self._ann is not None and len(self._ann.assignments) != self._count:
+                self._ann = None
+                IVFIndex.delete_files(self.path)
+
+    def _ensure_capacity(self, extra: int):
+        """Grow the matrix geometrically so repeated upserts stay amortised O(1)"""
+        needed = self._count + extra
+        if needed <= self._matrix.shape[0] and self._matrix.flags.writeable:
+            return
+
+        capacity = max(needed, 2 * self._matrix.shape[0], 1024)
+        grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+        grown[:self._count] = self._matrix[:self._count]
+        self._matrix = grown
+
+    @staticmethod
+    def _normalize(values) -> np.ndarray:
+        array = np.asarray(values, dtype=np.float32)
+        norms = np.linalg.norm(array, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return array / norms
+
+    def _namespaces_path(self) -> str:
+        return os.path.join(self.path, config.LOCAL_NAMESPACES_DIR)
+
+    def _partition(self, namespace: str, create: bool = False) -> Optional["LocalVectorStore"]:
+        """The store holding a namespace; None if it does not exist and create is False"""
+        if not validate_namespace(namespace):
+            return self
+        with self._lock:
+            store = self._partitions.get(namespace)
+            if store is None:
+                digest = hashlib.sha256(namespace.encode('utf-8')).hexdigest()[:32]
+                path = os.path.join(self._namespaces_path(), digest)
+                if not create and not os.path.isdir(path):
+                    return None
+                store = self._partitions[namespace] = LocalVectorStore(path, self.dimension, namespace)
+            return store
+
+    def namespaces(self) -> List[str]:
+        """Named namespaces, whether loaded or only on disk"""
+        names = set(self._partitions)
+        if os.path.isdir(self._namespaces_path()):
+            for entry in os.listdir(self._namespaces_path()):
+                name_file = os.path.join(self._namespaces_path(), entry, "namespace.json")
+                if os.path.exists(name_file):
+                    with open(name_file, 'r', encoding='utf-8') as f:
+                        names.add(json.load(f)['namespace'])
+        return sorted(names)
+
+    def _rows_matching(self, metadata_filter: dict) -> np.ndarray:
+        """Rows whose metadata passes the filter, cached until the next write (lock held)"""
+        key = json.dumps(metadata_filter, sort_keys=True)
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            rows = np.array([
+                row for row, metadata in enumerate(self._metadata) if matches_filter(metadata, metadata_filter)
+            ], dtype=np.int64)
+            if len(self._filter_rows) >= 64:
+                self._filter_rows.clear()
+            self._filter_rows[key] = rows
+        return rows
+
+    def _candidate_rows(self, query_vector: np.ndarray, metadata_filter: dict) -> Optional[np.ndarray]:
+        """Rows to score for a query, or None to scan the whole matrix (lock held)"""
+        rows = self._rows_matching(metadata_filter) if metadata_filter else None
+        if self._ann is not None and self.nprobe > 0:
+            probed = self._ann.candidates(query_vector, self.nprobe)
+            rows = probed if rows is None else np.intersect1d(probed, rows, assume_unique=True)
+        return rows
+
+    def upsert(self, vectors: List[dict], namespace: str = ""):
+        if not vectors:
+            return
+        if namespace:
+            return self._partition(namespace, create=True).upsert(vectors)
+
+        with self._lock:
+            values = self._normalize([vector['values'] for vector in vectors])
+            self._ensure_capacity(len(vectors))
+            rows = []
+
+            for vector, row_values in zip(vectors, values):
+                vector_id = vector['id']
+                row = self._positions.get(vector_id)
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(vector_id)
+                    self._metadata.append({})
+                    self._positions[vector_id] = row
+
+                self._matrix[row] = row_values
+                self._metadata[row] = vector.get('metadata', {})
+                rows.append(row)
+
+            if self._ann is not None:
+                self._ann.add(np.array(rows), values)
+            self._filter_rows.clear()
+            self._dirty = True
+
+    def query(self, vector: List[float], top_k: int, include_metadata: bool = True,
+              namespace: str = "", filter: dict = None) -> dict:
+        if namespace:
+            store = self._partition(namespace)
+            return store.query(vector, top_k, include_metadata, filter=filter) if store else {'matches': []}
+
+        with self._lock:
+            if self._count == 0 or top_k <= 0:
+                return {'matches': []}
+
+            query_vector = self._normalize(vector)
+            rows = self._candidate_rows(query_vector, filter)
+            if rows is not None:
+                scores = self._matrix[rows] @ query_vector
+            else:
+                scores = self._matrix[:self._count] @ query_vector
+
+            return self._matches(scores, rows, top_k, include_metadata)
+
+    def query_many(self, vectors: List[List[float]], top_k: int, include_metadata: bool = True,
+                   namespace: str = "", filter: dict = None) -> List[dict]:
+        """Score a whole batch of queries with one matrix product per block"""
+        if namespace:
+            store = self._partition(namespace)
+            if store is None:
+                return [{'matches': []} for _ in vectors]
+            return store.query_many(vectors, top_k, include_metadata, filter=filter)
+
+        with self._lock:
+            if self._count == 0 or top_k <= 0:
+                return [{'matches': []} for _ in vectors]
+            if self._ann is not None and self.nprobe > 0:
+                return [self.query(vector, top_k, include_metadata, filter=filter) for vector in vectors]
+
+            queries = self._normalize(vectors)
+            rows = self._rows_matching(filter) if filter else None
+            if rows is not None and len(rows) == 0:
+                return [{'matches': []} for _ in vectors]
+            matrix = self._matrix[rows] if rows is not None else self._matrix[:self._count]
+
+            # Bound the (queries x vectors) score block to ~64 MB of float32
+            block = max(1, (1 << 24) // len(matrix))
+            results = []
+            for start in range(0, len(queries), block):
+                scores = queries[start:start + block] @ matrix.T
+                for row_scores in scores:
+                    results.append(self._matches(row_scores, rows, top_k, include_metadata))
+            return results
+
+    def _matches(self, scores: np.ndarray, rows: Optional[np.ndarray], top_k: int,
+                 include_metadata: bool) -> dict:
+        """Turn a score vector into Pinecone-style matches for the top k"""
+        k = min(top_k, len(scores))
+        if k == 0:
+            return {'matches': []}
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for position in top:
+            row = rows[position] if rows is not None else position
+            match = {'id': self._ids[row], 'score': float(scores[position])}
+            if include_metadata:
+                match['metadata'] = self._metadata[row]
+            matches.append(match)
+
+        return {'matches': matches}
+
+    def delete(self, ids: List[str], namespace: str = ""):
+        if namespace:
+            store = self._partition(namespace)
+            if store is not None:
+                store.delete(ids)
+            return
+
+        with self._lock:
+            self._filter_rows.clear()
+            for vector_id in ids:
+                row = self._positions.pop(vector_id, None)
+                if row is None:
+                    continue
+
+                # Swap the last row into the hole to keep the matrix dense
+                last = self._count - 1
+                if self._ann is not None:
+                    self._ann.remove(row)
+                if row != last:
+                    self._ensure_capacity(0)
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = self._ids[last]
+                    self._metadata[row] = self._metadata[last]
+                    self._positions[self._ids[row]] = row
+                    if self._ann is not None:
+                        self._ann.move(last, row)
+
+                self._ids.pop()
+                self._metadata.pop()
+                self._count -= 1
+                self._dirty = True
+
+    def describe_index_stats(self) -> dict:
+        namespaces = {"": {'vector_count': self._count}} if self._count else {}
+        for namespace in self.namespaces():
+            count = self._partition(namespace)._count
+            if count:
+                namespaces[namespace] = {'vector_count': count}
+        return {
+            'total_vector_count': sum(stats['vector_count'] for stats in namespaces.values()),
+            'dimension': self.dimension,
+            'index_fullness': 0.0,
+            'namespaces': namespaces,
+        }
+
+    def _maybe_train_ann(self):
+        """Train (or retrain) the IVF index once the store is large enough"""
+        if config.ANN_INDEX != "ivf" or self._count < config.ANN_MIN_VECTORS:
+            return
+        if self._ann is not None and self._count < self._ann.trained_count * config.ANN_RETRAIN_FACTOR:
+            return
+
+        vectors = self._matrix[:self._count]
+        nlist = config.ANN_NLIST or default_nlist(self._count)
+        print(f"🧭 Training IVF index with {nlist} clusters on {self._count} vectors...")
+        self._ann = IVFIndex.train(vectors, nlist)
+        self._ann.add(np.arange(self._count), vectors)
+
+    def flush(self):
+        """Write the matrix and metadata to disk and re-open the matrix as a memmap"""
+        for store in list(self._partitions.values()):
+            store.flush()
+
+        with self._lock:
+            if not self._dirty:
+                return
+
+            self._maybe_train_ann()
+
+            os.makedirs(self.path, exist_ok=True)
+            name_file = os.path.join(self.path, "namespace.json")
+            if self.namespace and not os.path.exists(name_file):
+                with open(name_file + ".tmp", 'w', encoding='utf-8') as f:
+                    json.dump({'namespace': self.namespace}, f)
+                os.replace(name_file + ".tmp", name_file)
+
+            records = [
+                {'id': vector_id, 'metadata': metadata}
+                for vector_id, metadata in zip(self._ids, self._metadata)
+            ]
+
+            # Write to temp files first so a crash never leaves a torn store
+            tmp_vectors = self._vectors_file + ".tmp.npy"
+            tmp_meta = self._meta_file + ".tmp"
+            np.save(tmp_vectors, np.ascontiguousarray(self._matrix[:self._count]))
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump(records, f)
+            os.replace(tmp_vectors, self._vectors_file)
+            os.replace(tmp_meta, self._meta_file)
+            if self._ann is not None:
+                self._ann.save(self.path, self._count)
+            else:
+                # An index from before ANN was disabled no longer matches the rows just written
+                IVFIndex.delete_files(self.path)
+
+            self._matrix = np.load(self._vectors_file, mmap_mode='r')
+            self._dirty = False
+
+
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+_remote_stores = {}
+_remote_stores_lock = threading.Lock()
+
+
+def get_vector_store(create_if_missing: bool = False) -> Optional[VectorStore]:
+    """Create the vector store selected by config.VECTOR_STORE_BACKEND.
+
+    Stores are shared per process: local ones so ingestion and retrieval see
+    the same in-memory data, remote ones so they share one connection pool.
+    Returns None when the backend cannot be used.
+    """
+    backend = config.VECTOR_STORE_BACKEND
+
+    if backend == "local":
+        path = os.path.join(config.DATA_DIR, config.LOCAL_VECTOR_STORE_DIR)
+        with _local_stores_lock:
+            if path not in _local_stores:
+                _local_stores[path] = LocalVectorStore(path)
+            return _local_stores[path]
+
+    if backend == "pinecone":
+        if not (config.PINECONE_API_KEY or config.PINECONE_HOST):
+            return None
+        # One client (and connection pool) per index, shared by every component
+        key = config.PINECONE_HOST or config.PINECONE_INDEX_NAME
+        with _remote_stores_lock:
+            if key not in _remote_stores:
+                if not _remote_stores:
+                    atexit.register(close_vector_stores)
+                _remote_stores[key] = PineconeVectorStore(create_if_missing=create_if_missing)
+            return _remote_stores[key]
+
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+
+def close_vector_stores():
+    """Close the shared remote stores (registered to run at exit once one is created)"""
+    with _remote_stores_lock:
+        stores = list(_remote_stores.values())
+        _remote_stores.clear()
+    for store in stores:
+        try:
+            store.close()
+        except Exception as e:
+            print(f"⚠️ Could not close {store.name} vector store: {e}")